@@ -1,5 +1,6 @@
 # backend/app/api/deps.py
 
+import hmac
 import logging
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -11,6 +12,7 @@ from typing import Optional
 
 logger = logging.getLogger(__name__)
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> User:
     token = credentials.credentials
@@ -58,3 +60,17 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
     
     logger.info(f"User authenticated: {user_id}")
     return User(id=user_id, email=email)
+
+def require_ops_token(credentials: Optional[HTTPAuthorizationCredentials] = Depends(optional_security)):
+    """
+    Guard operational endpoints (metrics, diagnostics) with the OPS_TOKEN bearer token.
+    They are hidden entirely while no token is configured.
+    """
+    if not settings.OPS_TOKEN:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Not Found")
+    if credentials is None or not hmac.compare_digest(credentials.credentials.encode(), settings.OPS_TOKEN.encode()):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
@@ -1,16 +1,23 @@
 from fastapi import APIRouter, HTTPException, Request
-from pydantic import BaseModel
-from app.db.session import get_supabase
-from app.services.openai_service import get_chatbot_response
+from pydantic import BaseModel, Field
+from typing import Optional
+import uuid
+from app.services.bot_loader import load_chatbot_by_token
+from app.services.openai_service import ChatReplyError, get_chatbot_response
+from app.services.conversation_store import conversation_store
+from app.core.config import settings
 import logging
 
 router = APIRouter()
 
 class ChatRequest(BaseModel):
-    message: str
+    message: str = Field(..., max_length=settings.CHAT_MESSAGE_MAX_CHARS)
+    # Omit to start a new conversation; send back the id from the previous reply to continue it
+    conversation_id: Optional[str] = None
 
 class ChatResponse(BaseModel):
     reply: str
+    conversation_id: str
 
 @router.post("/chatbots/{token}/chat", response_model=ChatResponse)
 async def chat_with_bot(token: str, chat_request: ChatRequest, request: Request):
@@ -19,26 +26,31 @@ async def chat_with_bot(token: str, chat_request: ChatRequest, request: Request)
     logging.info(f"Request URL: {str(request.url)}")
 
     try:
-        supabase = get_supabase()
-        response = supabase.table("chatbots").select("*").eq("token", token).execute()
+        chatbot = await load_chatbot_by_token(token)
         
-        logging.info(f"Supabase response: {response}")
-        
-        if not response.data:
+        if chatbot is None:
             logging.warning(f"Chatbot not found for token: {token}")
             raise HTTPException(status_code=404, detail="Chatbot not found")
         
-        chatbot = response.data[0]  # Get the first item from the data list
         logging.info(f"Full chatbot object: {chatbot}")
         
         user_message = chat_request.message
         logging.info(f"Processing message for chatbot: {chatbot['name']}")
         
+        conversation_id = chat_request.conversation_id or uuid.uuid4().hex
+        history = await conversation_store.get_history(conversation_id, chatbot['id'])
+        
         # Get response from OpenAI, passing the entire chatbot object
-        bot_reply = await get_chatbot_response(chatbot, user_message)
+        try:
+            bot_reply = await get_chatbot_response(chatbot, user_message, history)
+        except ChatReplyError as e:
+            # The apology goes to the user but stays out of the history, so the turn can simply be retried
+            return ChatResponse(reply=str(e), conversation_id=conversation_id)
         
         logging.info(f"Received reply from OpenAI for chatbot: {chatbot['name']}")
-        return ChatResponse(reply=bot_reply)
+        await conversation_store.append(conversation_id, chatbot['id'], "user", user_message)
+        await conversation_store.append(conversation_id, chatbot['id'], "assistant", bot_reply)
+        return ChatResponse(reply=bot_reply, conversation_id=conversation_id)
     
     except HTTPException as he:
         logging.error(f"HTTP Exception in chat_with_bot: {str(he)}")
@@ -1,61 +1,85 @@
 # backend/app/api/v1/endpoints/chatbots.py
 
-from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Body
-from typing import List, Optional
+from fastapi import APIRouter, Depends, UploadFile, File, HTTPException, Form, Body, Query, Response
+from typing import Callable, Dict, List, Optional, Tuple
 import uuid
-from app.schemas.chatbot import Chatbot, ChatbotInDB, ChatbotCreate
+from app.schemas.chatbot import Chatbot, ChatbotInDB, ChatbotCreate, BatchChatRequest
+from app.schemas.routing import ModelRouting
 from app.schemas.user import User
 from app.api import deps
 from app.db.session import get_supabase
+from app.db.loader import Loaders, get_loaders
+from app.db.queries import InvalidQueryError, model_columns, parse_fields, partial_model, fetch_page
 from app.services.link_generator import generate_unique_token
-from app.utils.file_utils import save_uploaded_files, delete_files
+from app.utils.file_utils import read_files, upload_contents, document_url, delete_files
+from app.services.document_ingest import ingest_documents
+from app.services.bot_loader import invalidate_chatbot
+from app.services.public_tokens import chatbot_tokens
+from app.services.openai_service import invalidate_document, build_system_message, create_chat_completion
+from app.core.config import settings
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
+import asyncio
+import json
+import time
 import logging
 from pydantic import ValidationError
 from postgrest.exceptions import APIError
+from postgrest.types import CountMethod, ReturnMethod
 
 router = APIRouter()
 
+# Columns behind the Chatbot response model; owner checks add what they need on top
+CHATBOT_COLUMNS = model_columns(Chatbot)
+# Adding or removing a document rewrites the documents list, and the write only lands
+# if the list is still the one it was computed from; otherwise it is read and tried again
+DOCUMENT_UPDATE_ATTEMPTS = 3
+
 @router.post("/", response_model=Chatbot)
 async def create_chatbot(
     name: str = Form(...),
     instructions: Optional[str] = Form(None),
     tone: Optional[str] = Form(None),
     files: List[UploadFile] = File(None),
+    model_routing: Optional[str] = Form(None, description="JSON routing policy, see ModelRouting"),
     current_user: User = Depends(deps.get_current_user)
 ):
     supabase = get_supabase()
 
     try:
-        # Generate a unique token for the chatbot
-        token = generate_unique_token()
+        routing = ModelRouting.model_validate_json(model_routing) if model_routing else None
+
+        # Ids and tokens are generated here, so nothing below waits on the database
+        chatbot_id = str(uuid.uuid4())
+        token = generate_unique_token(chatbot_tokens)
+
+        documents, document_digests = [], {}
+        if files:
+            logging.info(f"Received {len(files)} files for chatbot")
+            documents, document_digests = await _store_documents(supabase, files, chatbot_id)
 
         chatbot_data = {
-            "id": str(uuid.uuid4()),
+            "id": chatbot_id,
             "name": name,
             "instructions": instructions,
             "tone": tone,
             "user_id": current_user.id,
             "token": token,
-            "documents": []
+            "documents": documents,
+            "document_digests": document_digests,
+            "model_routing": routing.model_dump(exclude_none=True) if routing else None
         }
-        logging.info(f"Attempting to create chatbot with data: {chatbot_data}")
-        
-        response = supabase.table("chatbots").insert(chatbot_data).execute()
-        
-        if not response.data:
-            logging.error(f"Failed to create chatbot. Supabase response: {response}")
-            raise HTTPException(status_code=400, detail="Failed to create chatbot")
+        logging.info(f"Attempting to create chatbot {chatbot_id} with {len(documents)} documents ({len(document_digests)} digests)")
 
-        chatbot = response.data[0]
-        logging.info(f"Chatbot created successfully: {chatbot}")
-        
-        if files:
-            logging.info(f"Received {len(files)} files for chatbot")
-            new_file_urls = await save_uploaded_files(files, chatbot["id"])
-            update_response = supabase.table("chatbots").update({"documents": new_file_urls}).eq("id", chatbot["id"]).execute()
-            logging.info(f"Updated chatbot with file URLs. Response: {update_response}")
-
-            chatbot["documents"] = new_file_urls
+        # One write with everything, instead of an insert followed by an update for the documents.
+        # The response is built from what we sent, so the digests are not echoed back.
+        try:
+            await run_in_threadpool(supabase.table("chatbots").insert(chatbot_data, returning=ReturnMethod.minimal).execute)
+        except Exception:
+            await delete_files(documents)
+            raise
+        chatbot = chatbot_data
+        logging.info(f"Chatbot {chatbot_id} created successfully")
         
         created_chatbot = Chatbot(
             id=chatbot["id"],
@@ -63,10 +87,13 @@ async def create_chatbot(
             instructions=chatbot["instructions"],
             tone=chatbot["tone"],
             token=chatbot["token"],
+            model_routing=chatbot["model_routing"],
             documents=chatbot.get("documents", [])
         )
         
         return created_chatbot
+    except HTTPException:
+        raise
     except ValidationError as ve:
         logging.error(f"Validation error: {ve.errors()}")
         raise HTTPException(status_code=422, detail=ve.errors())
@@ -74,32 +101,42 @@ async def create_chatbot(
         logging.error(f"Error creating chatbot: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail="Internal server error")
 
-@router.get("/", response_model=List[Chatbot])
-def get_user_chatbots(current_user: User = Depends(deps.get_current_user)):
+@router.get("/", response_model=List[partial_model(Chatbot)], response_model_exclude_unset=True)
+def get_user_chatbots(
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,token"),
+    page_size: int = Query(settings.LIST_PAGE_SIZE_DEFAULT, ge=1, le=settings.LIST_PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    current_user: User = Depends(deps.get_current_user)
+):
     supabase = get_supabase()
-    response = supabase.table("chatbots").select("*").eq("user_id", current_user.id).execute()
-    if not response.data:
-        return []
-    chatbots = response.data
-    return [Chatbot(id=cb["id"], name=cb["name"], instructions=cb["instructions"], tone=cb["tone"], token=cb["token"], documents=cb.get("documents", [])) for cb in chatbots]
+    try:
+        columns = parse_fields(Chatbot, fields)
+        chatbots, next_cursor = fetch_page(supabase, "chatbots", columns, {"user_id": current_user.id}, page_size, after)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    # Rows are validated against the response model once, by FastAPI, on the way out
+    return chatbots
 
 @router.get("/{chatbot_id}", response_model=Chatbot)
-async def get_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_current_user)):
+async def get_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_current_user),
+                      loaders: Loaders = Depends(get_loaders)):
     logging.info(f"Fetching chatbot with id: {chatbot_id}")
     if not chatbot_id or chatbot_id == "undefined":
         raise HTTPException(status_code=400, detail="Invalid chatbot ID")
 
-    supabase = get_supabase()
     try:
-        response = supabase.table("chatbots").select("*").eq("id", chatbot_id).single().execute()
+        chatbot = await loaders("chatbots", "id", CHATBOT_COLUMNS + ["user_id"]).load(chatbot_id)
     except APIError as e:
         logging.error(f"Supabase API error: {str(e)}")
         raise HTTPException(status_code=400, detail="Invalid chatbot ID format")
     
-    if not response.data:
+    if not chatbot:
         raise HTTPException(status_code=404, detail="Chatbot not found")
 
-    chatbot = response.data
     if chatbot["user_id"] != current_user.id:
         logging.warning(f"User {current_user.id} attempted to access chatbot owned by another user.")
         raise HTTPException(status_code=403, detail="Not authorized to access this chatbot")
@@ -110,25 +147,26 @@ async def get_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_cur
         instructions=chatbot["instructions"],
         tone=chatbot["tone"],
         token=chatbot["token"],
+        model_routing=chatbot.get("model_routing"),
         documents=chatbot.get("documents", [])
     )
 
 @router.delete("/{chatbot_id}", response_model=None)
-async def delete_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_current_user)):
+async def delete_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_current_user),
+                         loaders: Loaders = Depends(get_loaders)):
     logging.info(f"Deleting chatbot with id: {chatbot_id}")
-    supabase = get_supabase()
+    supabase = loaders.supabase
 
     try:
-        response = supabase.table("chatbots").select("*").eq("id", chatbot_id).single().execute()
+        chatbot = await loaders("chatbots", "id", "user_id, token, documents").load(chatbot_id)
     except APIError as e:
         logging.error(f"Supabase API error: {str(e)}")
         raise HTTPException(status_code=400, detail="Invalid chatbot ID format")
 
-    if not response.data:
+    if not chatbot:
         logging.warning(f"Chatbot with ID {chatbot_id} not found")
         raise HTTPException(status_code=404, detail="Chatbot not found")
 
-    chatbot = response.data
     if chatbot["user_id"] != current_user.id:
         logging.warning(f"User {current_user.id} attempted to delete chatbot owned by another user.")
         raise HTTPException(status_code=403, detail="Not authorized to delete this chatbot")
@@ -144,6 +182,9 @@ async def delete_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_
         if delete_response.status_code != 200:
             logging.error(f"Failed to delete chatbot. Supabase response: {delete_response}")
             raise HTTPException(status_code=400, detail="Failed to delete chatbot")
+        invalidate_chatbot(chatbot["token"])
+        chatbot_tokens.remove(chatbot["token"])
+        await invalidate_document(chatbot_id)
         logging.info(f"Chatbot {chatbot_id} deleted successfully")
     except Exception as e:
         logging.error(f"Error deleting chatbot: {str(e)}", exc_info=True)
@@ -151,3 +192,220 @@ async def delete_chatbot(chatbot_id: str, current_user: User = Depends(deps.get_
 
     return {"detail": "Chatbot deleted successfully"}
 
+async def _get_owned_chatbot(loaders: Loaders, chatbot_id: str, current_user: User) -> dict:
+    columns = CHATBOT_COLUMNS + ["user_id", "documents", "document_digests"]
+    try:
+        chatbot = await loaders("chatbots", "id", columns).load(chatbot_id)
+    except APIError as e:
+        logging.error(f"Supabase API error: {str(e)}")
+        raise HTTPException(status_code=400, detail="Invalid chatbot ID format")
+
+    if not chatbot:
+        raise HTTPException(status_code=404, detail="Chatbot not found")
+
+    if chatbot["user_id"] != current_user.id:
+        logging.warning(f"User {current_user.id} attempted to modify chatbot owned by another user.")
+        raise HTTPException(status_code=403, detail="Not authorized to modify this chatbot")
+    return chatbot
+
+async def _store_documents(supabase, files: List[UploadFile], chatbot_id: str) -> Tuple[List[str], Dict[str, dict]]:
+    """
+    Upload files and digest them at the same time.
+
+    Document URLs are known before the upload finishes, so ingestion does not
+    wait for storage. Digests of files that failed to upload are dropped.
+    """
+    contents = await read_files(files)
+    planned = [(document_url(supabase, chatbot_id, filename), content) for filename, content in contents]
+    uploaded, digests = await asyncio.gather(upload_contents(contents, chatbot_id), ingest_documents(planned))
+    documents = [url for url, _ in uploaded]
+    stored = set(documents)
+    return documents, {url: digest for url, digest in digests.items() if url in stored}
+
+def _document_name(doc_url: str) -> str:
+    # Public URLs look like .../chatbot-documents/<chatbot_id>/<filename>[?]
+    return doc_url.split("?")[0].rstrip("/").split("/")[-1]
+
+def _read_documents(supabase, chatbot_id: str) -> Tuple[List[str], Dict[str, dict]]:
+    row = supabase.table("chatbots").select("documents, document_digests").eq("id", chatbot_id).single().execute().data
+    return row.get("documents") or [], row.get("document_digests") or {}
+
+def _swap_documents(supabase, chatbot_id: str, expected: List[str], documents: List[str], document_digests: Dict[str, dict]) -> bool:
+    query = supabase.table("chatbots").update({
+        "documents": documents,
+        "document_digests": document_digests,
+    }, count=CountMethod.exact, returning=ReturnMethod.minimal).eq("id", chatbot_id)
+    # Documents are unique by name, so comparing as sets is enough
+    if expected:
+        query = query.contains("documents", expected).contained_by("documents", expected)
+    else:
+        query = query.or_("documents.is.null,documents.eq.{}")
+    return bool(query.execute().count)
+
+async def _update_documents(
+    supabase,
+    chatbot: dict,
+    change: Callable[[List[str], Dict[str, dict]], Tuple[List[str], Dict[str, dict]]]
+) -> List[str]:
+    """
+    Apply ``change`` to the chatbot's documents and digests with a conditional write,
+    so concurrent adds and removes do not overwrite each other.
+
+    Returns:
+        List[str]: The documents as written.
+
+    Raises:
+        HTTPException: 409 if the documents kept changing underneath every attempt.
+    """
+    documents, document_digests = chatbot.get("documents") or [], chatbot.get("document_digests") or {}
+    for attempt in range(DOCUMENT_UPDATE_ATTEMPTS):
+        if attempt:
+            documents, document_digests = await run_in_threadpool(_read_documents, supabase, chatbot["id"])
+        new_documents, new_digests = change(documents, document_digests)
+        if await run_in_threadpool(_swap_documents, supabase, chatbot["id"], documents, new_documents, new_digests):
+            return new_documents
+        logging.info(f"Documents of chatbot {chatbot['id']} changed concurrently (attempt {attempt + 1})")
+    raise HTTPException(status_code=409, detail="Documents were changed by another request, please try again")
+
+@router.post("/{chatbot_id}/documents", response_model=Chatbot)
+async def add_chatbot_documents(
+    chatbot_id: str,
+    files: List[UploadFile] = File(...),
+    current_user: User = Depends(deps.get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    logging.info(f"Adding {len(files)} documents to chatbot {chatbot_id}")
+    supabase = loaders.supabase
+    chatbot = await _get_owned_chatbot(loaders, chatbot_id, current_user)
+
+    names = [file.filename for file in files]
+    repeated = sorted({name for name in names if names.count(name) > 1})
+    if repeated:
+        raise HTTPException(status_code=409, detail=f"Files uploaded more than once: {', '.join(repeated)}")
+    existing_names = {_document_name(url) for url in chatbot.get("documents") or []}
+    duplicates = [name for name in names if name in existing_names]
+    if duplicates:
+        raise HTTPException(status_code=409, detail=f"Documents already attached: {', '.join(duplicates)}")
+
+    try:
+        # Only the new files are uploaded and digested; existing documents are left untouched
+        new_documents, new_digests = await _store_documents(supabase, files, chatbot_id)
+
+        def add(documents: List[str], document_digests: Dict[str, dict]):
+            return documents + [url for url in new_documents if url not in documents], {**document_digests, **new_digests}
+
+        try:
+            documents = await _update_documents(supabase, chatbot, add)
+        except Exception:
+            await delete_files(new_documents)
+            raise
+        logging.info(f"Added {len(new_documents)} documents ({len(new_digests)} digests) to chatbot {chatbot_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error adding documents: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    invalidate_chatbot(chatbot["token"])
+    for url in new_documents:
+        await invalidate_document(chatbot_id, url)
+
+    return Chatbot(
+        id=chatbot["id"],
+        name=chatbot["name"],
+        instructions=chatbot["instructions"],
+        tone=chatbot["tone"],
+        token=chatbot["token"],
+        model_routing=chatbot.get("model_routing"),
+        documents=documents
+    )
+
+@router.delete("/{chatbot_id}/documents/{document_name}", response_model=Chatbot)
+async def delete_chatbot_document(
+    chatbot_id: str,
+    document_name: str,
+    current_user: User = Depends(deps.get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    logging.info(f"Removing document {document_name} from chatbot {chatbot_id}")
+    supabase = loaders.supabase
+    chatbot = await _get_owned_chatbot(loaders, chatbot_id, current_user)
+
+    documents = chatbot.get("documents") or []
+    doc_url = next((url for url in documents if _document_name(url) == document_name), None)
+    if doc_url is None:
+        raise HTTPException(status_code=404, detail="Document not found")
+
+    def remove(documents: List[str], document_digests: Dict[str, dict]):
+        if doc_url not in documents:
+            raise HTTPException(status_code=404, detail="Document not found")
+        return ([url for url in documents if url != doc_url],
+                {url: digest for url, digest in document_digests.items() if url != doc_url})
+
+    try:
+        # The row goes first, so a failed or conflicting write leaves no dangling URL
+        documents = await _update_documents(supabase, chatbot, remove)
+        await delete_files([doc_url])
+        logging.info(f"Removed document {doc_url} from chatbot {chatbot_id}")
+    except HTTPException:
+        raise
+    except Exception as e:
+        logging.error(f"Error removing document: {str(e)}", exc_info=True)
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+    invalidate_chatbot(chatbot["token"])
+    await invalidate_document(chatbot_id, doc_url)
+
+    return Chatbot(
+        id=chatbot["id"],
+        name=chatbot["name"],
+        instructions=chatbot["instructions"],
+        tone=chatbot["tone"],
+        token=chatbot["token"],
+        model_routing=chatbot.get("model_routing"),
+        documents=documents
+    )
+
+@router.post("/{chatbot_id}/chat/batch")
+async def batch_chat(
+    chatbot_id: str,
+    batch_request: BatchChatRequest,
+    current_user: User = Depends(deps.get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    if not batch_request.messages:
+        raise HTTPException(status_code=400, detail="No messages provided")
+    if len(batch_request.messages) > settings.BATCH_CHAT_MAX_MESSAGES:
+        raise HTTPException(status_code=400, detail=f"At most {settings.BATCH_CHAT_MAX_MESSAGES} messages per batch")
+
+    chatbot = await _get_owned_chatbot(loaders, chatbot_id, current_user)
+    logging.info(f"Running batch of {len(batch_request.messages)} messages against chatbot {chatbot_id}")
+
+    # Config and documents are loaded once and shared by every message in the batch
+    system_message = await build_system_message(chatbot)
+    concurrency = min(batch_request.max_concurrency or settings.BATCH_CHAT_MAX_CONCURRENCY, settings.BATCH_CHAT_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def run_one(index: int, message: str) -> dict:
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                completion = await create_chat_completion(system_message, message, endpoint="batch", routing=chatbot.get("model_routing"))
+                result = {"index": index, "message": message, "reply": completion["reply"], "model": completion["model"], "usage": completion["usage"]}
+            except Exception as e:
+                logging.error(f"Batch chat item {index} failed: {e}")
+                result = {"index": index, "message": message, "error": str(e)}
+            result["latency_ms"] = round((time.perf_counter() - started) * 1000, 1)
+            return result
+
+    async def stream_results():
+        tasks = [asyncio.create_task(run_one(index, message)) for index, message in enumerate(batch_request.messages)]
+        try:
+            # One NDJSON line per message, in completion order; "index" ties it back to the request
+            for next_done in asyncio.as_completed(tasks):
+                yield json.dumps(await next_done) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(stream_results(), media_type="application/x-ndjson")
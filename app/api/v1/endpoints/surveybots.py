@@ -1,43 +1,65 @@
 # backend/app/api/v1/endpoints/surveybots.py
 
-from fastapi import APIRouter, Depends, HTTPException, Body
-from typing import List
-from app.schemas.surveybot import SurveyBotCreate, SurveyBot, SurveyBotUpdate, SurveyResult, SurveyResponse
+from fastapi import APIRouter, Depends, HTTPException, Body, Request, Response, Query, WebSocket, WebSocketDisconnect, status
+from typing import List, Optional
+from app.schemas.surveybot import SurveyBotCreate, SurveyBot, PublicSurveyBot, SurveyBotUpdate, SurveyResult, SurveyResponse, SurveyAnswer, Question, SurveySummary, InterpretationRequest, InterpretationJobStatus, BulkSurveySubmitRequest, BulkSurveySubmitResult
 from app.schemas.user import User
 from app.api import deps
 from app.db.session import get_supabase
+from app.db.loader import Loaders, get_loaders
+from app.db.queries import InvalidQueryError, model_columns, parse_fields, partial_model, fetch_page
+from app.core.config import settings
+from app.core.metrics import gauge
 from app.services.link_generator import generate_unique_token
-from app.services.surveybot_service import SurveyBotService
+from app.services.surveybot_service import SurveyBotService, warm_greetings
+from app.services.bot_loader import load_survey_bot, load_survey_bot_by_token
+from app.services.public_tokens import survey_tokens
+from app.services import survey_aggregates, survey_http_cache, survey_export, survey_submissions
+from app.services.interpretation_jobs import interpretation_queue, select_response_ids
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from postgrest.types import ReturnMethod
+import asyncio
+import json
+import time
 import uuid
 from datetime import datetime
 import logging
 
 router = APIRouter()
 
+# Columns behind the response models; questions are a separate table
+SURVEY_BOT_COLUMNS = model_columns(SurveyBot, exclude=("questions",))
+PUBLIC_SURVEY_BOT_COLUMNS = model_columns(SurveyBot, exclude=("questions", "model_routing"))
+QUESTION_COLUMNS = ", ".join(model_columns(Question))
+RESPONSE_COLUMNS = model_columns(SurveyResponse)
+ANSWER_COLUMNS = ", ".join(model_columns(SurveyAnswer))
+
+survey_ws_connections = gauge("survey_ws_connections", "Open survey WebSocket connections in this worker")
+
 @router.post("/", response_model=SurveyBot)
 async def create_survey_bot(
     survey_bot: SurveyBotCreate,
     current_user: User = Depends(deps.get_current_user)
 ):
     supabase = get_supabase()
-    token = generate_unique_token()
+    token = generate_unique_token(survey_tokens)
 
-    # Create survey bot
+    # Ids are generated here, so both rows are fully built before the first write
+    survey_bot_id = str(uuid.uuid4())
     survey_bot_data = {
-        "id": str(uuid.uuid4()),
+        "id": survey_bot_id,
         "user_id": str(current_user.id),
         "name": survey_bot.name,
         "instructions": survey_bot.instructions,
+        "fast_mode": survey_bot.fast_mode,
+        "model_routing": survey_bot.model_routing.model_dump(exclude_none=True) if survey_bot.model_routing else None,
         "token": token
     }
-    survey_bot_response = supabase.table("survey_bots").insert(survey_bot_data).execute()
-    created_survey_bot = survey_bot_response.data[0]
-
-    # Create questions
     questions_data = [
         {
             "id": str(uuid.uuid4()),
-            "survey_bot_id": created_survey_bot["id"],
+            "survey_bot_id": survey_bot_id,
             "question_text": q.question_text,
             "question_type": q.question_type,
             "options": q.options,
@@ -47,47 +69,80 @@ async def create_survey_bot(
         }
         for q in survey_bot.questions
     ]
-    questions_response = supabase.table("survey_questions").insert(questions_data).execute()
-    created_questions = questions_response.data
+
+    # The questions reference the bot, so the two inserts stay ordered; the question rows
+    # are not read back since the response is built from what we sent
+    survey_bot_response = await run_in_threadpool(supabase.table("survey_bots").insert(survey_bot_data).execute)
+    created_survey_bot = survey_bot_response.data[0]
+    if questions_data:
+        try:
+            await run_in_threadpool(supabase.table("survey_questions").insert(questions_data, returning=ReturnMethod.minimal).execute)
+        except Exception:
+            # Do not leave a survey without its questions behind
+            await run_in_threadpool(supabase.table("survey_bots").delete().eq("id", survey_bot_id).execute)
+            raise
+    created_questions = questions_data
+    warm_greetings({**created_survey_bot, "questions": created_questions})
 
     return SurveyBot(
         id=created_survey_bot["id"],
         user_id=created_survey_bot["user_id"],
         name=created_survey_bot["name"],
         instructions=created_survey_bot["instructions"],
+        fast_mode=created_survey_bot.get("fast_mode", False),
+        model_routing=created_survey_bot.get("model_routing"),
         token=created_survey_bot["token"],
         questions=created_questions,
         created_at=created_survey_bot["created_at"],
         updated_at=created_survey_bot["updated_at"]
     )
 
-@router.get("/", response_model=List[SurveyBot])
-async def get_user_survey_bots(current_user: User = Depends(deps.get_current_user)):
-    supabase = get_supabase()
-    survey_bots_response = supabase.table("survey_bots").select("*").eq("user_id", current_user.id).execute()
-    survey_bots = survey_bots_response.data
+@router.get("/", response_model=List[partial_model(SurveyBot)], response_model_exclude_unset=True)
+async def get_user_survey_bots(
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return, e.g. id,name,token"),
+    page_size: int = Query(settings.LIST_PAGE_SIZE_DEFAULT, ge=1, le=settings.LIST_PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    current_user: User = Depends(deps.get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    supabase = loaders.supabase
+    try:
+        selected = parse_fields(SurveyBot, fields)
+        columns = [name for name in selected if name != "questions"]
+        survey_bots, next_cursor = fetch_page(supabase, "survey_bots", columns, {"user_id": current_user.id}, page_size, after)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    # Questions are only read when asked for
+    if "questions" in selected:
+        questions = loaders("survey_questions", "survey_bot_id", QUESTION_COLUMNS, many=True)
+        per_bot = await asyncio.gather(*(questions.load(survey_bot["id"]) for survey_bot in survey_bots))
+        for survey_bot, bot_questions in zip(survey_bots, per_bot):
+            survey_bot["questions"] = bot_questions
 
-    for survey_bot in survey_bots:
-        questions_response = supabase.table("survey_questions").select("*").eq("survey_bot_id", survey_bot["id"]).execute()
-        survey_bot["questions"] = questions_response.data
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
 
-    return [SurveyBot(**sb) for sb in survey_bots]
+    # Rows are validated against the response model once, by FastAPI, on the way out
+    return survey_bots
 
 @router.get("/{survey_bot_id}", response_model=SurveyBot)
-async def get_survey_bot(survey_bot_id: str, current_user: User = Depends(deps.get_current_user)):
-    supabase = get_supabase()
-    survey_bot_response = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
+async def get_survey_bot(survey_bot_id: str, current_user: User = Depends(deps.get_current_user),
+                         loaders: Loaders = Depends(get_loaders)):
+    # Both reads go out together; the questions are dropped if the owner check fails
+    survey_bot, questions = await asyncio.gather(
+        loaders("survey_bots", "id", SURVEY_BOT_COLUMNS).load(survey_bot_id),
+        loaders("survey_questions", "survey_bot_id", QUESTION_COLUMNS, many=True).load(survey_bot_id),
+    )
     
-    if not survey_bot_response.data:
+    if not survey_bot:
         raise HTTPException(status_code=404, detail="Survey bot not found")
     
-    survey_bot = survey_bot_response.data
-    
     if survey_bot["user_id"] != str(current_user.id):
         raise HTTPException(status_code=403, detail="Not authorized to access this survey bot")
 
-    questions_response = supabase.table("survey_questions").select("*").eq("survey_bot_id", survey_bot_id).execute()
-    survey_bot["questions"] = questions_response.data
+    survey_bot["questions"] = questions
 
     return SurveyBot(**survey_bot)
 
@@ -100,15 +155,22 @@ async def update_survey_bot(
     supabase = get_supabase()
     
     # Check if the survey bot exists and belongs to the current user
-    existing_survey_bot = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
+    existing_survey_bot = supabase.table("survey_bots").select("user_id, token").eq("id", survey_bot_id).single().execute()
     if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
         raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
 
     # Update survey bot
     survey_bot_data = {
         "name": survey_bot_update.name,
-        "instructions": survey_bot_update.instructions
+        "instructions": survey_bot_update.instructions,
+        "updated_at": datetime.now().isoformat(),
     }
+    if survey_bot_update.fast_mode is not None:
+        survey_bot_data["fast_mode"] = survey_bot_update.fast_mode
+    # Left as it is unless the update names it; an explicit null clears it
+    if "model_routing" in survey_bot_update.model_fields_set:
+        routing = survey_bot_update.model_routing
+        survey_bot_data["model_routing"] = routing.model_dump(exclude_none=True) if routing else None
     updated_survey_bot = supabase.table("survey_bots").update(survey_bot_data).eq("id", survey_bot_id).execute().data[0]
 
     # Update questions
@@ -146,7 +208,9 @@ async def update_survey_bot(
         supabase.table("survey_questions").delete().eq("id", question_id).execute()
 
     # Fetch updated questions
-    updated_questions = supabase.table("survey_questions").select("*").eq("survey_bot_id", survey_bot_id).execute().data
+    updated_questions = supabase.table("survey_questions").select(QUESTION_COLUMNS).eq("survey_bot_id", survey_bot_id).execute().data
+    survey_http_cache.invalidate_survey(existing_survey_bot.data["token"])
+    warm_greetings({**updated_survey_bot, "questions": updated_questions})
 
     return SurveyBot(
         **updated_survey_bot,
@@ -158,46 +222,158 @@ async def delete_survey_bot(survey_bot_id: str, current_user: User = Depends(dep
     supabase = get_supabase()
     
     # Check if the survey bot exists and belongs to the current user
-    existing_survey_bot = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
+    existing_survey_bot = supabase.table("survey_bots").select("user_id, token").eq("id", survey_bot_id).single().execute()
     if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
         raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
 
     # Delete the survey bot (this will cascade delete related questions, responses, and answers)
     supabase.table("survey_bots").delete().eq("id", survey_bot_id).execute()
+    survey_http_cache.invalidate_survey(existing_survey_bot.data["token"])
+    survey_tokens.remove(existing_survey_bot.data["token"])
 
 @router.get("/{survey_bot_id}/results", response_model=List[SurveyResult])
-async def get_survey_results(survey_bot_id: str, current_user: User = Depends(deps.get_current_user)):
-    supabase = get_supabase()
+async def get_survey_results(
+    survey_bot_id: str,
+    http_response: Response,
+    page_size: int = Query(settings.LIST_PAGE_SIZE_DEFAULT, ge=1, le=settings.LIST_PAGE_SIZE_MAX),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    current_user: User = Depends(deps.get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    supabase = loaders.supabase
     
     # Check if the survey bot exists and belongs to the current user
-    existing_survey_bot = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
+    existing_survey_bot = supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute()
     if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
         raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
 
-    # Fetch survey responses
-    responses = supabase.table("survey_responses").select("*").eq("survey_bot_id", survey_bot_id).execute().data
+    # Fetch one page of survey responses
+    try:
+        responses, next_cursor = fetch_page(supabase, "survey_responses", RESPONSE_COLUMNS, {"survey_bot_id": survey_bot_id}, page_size, after)
+    except InvalidQueryError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    answers = loaders("survey_answers", "survey_response_id", ANSWER_COLUMNS, many=True)
+    per_response = await asyncio.gather(*(answers.load(response["id"]) for response in responses))
+    results = [{"response": response, "answers": response_answers} for response, response_answers in zip(responses, per_response)]
 
-    results = []
-    for response in responses:
-        answers = supabase.table("survey_answers").select("*").eq("survey_response_id", response["id"]).execute().data
-        results.append(SurveyResult(response=response, answers=answers))
+    if next_cursor:
+        http_response.headers["X-Next-Cursor"] = next_cursor
 
     return results
 
-@router.get("/token/{token}", response_model=SurveyBot)
-async def get_survey_bot_by_token(token: str):
+@router.get("/{survey_bot_id}/export")
+async def export_survey_results(
+    survey_bot_id: str,
+    export_format: str = Query("csv", alias="format", pattern="^(csv|parquet|ndjson)$"),
+    current_user: User = Depends(deps.get_current_user)
+):
+    supabase = get_supabase()
+
+    # Check if the survey bot exists and belongs to the current user
+    existing_survey_bot = supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute()
+    if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
+    if export_format == "parquet" and not survey_export.parquet_available():
+        raise HTTPException(status_code=400, detail="Parquet export is not available on this server")
+
+    questions = (supabase.table("survey_questions").select("id, question_text, order_number")
+                 .eq("survey_bot_id", survey_bot_id).order("order_number").execute().data)
+
+    # Responses are read, pivoted and encoded one page at a time
+    return StreamingResponse(
+        survey_export.export_survey(supabase, survey_bot_id, questions, export_format),
+        media_type=survey_export.EXPORT_MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="survey-{survey_bot_id}.{export_format}"'},
+    )
+
+@router.get("/{survey_bot_id}/summary", response_model=SurveySummary)
+async def get_survey_summary(survey_bot_id: str, current_user: User = Depends(deps.get_current_user)):
+    supabase = get_supabase()
+
+    # Check if the survey bot exists and belongs to the current user
+    existing_survey_bot = supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute()
+    if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
+
+    # Counters are kept up to date on every recorded response, so this reads
+    # one aggregate row and the questions instead of every response and answer
+    questions = supabase.table("survey_questions").select(QUESTION_COLUMNS).eq("survey_bot_id", survey_bot_id).execute().data
+    questions = sorted(questions, key=lambda x: x["order_number"])
+    counters = await run_in_threadpool(survey_aggregates.get_counters, survey_bot_id)
+
+    return SurveySummary(**survey_aggregates.build_summary(survey_bot_id, counters, questions))
+
+@router.post("/{survey_bot_id}/interpretations", response_model=InterpretationJobStatus, status_code=202)
+async def interpret_survey_responses(
+    survey_bot_id: str,
+    interpretation_request: Optional[InterpretationRequest] = Body(None),
+    current_user: User = Depends(deps.get_current_user)
+):
     supabase = get_supabase()
-    survey_bot_response = supabase.table("survey_bots").select("*").eq("token", token).single().execute()
+
+    # Check if the survey bot exists and belongs to the current user
+    existing_survey_bot = await run_in_threadpool(
+        supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute)
+    if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
+
+    # Without a body, every response of the survey with uninterpreted answers is picked up
+    requested = interpretation_request.response_ids if interpretation_request else None
+    response_ids = await run_in_threadpool(select_response_ids, survey_bot_id, requested)
+
+    job = interpretation_queue.enqueue(survey_bot_id, response_ids)
+    return InterpretationJobStatus(**job.to_dict())
+
+@router.get("/{survey_bot_id}/interpretations/{job_id}", response_model=InterpretationJobStatus)
+async def get_interpretation_job(survey_bot_id: str, job_id: str, current_user: User = Depends(deps.get_current_user)):
+    job = interpretation_queue.get(job_id)
+    # Jobs live in the worker that accepted them
+    if job is None or job.survey_bot_id != survey_bot_id:
+        raise HTTPException(status_code=404, detail="Interpretation job not found")
+
+    supabase = get_supabase()
+    existing_survey_bot = supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute()
+    if not existing_survey_bot.data or existing_survey_bot.data["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Interpretation job not found")
+
+    return InterpretationJobStatus(**job.to_dict())
+
+@router.get("/token/{token}", response_model=PublicSurveyBot)
+async def get_survey_bot_by_token(token: str, request: Request):
+    if_none_match = request.headers.get("if-none-match")
+
+    # Hot surveys are answered from the rendered cache without touching the database
+    cached = survey_http_cache.rendered_surveys.get(token)
+    if cached is not None:
+        etag, body = cached
+        if survey_http_cache.etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=survey_http_cache.cache_headers(etag))
+        return Response(content=body, media_type="application/json", headers=survey_http_cache.cache_headers(etag))
+
+    # Unknown tokens (scrapers, stale links) stop here without a database read
+    if not await survey_tokens.admit(token):
+        raise HTTPException(status_code=404, detail="Survey bot not found")
+
+    supabase = get_supabase()
+    survey_bot_response = supabase.table("survey_bots").select(", ".join(PUBLIC_SURVEY_BOT_COLUMNS)).eq("token", token).execute()
     
     if not survey_bot_response.data:
+        survey_tokens.note_missing(token)
         raise HTTPException(status_code=404, detail="Survey bot not found")
     
-    survey_bot = survey_bot_response.data
+    survey_bot = survey_bot_response.data[0]
     
-    questions_response = supabase.table("survey_questions").select("*").eq("survey_bot_id", survey_bot["id"]).execute()
-    survey_bot["questions"] = questions_response.data
+    questions_response = supabase.table("survey_questions").select(QUESTION_COLUMNS).eq("survey_bot_id", survey_bot["id"]).execute()
+    # A fixed question order keeps the body, and so the ETag, stable across reads
+    survey_bot["questions"] = sorted(questions_response.data, key=lambda q: (q["order_number"], q["id"]))
+    body = PublicSurveyBot(**survey_bot).model_dump_json().encode()
+    etag = survey_http_cache.compute_etag(body)
+    survey_http_cache.rendered_surveys.set(token, (etag, body))
+    if survey_http_cache.etag_matches(if_none_match, etag):
+        return Response(status_code=304, headers=survey_http_cache.cache_headers(etag))
 
-    return SurveyBot(**survey_bot)
+    return Response(content=body, media_type="application/json", headers=survey_http_cache.cache_headers(etag))
 
 
 @router.post("/{survey_bot_id}/submit", status_code=204)
@@ -209,7 +385,7 @@ async def submit_survey(
     supabase = get_supabase()
 
     # Retrieve the survey bot to ensure it exists and belongs to the user
-    survey_bot_response = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
+    survey_bot_response = supabase.table("survey_bots").select("user_id").eq("id", survey_bot_id).single().execute()
     if not survey_bot_response.data or survey_bot_response.data["user_id"] != str(current_user.id):
         raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
 
@@ -253,79 +429,228 @@ async def submit_survey(
         logging.error(f"Error while creating survey answers: {e}")
         raise HTTPException(status_code=400, detail="Error while creating survey answers")
 
+    questions = supabase.table("survey_questions").select("id, options").eq("survey_bot_id", survey_bot_id).execute().data
+    await survey_aggregates.record_response(survey_bot_id, questions, survey_response, completed=True, started=True)
+
     return
 
+@router.post("/{survey_bot_id}/submit/bulk", response_model=BulkSurveySubmitResult)
+async def submit_survey_bulk(
+    survey_bot_id: str,
+    bulk_request: BulkSurveySubmitRequest,
+    current_user: User = Depends(deps.get_current_user)
+):
+    """
+    Submit many collected responses at once (e.g. an offline tablet syncing).
+
+    Each response is validated against the survey's questions and reported on
+    individually; valid ones are written with a few chunked inserts. Responses
+    with an idempotency_key already stored come back as "duplicate", so a sync
+    can be retried safely.
+    """
+    if len(bulk_request.responses) > settings.BULK_SUBMIT_MAX_RESPONSES:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_SUBMIT_MAX_RESPONSES} responses per request")
+
+    # One question set for the whole batch, shared with concurrent loads of the same survey
+    survey_bot = await load_survey_bot(survey_bot_id)
+    if survey_bot is None or survey_bot["user_id"] != str(current_user.id):
+        raise HTTPException(status_code=404, detail="Survey bot not found or not authorized")
+
+    supabase = get_supabase()
+    results = await run_in_threadpool(survey_submissions.submit_bulk, supabase, survey_bot_id,
+                                      survey_bot["questions"], bulk_request.responses)
+
+    created = [result for result in results if result.status == "created"]
+    if created:
+        interpretation_queue.enqueue(survey_bot_id, [result.response_id for result in created])
+        await survey_aggregates.record_responses(
+            survey_bot_id, survey_bot["questions"],
+            [(bulk_request.responses[result.index].answers, bulk_request.responses[result.index].completed) for result in created],
+            started=True,
+        )
+
+    counts = {status: sum(1 for result in results if result.status == status) for status in ("created", "duplicate", "invalid", "failed")}
+    logging.info(f"Bulk submission to survey {survey_bot_id}: {counts}")
+    return BulkSurveySubmitResult(
+        created=counts["created"],
+        duplicates=counts["duplicate"],
+        invalid=counts["invalid"],
+        failed=counts["failed"],
+        results=results,
+    )
+
+def _insert_survey_response(survey_bot: dict, full_conversation: List[dict], raw_answers: dict, respondent_id: Optional[str]) -> str:
+    supabase = get_supabase()
+    survey_response_data = {
+        "id": str(uuid.uuid4()),
+        "survey_bot_id": survey_bot['id'],
+        "respondent_id": respondent_id,
+        "completed": True,
+        "created_at": datetime.now().isoformat(),
+        "updated_at": datetime.now().isoformat(),
+    }
+    response = supabase.table("survey_responses").insert(survey_response_data).execute()
+    created_response_id = response.data[0]["id"]
+
+    # Save the full conversation
+    supabase.table("survey_conversations").insert({
+        "survey_response_id": created_response_id,
+        "conversation": full_conversation,
+    }).execute()
+
+    # Save the answers in one insert; interpretations are filled in by a background job
+    answers_data = []
+    for question in survey_bot['questions']:
+        answers_data.append({
+            "id": str(uuid.uuid4()),
+            "survey_response_id": created_response_id,
+            "question_id": question['id'],
+            "question_text": question['question_text'],
+            "raw_answer": raw_answers.get(question['id'], ""),
+            "ai_interpretation": None,
+            "created_at": datetime.now().isoformat(),
+            "updated_at": datetime.now().isoformat(),
+        })
+    supabase.table("survey_answers").insert(answers_data).execute()
+    return created_response_id
+
+async def _save_survey_response(survey_bot: dict, full_conversation: List[dict], raw_answers: dict, respondent_id: Optional[str]):
+    """
+    Persist a completed survey conversation: the response, its transcript and its raw answers.
+    """
+    created_response_id = await run_in_threadpool(_insert_survey_response, survey_bot, full_conversation, raw_answers, respondent_id)
+    interpretation_queue.enqueue(survey_bot['id'], [created_response_id])
+    await survey_aggregates.record_response(survey_bot['id'], survey_bot['questions'], raw_answers)
+
 @router.post("/{survey_bot_id}/chat")
 async def chat_with_survey_bot(
     survey_bot_id: str,
     message: dict = Body(...),
 ):
     try:
-        supabase = get_supabase()
-        
-        # Retrieve the survey bot
-        survey_bot_response = supabase.table("survey_bots").select("*").eq("id", survey_bot_id).single().execute()
-        if not survey_bot_response.data:
+        # Retrieve the survey bot and its questions (shared with concurrent requests for the same bot)
+        survey_bot = await load_survey_bot(survey_bot_id)
+        if survey_bot is None:
             raise HTTPException(status_code=404, detail="Survey bot not found")
 
-        survey_bot = survey_bot_response.data
-        
-        # Retrieve the questions for this survey bot
-        questions_response = supabase.table("survey_questions").select("*").eq("survey_bot_id", survey_bot_id).execute()
-        survey_bot["questions"] = sorted(questions_response.data, key=lambda x: x["order_number"])
-
         # Create a SurveyBotService instance
         survey_bot_service = SurveyBotService(survey_bot)
 
         # Process the user's message and get a response
         conversation = message.get("conversation", [])
+        if not conversation:
+            await survey_aggregates.record_started(survey_bot_id)
         response = await survey_bot_service.get_response(message["message"], conversation)
 
         # Check if the survey is complete
         if survey_bot_service.current_question_index >= len(survey_bot['questions']):
-            # Save the survey results
             survey_results = survey_bot_service.get_survey_results()
-            
-            # Create a new survey response
-            survey_response_data = {
-                "id": str(uuid.uuid4()),
-                "survey_bot_id": survey_bot_id,
-                "respondent_id": message.get("respondent_id"),  # You might want to pass this from the frontend
-                "completed": True,
-                "created_at": datetime.now().isoformat(),
-                "updated_at": datetime.now().isoformat(),
-            }
-            response = supabase.table("survey_responses").insert(survey_response_data).execute()
-            created_response_id = response.data[0]["id"]
-
-            # Save the full conversation
-            conversation_data = {
-                "survey_response_id": created_response_id,
-                "conversation": survey_results['full_conversation'],
-            }
-            supabase.table("survey_conversations").insert(conversation_data).execute()
-
-            # Save the answers with more detail
-            for question in survey_bot['questions']:
-                question_id = question['id']
-                raw_answer = survey_results['raw_answers'].get(question_id, "")
-                interpretation = survey_results['interpreted_answers'].get(question_id, "")
-                
-                answer_data = {
-                    "id": str(uuid.uuid4()),
-                    "survey_response_id": created_response_id,
-                    "question_id": question_id,
-                    "question_text": question['question_text'],
-                    "raw_answer": raw_answer,
-                    "ai_interpretation": interpretation,
-                    "created_at": datetime.now().isoformat(),
-                    "updated_at": datetime.now().isoformat(),
-                }
-                supabase.table("survey_answers").insert(answer_data).execute()
+            await _save_survey_response(survey_bot, survey_results['full_conversation'],
+                                        survey_results['raw_answers'], message.get("respondent_id"))
 
         response = await survey_bot_service.get_response(message["message"], conversation)
 
         return {"message": response}
     except Exception as e:
         logging.error(f"Error in chat_with_survey_bot: {e}")
-        return {"message": "An error occurred while processing your request"}
\ No newline at end of file
+        return {"message": "An error occurred while processing your request"}
+
+@router.websocket("/{token}/ws")
+async def survey_websocket(websocket: WebSocket, token: str, respondent_id: Optional[str] = None):
+    """
+    Conduct a survey over one WebSocket connection. The survey is loaded once and the
+    conversation state lives in the connection, so turns carry only the new message.
+
+    Client frames: {"type": "message", "content": "..."}, {"type": "ping"}, {"type": "pong"}.
+    Server frames: {"type": "token", "content": "..."} as a reply streams, then
+    {"type": "message", "content": "..."} with the whole reply; {"type": "ping"}
+    heartbeats; {"type": "error", "detail": "..."}; and {"type": "complete"} once the
+    response is saved, after which the server closes the connection.
+    """
+    if survey_ws_connections.value() >= settings.SURVEY_WS_MAX_CONNECTIONS:
+        await websocket.close(code=status.WS_1013_TRY_AGAIN_LATER)
+        return
+    # The slot is taken before anything is awaited, so connections opening together cannot all pass the check
+    survey_ws_connections.inc()
+    try:
+        survey_bot = await load_survey_bot_by_token(token)
+        if survey_bot is None:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION, reason="Survey bot not found")
+            return
+
+        await websocket.accept()
+        await _run_survey_connection(websocket, survey_bot, respondent_id)
+    except WebSocketDisconnect:
+        logging.info(f"Survey WebSocket for token {token} closed by the respondent")
+    except Exception as e:
+        logging.error(f"Error in survey WebSocket for token {token}: {e}", exc_info=True)
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+    finally:
+        survey_ws_connections.inc(-1)
+
+async def _run_survey_connection(websocket: WebSocket, survey_bot: dict, respondent_id: Optional[str]):
+    survey_bot_service = SurveyBotService(survey_bot)
+
+    async def send_token(text: str):
+        await websocket.send_json({"type": "token", "content": text})
+    survey_bot_service.on_token = send_token
+
+    await survey_aggregates.record_started(survey_bot['id'])
+    try:
+        greeting = await survey_bot_service.next_turn()
+    except Exception as e:
+        # Without a greeting there is no conversation to continue
+        logging.error(f"Failed to start survey conversation for {survey_bot['id']}: {e}", exc_info=True)
+        await websocket.send_json({"type": "error", "detail": "Could not start the survey, please try again later"})
+        await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
+        return
+    await websocket.send_json({"type": "message", "content": greeting})
+
+    # Any frame proves the connection is alive; only messages count as respondent activity
+    last_frame = last_message = time.monotonic()
+    while True:
+        try:
+            frame = await asyncio.wait_for(websocket.receive_text(), timeout=settings.SURVEY_WS_HEARTBEAT_SECONDS)
+        except asyncio.TimeoutError:
+            now = time.monotonic()
+            if now - last_message >= settings.SURVEY_WS_IDLE_TIMEOUT_SECONDS:
+                await websocket.close(code=status.WS_1000_NORMAL_CLOSURE, reason="Idle timeout")
+                return
+            if now - last_frame >= 2 * settings.SURVEY_WS_HEARTBEAT_SECONDS:
+                await websocket.close(code=status.WS_1001_GOING_AWAY, reason="Heartbeat timeout")
+                return
+            await websocket.send_json({"type": "ping"})
+            continue
+
+        last_frame = time.monotonic()
+        try:
+            data = json.loads(frame)
+        except ValueError:
+            data = None
+        kind = data.get("type") if isinstance(data, dict) else None
+        if kind == "ping":
+            await websocket.send_json({"type": "pong"})
+            continue
+        if kind == "pong":
+            continue
+
+        content = data.get("content") if kind == "message" else None
+        if not isinstance(content, str) or not content.strip():
+            await websocket.send_json({"type": "error", "detail": 'Expected {"type": "message", "content": "..."}'})
+            continue
+        if len(content) > settings.SURVEY_WS_MAX_MESSAGE_CHARS:
+            await websocket.send_json({"type": "error", "detail": f"Messages are limited to {settings.SURVEY_WS_MAX_MESSAGE_CHARS} characters"})
+            continue
+
+        last_message = last_frame
+        reply = await survey_bot_service.next_turn(content)
+        await websocket.send_json({"type": "message", "content": reply})
+
+        state = survey_bot_service.state
+        if state['survey_complete'] and state['current_question_index'] >= len(survey_bot['questions']):
+            # Saved once, from the state the connection kept
+            await _save_survey_response(survey_bot, survey_bot_service.full_conversation,
+                                        survey_bot_service.state['answers'], respondent_id)
+            await websocket.send_json({"type": "complete"})
+            await websocket.close(code=status.WS_1000_NORMAL_CLOSURE)
+            return
@@ -0,0 +1,146 @@
+# backend/app/core/compression.py
+
+import gzip
+import logging
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; without it only gzip is offered
+    brotli = None
+
+# Already-compressed formats gain nothing from another pass
+_INCOMPRESSIBLE_PREFIXES = ("image/", "video/", "audio/", "application/zip", "application/gzip",
+                            "application/x-gzip", "application/octet-stream", "application/vnd.apache.parquet")
+
+
+def _parse_accept_encoding(header: str) -> dict:
+    encodings = {}
+    for part in header.split(","):
+        if not part.strip():
+            continue
+        name, _, params = part.strip().partition(";")
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        encodings[name.strip().lower()] = quality
+    return encodings
+
+
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    """
+    Pick "br" or "gzip" from an Accept-Encoding header, preferring brotli when available.
+    """
+    encodings = _parse_accept_encoding(accept_encoding or "")
+    wildcard = encodings.get("*", 0.0)
+    candidates = (["br"] if brotli is not None else []) + ["gzip"]
+    best, best_quality = None, 0.0
+    for name in candidates:
+        quality = encodings.get(name, wildcard)
+        if quality > best_quality:
+            best, best_quality = name, quality
+    return best
+
+
+def compress(body: bytes, encoding: str, gzip_level: int, brotli_quality: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=brotli_quality)
+    return gzip.compress(body, compresslevel=gzip_level)
+
+
+class CompressionMiddleware:
+    """
+    ASGI middleware compressing complete responses above ``minimum_size`` bytes
+    with brotli or gzip, as negotiated with the client.
+
+    Streaming responses (NDJSON, exports) are passed through untouched so each
+    chunk still reaches the client as soon as it is produced.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024, gzip_level: int = 6, brotli_quality: int = 4,
+                 threadpool_min_size: int = 64 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        # Bodies this large take milliseconds to compress and would stall every
+        # other request on the worker, so they are compressed in the threadpool
+        self.threadpool_min_size = threadpool_min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope.get("headers", [])}
+        encoding = negotiate_encoding(headers.get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                # Hold the start until we know whether the body is complete and large enough
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            response_headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in start_message.get("headers", [])}
+            content_type = response_headers.get("content-type", "")
+            if (message.get("more_body", False)
+                    or len(body) < self.minimum_size
+                    or "content-encoding" in response_headers
+                    or start_message["status"] in (204, 304)
+                    or content_type.startswith(_INCOMPRESSIBLE_PREFIXES)):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            try:
+                if len(body) >= self.threadpool_min_size:
+                    compressed = await run_in_threadpool(compress, body, encoding, self.gzip_level, self.brotli_quality)
+                else:
+                    compressed = compress(body, encoding, self.gzip_level, self.brotli_quality)
+            except Exception as e:
+                logging.error(f"Response compression failed, sending uncompressed: {e}")
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            new_headers = [(key, value) for key, value in start_message.get("headers", [])
+                           if key.decode("latin-1").lower() not in ("content-length", "vary", "etag")]
+            etag = response_headers.get("etag")
+            if etag and etag.endswith('"') and not etag.startswith("W/"):
+                # A strong validator must differ per representation
+                new_headers.append((b"etag", f'{etag[:-1]}-{encoding}"'.encode("latin-1")))
+            elif etag:
+                new_headers.append((b"etag", etag.encode("latin-1")))
+            vary = response_headers.get("vary")
+            new_headers += [
+                (b"content-encoding", encoding.encode("latin-1")),
+                (b"content-length", str(len(compressed)).encode("latin-1")),
+                (b"vary", (f"{vary}, Accept-Encoding" if vary else "Accept-Encoding").encode("latin-1")),
+            ]
+            await send({**start_message, "headers": new_headers})
+            await send({"type": "http.response.body", "body": compressed, "more_body": False})
+
+        await self.app(scope, receive, send_wrapper)
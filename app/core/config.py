@@ -2,7 +2,7 @@
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import AnyHttpUrl
-from typing import List
+from typing import List, Optional
 
 class Settings(BaseSettings):
     SUPABASE_URL: str
@@ -14,6 +14,139 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Document parsing
+    PDF_PARSE_WORKERS: int = 2
+    PDF_PARSE_TIMEOUT_SECONDS: float = 30.0
+    PDF_MAX_PAGES: int = 300
+    PDF_MAX_BYTES: int = 20 * 1024 * 1024
+
+    # Document digests built at upload time
+    # "digest" answers from stored digests, "full" always sends the extracted text
+    DOCUMENT_CONTEXT_MODE: str = "digest"
+    DIGEST_MODEL: str = "gpt-4o-mini"
+    DIGEST_MAX_TOKENS: int = 800
+    DIGEST_CHUNK_TOKENS: int = 3000
+    DIGEST_FULL_TEXT_MAX_TOKENS: int = 2000
+    DIGEST_CONCURRENCY: int = 4
+
+    # In-process caches (per worker)
+    CHATBOT_CACHE_TTL_SECONDS: float = 60.0
+    CHATBOT_CACHE_SIZE: int = 1024
+
+    # Extracted document text, stored on local disk per chatbot and read through mmap
+    # (defaults to a directory under the system temp dir, shared by the workers on a host)
+    DOCUMENT_STORE_DIR: Optional[str] = None
+    # Mapped store files each worker keeps open; least recently used chatbots are unmapped first
+    DOCUMENT_STORE_RESIDENT_BYTES: int = 256 * 1024 * 1024
+
+    # Public chatbot conversation memory (per worker)
+    # Longest message a public chat accepts, in characters
+    CHAT_MESSAGE_MAX_CHARS: int = 8000
+    CONVERSATION_MAX_TURNS: int = 20
+    CONVERSATION_HISTORY_TOKENS: int = 1500
+    CONVERSATION_IDLE_TTL_SECONDS: float = 1800.0
+    CONVERSATION_MEMORY_BYTES: int = 32 * 1024 * 1024
+    # Set to a file path to keep conversations across worker restarts
+    CONVERSATION_SQLITE_PATH: Optional[str] = None
+
+    # Owner batch chat evaluation
+    BATCH_CHAT_MAX_MESSAGES: int = 100
+    BATCH_CHAT_MAX_CONCURRENCY: int = 4
+
+    # Deferred survey answer interpretation
+    INTERPRETATION_MODEL: str = "gpt-4o-mini"
+    INTERPRETATION_BATCH_SIZE: int = 50
+    INTERPRETATION_WORKERS: int = 1
+
+    # Survey fast mode (templated turns); enabled per survey with survey_bots.fast_mode
+    SURVEY_FAST_MODE_VARIATION: bool = True
+
+    # Pre-generated survey greetings, per survey version and worker
+    SURVEY_GREETING_POOL_SIZE: int = 3
+    SURVEY_GREETING_CACHE_SIZE: int = 1024
+    SURVEY_GREETING_CACHE_TTL_SECONDS: float = 86400.0
+
+    # Survey WebSocket conversations (/surveybots/{token}/ws), per worker
+    SURVEY_WS_MAX_CONNECTIONS: int = 1000
+    SURVEY_WS_HEARTBEAT_SECONDS: float = 20.0
+    # Closed after this long without a respondent message, heartbeats notwithstanding
+    SURVEY_WS_IDLE_TIMEOUT_SECONDS: float = 600.0
+    SURVEY_WS_MAX_MESSAGE_CHARS: int = 4000
+
+    # Public survey definition (GET /surveybots/token/{token}) caching
+    SURVEY_PUBLIC_CACHE_CONTROL: str = "public, max-age=60, stale-while-revalidate=300"
+    SURVEY_PUBLIC_CACHE_TTL_SECONDS: float = 300.0
+    SURVEY_PUBLIC_CACHE_SIZE: int = 1024
+
+    # Response compression (brotli when installed, else gzip)
+    COMPRESSION_MIN_BYTES: int = 1024
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 4
+    # Larger bodies are compressed off the event loop
+    COMPRESSION_THREADPOOL_MIN_BYTES: int = 65536
+
+    # Keyset pagination of list endpoints (next page cursor in X-Next-Cursor)
+    LIST_PAGE_SIZE_DEFAULT: int = 50
+    LIST_PAGE_SIZE_MAX: int = 200
+
+    # Concurrent document uploads to Supabase storage per request
+    UPLOAD_CONCURRENCY: int = 4
+
+    # Model call deadlines, retries, hedging and circuit breaking (app/services/model_calls.py)
+    MODEL_CHAT_DEADLINE_SECONDS: float = 30.0
+    MODEL_SURVEY_DEADLINE_SECONDS: float = 20.0
+    MODEL_BATCH_DEADLINE_SECONDS: float = 60.0
+    MODEL_ATTEMPT_TIMEOUT_SECONDS: float = 15.0
+    MODEL_MAX_ATTEMPTS: int = 3
+    MODEL_RETRY_BACKOFF_BASE_SECONDS: float = 0.25
+    MODEL_RETRY_BACKOFF_MAX_SECONDS: float = 4.0
+    MODEL_HEDGE_ENABLED: bool = True
+    MODEL_HEDGE_MIN_DELAY_SECONDS: float = 1.0
+    MODEL_CIRCUIT_FAILURE_THRESHOLD: int = 5
+    MODEL_CIRCUIT_RESET_SECONDS: float = 30.0
+
+    # Model routing defaults; bots override them with their model_routing policy
+    MODEL_SMALL: str = "gpt-4o-mini"
+    MODEL_LARGE: str = "gpt-4o"
+    # Models a model_routing policy may name; MODEL_SMALL and MODEL_LARGE are always allowed
+    MODEL_ALLOWED: List[str] = ["gpt-4o-mini", "gpt-4o"]
+    # Simple turns with a longer estimated prompt than this still go to the large model
+    MODEL_SMALL_MAX_CONTEXT_TOKENS: int = 8000
+    # Latency budgets compare against the large model's p95 over this window
+    MODEL_ROUTING_LATENCY_WINDOW_SECONDS: float = 300.0
+
+    # Rendered system prompts, cached per bot version so every turn sends the same prefix bytes
+    PROMPT_CACHE_SIZE: int = 1024
+    PROMPT_CACHE_TTL_SECONDS: float = 3600.0
+
+    # Bulk survey submission (POST /surveybots/{id}/submit/bulk)
+    BULK_SUBMIT_MAX_RESPONSES: int = 1000
+    # Rows per insert request into survey_responses / survey_answers
+    BULK_SUBMIT_CHUNK_ROWS: int = 500
+
+    # Survey exports read this many responses per page (one chunk of output each)
+    EXPORT_PAGE_SIZE: int = 500
+
+    # Bearer token for /metrics and /debug/event-loop; both answer 404 while it is unset
+    OPS_TOKEN: Optional[str] = None
+
+    # Event loop blocking detector (diagnostics; report at /debug/event-loop)
+    LOOP_MONITOR_ENABLED: bool = False
+    LOOP_MONITOR_INTERVAL_SECONDS: float = 0.05
+    # A callback that keeps the loop busy longer than this is captured and reported
+    LOOP_MONITOR_THRESHOLD_SECONDS: float = 0.1
+    LOOP_MONITOR_MAX_SITES: int = 200
+
+    # Per-worker filters of valid public tokens, so unknown tokens get a 404 without a database read
+    PUBLIC_TOKEN_FILTER_ENABLED: bool = True
+    PUBLIC_TOKEN_FILTER_ERROR_RATE: float = 0.001
+    PUBLIC_TOKEN_FILTER_MIN_CAPACITY: int = 10000
+    PUBLIC_TOKEN_REBUILD_SECONDS: float = 600.0
+    # Tokens the filter does not know trigger a read of newly created rows at most this often
+    PUBLIC_TOKEN_MISS_REFRESH_SECONDS: float = 0.5
+    PUBLIC_TOKEN_NEGATIVE_CACHE_SIZE: int = 100000
+    PUBLIC_TOKEN_NEGATIVE_CACHE_TTL_SECONDS: float = 60.0
+
     # CORS origins
     BACKEND_CORS_ORIGINS: List[AnyHttpUrl] = []
 
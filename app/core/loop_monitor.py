@@ -0,0 +1,205 @@
+# backend/app/core/loop_monitor.py
+
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from typing import Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import counter, histogram
+
+# Opt-in (LOOP_MONITOR_ENABLED) detector for code that blocks the event loop.
+#
+# A heartbeat task on the loop wakes up every ``interval`` seconds and records how
+# late it woke (the loop's lag). A watchdog thread checks the heartbeat; when it
+# has not run for ``threshold`` seconds past its interval, the loop thread is stuck
+# in one callback, and the watchdog captures that thread's stack right then. The
+# stack is attributed to a route by walking out to the ASGI frame holding the
+# request ``scope``, and to a site: the innermost frame in this app's code. When
+# the loop wakes again the heartbeat records how long the block lasted.
+
+_APP_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+_STACK_DEPTH = 30
+
+event_loop_lag_seconds = histogram("event_loop_lag_seconds", "How late the event loop heartbeat woke up",
+                                   buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0))
+event_loop_blocks_total = counter("event_loop_blocks_total", "Event loop blocks over the threshold by route and site")
+event_loop_blocked_seconds_total = counter("event_loop_blocked_seconds_total", "Seconds the event loop spent blocked by route")
+
+
+def _route_of(frame) -> str:
+    while frame is not None:
+        if "scope" in frame.f_code.co_varnames:
+            scope = frame.f_locals.get("scope")
+            if isinstance(scope, dict) and scope.get("type") in ("http", "websocket"):
+                route = scope.get("route")
+                path = getattr(route, "path", None) or scope.get("path", "?")
+                return f"{scope.get('method', 'WS')} {path}"
+        frame = frame.f_back
+    return "<background>"
+
+
+def _site_of(stack: traceback.StackSummary) -> str:
+    # The innermost frame in our code is the line that made the blocking call
+    for entry in reversed(stack):
+        if entry.filename.startswith(_APP_ROOT) and not entry.filename.endswith("loop_monitor.py"):
+            return f"{os.path.relpath(entry.filename, os.path.dirname(_APP_ROOT))}:{entry.lineno} {entry.name}"
+    entry = stack[-1]
+    return f"{entry.filename}:{entry.lineno} {entry.name}"
+
+
+class BlockingSite:
+    """Blocks seen at one (route, site), with a sample stack."""
+
+    __slots__ = ("route", "site", "count", "total_seconds", "max_seconds", "last_seen", "stack")
+
+    def __init__(self, route: str, site: str, stack: List[str]):
+        self.route = route
+        self.site = site
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.last_seen = 0.0
+        self.stack = stack
+
+    def to_dict(self) -> dict:
+        return {
+            "route": self.route,
+            "site": self.site,
+            "count": self.count,
+            "total_seconds": round(self.total_seconds, 4),
+            "max_seconds": round(self.max_seconds, 4),
+            "last_seen": self.last_seen,
+            "stack": self.stack,
+        }
+
+
+class LoopMonitor:
+    """
+    Event-loop lag watchdog for one worker; see the module comment.
+    """
+
+    def __init__(self, interval: float, threshold: float, max_sites: int):
+        """
+        Initialize the monitor.
+
+        Args:
+            interval (float): Seconds between heartbeats.
+            threshold (float): A heartbeat this many seconds late counts as a block.
+            max_sites (int): Distinct (route, site) pairs kept in the report.
+        """
+        self.interval = interval
+        self.threshold = threshold
+        self.max_sites = max_sites
+        self.sites: Dict[Tuple[str, str], BlockingSite] = {}
+        self._lock = threading.Lock()
+        self._loop_thread_id: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._captured_beat: Optional[float] = None
+        self._pending: Optional[Tuple[float, str, str, List[str]]] = None
+        self._task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    def start(self):
+        """
+        Start the heartbeat on the running loop and the watchdog thread.
+        """
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._thread = threading.Thread(target=self._watch, name="loop-monitor", daemon=True)
+        self._thread.start()
+        logging.info(f"Event loop monitor started (interval {self.interval}s, threshold {self.threshold}s)")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._stopped.set()
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        self._thread.join(timeout=1)
+        self._thread = None
+
+    async def _heartbeat(self):
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = max(0.0, now - started - self.interval)
+            event_loop_lag_seconds.observe(lag)
+            previous, self._last_beat = self._last_beat, now
+            with self._lock:
+                pending, self._pending = self._pending, None
+            # Only a capture of the stall this heartbeat is returning from counts; one
+            # taken against an older beat saw whatever ran after the loop woke up
+            if pending is not None and pending[0] == previous:
+                self._record(*pending, seconds=lag)
+
+    def _watch(self):
+        while not self._stopped.wait(self.interval / 2):
+            beat = self._last_beat
+            if time.monotonic() - beat < self.interval + self.threshold or self._captured_beat == beat:
+                continue
+            # One capture per stall: the loop has not come back since ``beat``
+            self._captured_beat = beat
+            frame = sys._current_frames().get(self._loop_thread_id)
+            if frame is None:
+                continue
+            try:
+                stack = traceback.extract_stack(frame, limit=_STACK_DEPTH)
+                route = _route_of(frame)
+            finally:
+                del frame
+            with self._lock:
+                self._pending = (beat, route, _site_of(stack), stack.format())
+
+    def _record(self, beat: float, route: str, site: str, stack: List[str], seconds: float):
+        logging.warning(f"Event loop blocked for {seconds * 1000:.0f} ms in {route} at {site}")
+        key = (route, site)
+        entry = self.sites.get(key)
+        if entry is None and len(self.sites) >= self.max_sites:
+            # Past the cap new sites are only counted, under one label set
+            event_loop_blocks_total.inc(route="<other>", site="<other>")
+            event_loop_blocked_seconds_total.inc(seconds, route="<other>")
+            return
+        event_loop_blocks_total.inc(route=route, site=site)
+        event_loop_blocked_seconds_total.inc(seconds, route=route)
+        if entry is None:
+            entry = self.sites[key] = BlockingSite(route, site, stack)
+        entry.count += 1
+        entry.total_seconds += seconds
+        entry.max_seconds = max(entry.max_seconds, seconds)
+        entry.last_seen = time.time()
+
+    def report(self) -> dict:
+        """
+        Blocking sites seen so far, worst (most total blocked time) first.
+        """
+        sites = sorted(self.sites.values(), key=lambda entry: entry.total_seconds, reverse=True)
+        return {
+            "interval_seconds": self.interval,
+            "threshold_seconds": self.threshold,
+            "sites": [entry.to_dict() for entry in sites],
+        }
+
+
+loop_monitor = LoopMonitor(
+    interval=settings.LOOP_MONITOR_INTERVAL_SECONDS,
+    threshold=settings.LOOP_MONITOR_THRESHOLD_SECONDS,
+    max_sites=settings.LOOP_MONITOR_MAX_SITES,
+)
@@ -0,0 +1,147 @@
+# backend/app/db/loader.py
+
+import asyncio
+import logging
+from typing import Dict, Hashable, Iterable, List, Optional, Sequence, Tuple, Union
+from fastapi.concurrency import run_in_threadpool
+from app.core.metrics import counter
+from app.db.session import get_supabase
+
+# DataLoader-style batching for point reads within one request. Every load() made
+# in the same event-loop tick (e.g. from an asyncio.gather over a page of rows) is
+# answered by one "in" query per table, repeated keys are fetched once, and results
+# are remembered for the rest of the request. Handlers keep a per-item style:
+#
+#     answers = loaders("survey_answers", "survey_response_id", ANSWER_COLUMNS, many=True)
+#     per_response = await asyncio.gather(*(answers.load(r["id"]) for r in responses))
+
+# PostgREST limits: ids per "in" filter (URL length) and rows per response (db-max-rows)
+_IN_CHUNK = 100
+_MAX_ROWS_PER_REQUEST = 1000
+
+loader_batches_total = counter("db_loader_batches_total", "Batched point-read queries by table")
+loader_keys_total = counter("db_loader_keys_total", "Keys requested through data loaders by table and outcome (fetched, memoized)")
+
+
+class DataLoader:
+    """
+    Batches and memoizes lookups of ``table`` rows by ``key_column``.
+
+    With ``many`` a key maps to the list of rows that have it (e.g. questions by
+    survey_bot_id), in id order; otherwise to the single row or None.
+    """
+
+    def __init__(self, supabase, table: str, key_column: str, columns: Sequence[str], many: bool = False):
+        self.supabase = supabase
+        self.table = table
+        self.key_column = key_column
+        self.many = many
+        # The key column is needed to hand rows back to their keys; it is removed
+        # again if the caller did not ask for it
+        self.columns = list(columns)
+        self._strip_key = key_column not in self.columns and "*" not in self.columns
+        if self._strip_key:
+            self.columns.append(key_column)
+        self._memo: Dict[Hashable, asyncio.Future] = {}
+        self._pending: List[Hashable] = []
+
+    async def load(self, key: Hashable) -> Union[Optional[dict], List[dict]]:
+        """
+        Load the row (or rows, with ``many``) for one key.
+        """
+        future = self._memo.get(key)
+        if future is None:
+            future = asyncio.get_running_loop().create_future()
+            self._memo[key] = future
+            self._pending.append(key)
+            if len(self._pending) == 1:
+                # Runs after every callback already queued in this tick, so loads from
+                # sibling tasks started together land in the same batch
+                asyncio.get_running_loop().call_soon(self._dispatch)
+        else:
+            loader_keys_total.inc(table=self.table, outcome="memoized")
+        return await asyncio.shield(future)
+
+    async def load_many(self, keys: Iterable[Hashable]) -> List[Union[Optional[dict], List[dict]]]:
+        return list(await asyncio.gather(*(self.load(key) for key in keys)))
+
+    def prime(self, key: Hashable, value: Union[Optional[dict], List[dict]]):
+        """
+        Remember a value read some other way, so a later load() does not query it.
+        """
+        if key not in self._memo:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(value)
+            self._memo[key] = future
+
+    def _dispatch(self):
+        keys, self._pending = self._pending, []
+        task = asyncio.ensure_future(self._fetch(keys))
+        task.add_done_callback(lambda t, keys=keys: self._resolve(keys, t))
+
+    async def _fetch(self, keys: List[Hashable]) -> Dict[Hashable, List[dict]]:
+        loader_batches_total.inc(table=self.table)
+        loader_keys_total.inc(len(keys), table=self.table, outcome="fetched")
+        return await run_in_threadpool(self._query, keys)
+
+    def _query(self, keys: List[Hashable]) -> Dict[Hashable, List[dict]]:
+        grouped: Dict[Hashable, List[dict]] = {}
+        for start in range(0, len(keys), _IN_CHUNK):
+            chunk = keys[start:start + _IN_CHUNK]
+            offset = 0
+            while True:
+                query = self.supabase.table(self.table).select(", ".join(self.columns)).in_(self.key_column, chunk)
+                if self.many:
+                    # Stable order, so range() pages neither skip nor repeat rows
+                    query = query.order(self.key_column).order("id")
+                rows = query.range(offset, offset + _MAX_ROWS_PER_REQUEST - 1).execute().data or []
+                for row in rows:
+                    key = row.pop(self.key_column) if self._strip_key else row[self.key_column]
+                    grouped.setdefault(key, []).append(row)
+                if len(rows) < _MAX_ROWS_PER_REQUEST:
+                    break
+                offset += _MAX_ROWS_PER_REQUEST
+        return grouped
+
+    def _resolve(self, keys: List[Hashable], task: asyncio.Task):
+        error = task.exception() if not task.cancelled() else asyncio.CancelledError()
+        for key in keys:
+            future = self._memo[key]
+            if future.done():
+                continue
+            if error is not None:
+                # Not remembered, so a later load() in the request can try again
+                del self._memo[key]
+                future.set_exception(error)
+            else:
+                rows = task.result().get(key, [])
+                future.set_result(rows if self.many else (rows[0] if rows else None))
+        if error is not None and not isinstance(error, asyncio.CancelledError):
+            logging.error(f"Batched read of {self.table} by {self.key_column} failed for {len(keys)} keys: {error}")
+
+
+class Loaders:
+    """
+    The data loaders of one request, one per (table, key column, columns, many).
+    """
+
+    def __init__(self, supabase=None):
+        self.supabase = supabase or get_supabase()
+        self._loaders: Dict[Tuple, DataLoader] = {}
+
+    def __call__(self, table: str, key_column: str = "id", columns: Union[str, Sequence[str]] = ("*",),
+                 many: bool = False) -> DataLoader:
+        if isinstance(columns, str):
+            columns = [column.strip() for column in columns.split(",")]
+        signature = (table, key_column, tuple(columns), many)
+        loader = self._loaders.get(signature)
+        if loader is None:
+            loader = self._loaders[signature] = DataLoader(self.supabase, table, key_column, columns, many)
+        return loader
+
+
+def get_loaders() -> Loaders:
+    """
+    FastAPI dependency: a fresh set of loaders (and so a fresh memo) per request.
+    """
+    return Loaders()
@@ -0,0 +1,130 @@
+# backend/app/db/queries.py
+
+import base64
+import json
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple, Type
+from pydantic import BaseModel, create_model
+from app.core.config import settings
+
+# Every paginated table is ordered by (created_at, id); id breaks ties between
+# rows inserted in the same instant so no row is skipped or repeated.
+CURSOR_COLUMNS = ("created_at", "id")
+
+
+class InvalidQueryError(ValueError):
+    """Raised for unknown fields or malformed cursors; endpoints map it to a 400."""
+
+
+def model_columns(model: Type[BaseModel], exclude: Iterable[str] = ()) -> List[str]:
+    """
+    Columns backing a response model, in declaration order.
+
+    Args:
+        model (Type[BaseModel]): The response model.
+        exclude (Iterable[str]): Fields that are not columns of the table (nested relations).
+
+    Returns:
+        List[str]: The column names.
+    """
+    excluded = set(exclude)
+    return [name for name in model.model_fields if name not in excluded]
+
+
+def parse_fields(model: Type[BaseModel], fields: Optional[str], required: Iterable[str] = ("id",)) -> List[str]:
+    """
+    Resolve a comma-separated ``fields`` parameter against a response model.
+
+    Args:
+        model (Type[BaseModel]): The response model the fields must belong to.
+        fields (Optional[str]): e.g. "id,name,token"; all of the model's fields when empty.
+        required (Iterable[str]): Fields that are always returned.
+
+    Returns:
+        List[str]: The requested field names, required ones first.
+    """
+    available = list(model.model_fields)
+    if not fields:
+        return available
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise InvalidQueryError(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(available)}")
+    selected = list(required)
+    selected += [name for name in requested if name not in selected]
+    return selected
+
+
+@lru_cache(maxsize=None)
+def partial_model(model: Type[BaseModel]) -> Type[BaseModel]:
+    """
+    Copy of ``model`` with every field optional, used as the response model of
+    projected list endpoints together with ``response_model_exclude_unset``.
+    """
+    fields = {name: (Optional[field.annotation], None) for name, field in model.model_fields.items()}
+    return create_model(f"Partial{model.__name__}", **fields)
+
+
+def encode_cursor(row: dict) -> str:
+    payload = json.dumps([str(row[column]) for column in CURSOR_COLUMNS]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        return str(created_at), str(row_id)
+    except Exception:
+        raise InvalidQueryError("Malformed cursor")
+
+
+def _quote(value: str) -> str:
+    # Values inside PostgREST logic trees are double-quoted so ':' ',' and '+' survive
+    return '"' + value.replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+
+def fetch_page(
+    supabase,
+    table: str,
+    columns: List[str],
+    filters: dict,
+    page_size: Optional[int] = None,
+    after: Optional[str] = None,
+    max_page_size: Optional[int] = None,
+) -> Tuple[List[dict], Optional[str]]:
+    """
+    Read one page of a table with keyset pagination on (created_at, id).
+
+    Args:
+        supabase: The Supabase client.
+        table (str): Table name.
+        columns (List[str]): Columns to return; the cursor columns are fetched too but only returned if listed.
+        filters (dict): Equality filters, e.g. {"user_id": ...}.
+        page_size (Optional[int]): Rows per page.
+        after (Optional[str]): Cursor returned with the previous page.
+        max_page_size (Optional[int]): Cap on page_size; LIST_PAGE_SIZE_MAX by default.
+
+    Returns:
+        Tuple[List[dict], Optional[str]]: The rows and the cursor of the next page, or None on the last page.
+    """
+    page_size = min(page_size or settings.LIST_PAGE_SIZE_DEFAULT, max_page_size or settings.LIST_PAGE_SIZE_MAX)
+    selected = list(dict.fromkeys([*columns, *CURSOR_COLUMNS]))
+
+    query = supabase.table(table).select(", ".join(selected))
+    for column, value in filters.items():
+        query = query.eq(column, value)
+    if after:
+        created_at, row_id = decode_cursor(after)
+        query = query.or_(
+            f"created_at.gt.{_quote(created_at)},"
+            f"and(created_at.eq.{_quote(created_at)},id.gt.{_quote(row_id)})"
+        )
+    # One extra row tells us whether another page exists without a count query
+    rows = query.order("created_at").order("id").limit(page_size + 1).execute().data or []
+
+    next_cursor = encode_cursor(rows[page_size - 1]) if len(rows) > page_size else None
+    rows = rows[:page_size]
+    if len(selected) != len(columns):
+        rows = [{column: row.get(column) for column in columns} for row in rows]
+    return rows, next_cursor
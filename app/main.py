@@ -1,11 +1,21 @@
 import logging
-from fastapi import FastAPI, Request
-from fastapi.responses import JSONResponse
+from fastapi import Depends, FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse
 from app.api.v1.api import api_router
+from app.api.deps import require_ops_token
+from app.services.document_parser import shutdown_parse_pool
+from app.services.interpretation_jobs import interpretation_queue
+from app.core.metrics import render_prometheus
+from app.core.config import settings
+from app.core.responses import ORJSONResponse
+from app.core.compression import CompressionMiddleware
+from app.core.loop_monitor import loop_monitor
+from app.services import public_tokens
+from app.services.conversation_store import conversation_store
 from fastapi.middleware.cors import CORSMiddleware
 
 logging.basicConfig(level=logging.DEBUG)
-app = FastAPI()
+app = FastAPI(default_response_class=ORJSONResponse)
 
 # CORS Middleware
 app.add_middleware(
@@ -21,6 +31,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
+)
+
+app.add_middleware(
+    CompressionMiddleware,
+    minimum_size=settings.COMPRESSION_MIN_BYTES,
+    gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+    brotli_quality=settings.COMPRESSION_BROTLI_QUALITY,
+    threadpool_min_size=settings.COMPRESSION_THREADPOOL_MIN_BYTES,
 )
 
 class SensitiveDataFilter(logging.Filter):
@@ -54,7 +73,32 @@ async def log_request(request: Request, call_next):
 # Include API Router
 app.include_router(api_router, prefix="/api/v1")
 
+@app.on_event("startup")
+async def startup_event():
+    interpretation_queue.start()
+    if settings.LOOP_MONITOR_ENABLED:
+        loop_monitor.start()
+    if settings.PUBLIC_TOKEN_FILTER_ENABLED:
+        public_tokens.start()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    await loop_monitor.stop()
+    await public_tokens.stop()
+    conversation_store.close()
+    await interpretation_queue.stop()
+    shutdown_parse_pool()
+
 @app.get("/")
 async def root():
     return {"message": "Welcome to the API"}
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False, dependencies=[Depends(require_ops_token)])
+async def metrics():
+    return render_prometheus()
+
+@app.get("/debug/event-loop", include_in_schema=False, dependencies=[Depends(require_ops_token)])
+async def event_loop_report():
+    if not loop_monitor.running:
+        return JSONResponse(status_code=404, content={"detail": "Event loop monitor is not enabled"})
+    return loop_monitor.report()
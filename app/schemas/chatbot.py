@@ -1,12 +1,15 @@
 # backend/app/schemas/chatbot.py
 
 from pydantic import BaseModel
-from typing import Optional, List
+from typing import Optional, List, Dict
+from app.schemas.routing import ModelRouting
 
 class ChatbotBase(BaseModel):
     name: str
     instructions: Optional[str] = None
     tone: Optional[str] = None
+    # Which model answers each turn; MODEL_SMALL/MODEL_LARGE defaults when unset
+    model_routing: Optional[ModelRouting] = None
 
 class ChatbotCreate(ChatbotBase):
     pass
@@ -16,7 +19,13 @@ class ChatbotInDB(ChatbotBase):
     user_id: str
     token: str
     documents: List[str]
+    document_digests: Dict[str, dict] = {}
 
 class Chatbot(ChatbotBase):
     id: str
     token: str
+
+class BatchChatRequest(BaseModel):
+    messages: List[str]
+    # Capped at BATCH_CHAT_MAX_CONCURRENCY
+    max_concurrency: Optional[int] = None
@@ -0,0 +1,29 @@
+# backend/app/schemas/routing.py
+
+from pydantic import BaseModel, Field, field_validator
+from typing import List, Literal, Optional
+from app.core.config import settings
+
+def allowed_models() -> List[str]:
+    return list(dict.fromkeys([settings.MODEL_SMALL, settings.MODEL_LARGE, *settings.MODEL_ALLOWED]))
+
+class ModelRouting(BaseModel):
+    # "auto" picks a model per turn; "fixed" always uses `model`
+    mode: Literal["auto", "fixed"] = "auto"
+    model: Optional[str] = None
+    # Fall back to MODEL_SMALL / MODEL_LARGE
+    small_model: Optional[str] = None
+    large_model: Optional[str] = None
+    # Turns with an estimated prompt at or below this go to the small model
+    small_max_prompt_tokens: Optional[int] = Field(None, ge=0)
+    # Use the small model while the large one's recent p95 is slower than this
+    latency_budget_ms: Optional[int] = Field(None, gt=0)
+    max_tokens: Optional[int] = Field(None, gt=0)
+
+    @field_validator("model", "small_model", "large_model")
+    @classmethod
+    def check_allowed(cls, value: Optional[str]) -> Optional[str]:
+        # Names go to OpenAI and key per-model clients and metrics, so only configured ones are accepted
+        if value is not None and value not in allowed_models():
+            raise ValueError(f"Model must be one of: {', '.join(allowed_models())}")
+        return value
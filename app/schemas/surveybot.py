@@ -1,9 +1,10 @@
 # backend/app/schemas/surveybot.py
 
 from pydantic import BaseModel, Field
-from typing import Optional, List, Union
+from typing import Optional, List, Union, Dict, Literal
 from datetime import datetime
 import uuid
+from app.schemas.routing import ModelRouting
 
 class QuestionBase(BaseModel):
     question_text: str
@@ -22,11 +23,17 @@ class Question(QuestionBase):
 class SurveyBotBase(BaseModel):
     name: str
     instructions: Optional[str] = None
+    # Answer turns that need no validation from templates instead of the model
+    fast_mode: bool = False
+    # Which model answers each turn; MODEL_SMALL/MODEL_LARGE defaults when unset
+    model_routing: Optional[ModelRouting] = None
 
 class SurveyBotCreate(SurveyBotBase):
     questions: List[QuestionCreate]
 
 class SurveyBotUpdate(SurveyBotBase):
+    # Unchanged when omitted
+    fast_mode: Optional[bool] = None
     questions: List[Union[QuestionCreate, Question]]
 
 class SurveyBot(SurveyBotBase):
@@ -37,6 +44,10 @@ class SurveyBot(SurveyBotBase):
     created_at: datetime
     updated_at: datetime
 
+class PublicSurveyBot(SurveyBot):
+    # Served to anonymous respondents: the owner's routing policy stays private
+    model_routing: Optional[ModelRouting] = Field(None, exclude=True)
+
 class SurveyResponse(BaseModel):
     id: str
     survey_bot_id: str
@@ -51,7 +62,8 @@ class SurveyAnswer(BaseModel):
     question_id: str
     question_text: str
     raw_answer: str
-    ai_interpretation: str
+    # Filled in by the interpretation job after the response is recorded
+    ai_interpretation: Optional[str] = None
     created_at: datetime
     updated_at: datetime
 
@@ -59,3 +71,63 @@ class SurveyAnswer(BaseModel):
 class SurveyResult(BaseModel):
     response: SurveyResponse
     answers: List[SurveyAnswer]
+
+class QuestionSummary(BaseModel):
+    question_id: str
+    question_text: str
+    question_type: str
+    answered: int
+    option_counts: Optional[Dict[str, int]] = None
+    min_length: Optional[int] = None
+    max_length: Optional[int] = None
+    avg_length: Optional[float] = None
+
+class SurveySummary(BaseModel):
+    survey_bot_id: str
+    started: int
+    responses: int
+    completed: int
+    completion_rate: Optional[float] = None
+    questions: List[QuestionSummary]
+
+class InterpretationRequest(BaseModel):
+    # Defaults to every response that still has uninterpreted answers
+    response_ids: Optional[List[str]] = None
+
+class InterpretationJobStatus(BaseModel):
+    id: str
+    survey_bot_id: str
+    status: str
+    responses: int
+    total_answers: int
+    interpreted_answers: int
+    # Answers the model did not interpret; they can be queued again
+    missing_answer_ids: List[str] = []
+    error: Optional[str] = None
+
+class BulkSurveySubmission(BaseModel):
+    # Client-chosen id for this response (e.g. generated on the tablet); resubmitting
+    # the same key returns "duplicate" instead of writing the response again
+    idempotency_key: Optional[str] = Field(None, min_length=1, max_length=200)
+    respondent_id: Optional[str] = None
+    completed: bool = True
+    # When the response was collected; defaults to the time of the sync
+    submitted_at: Optional[datetime] = None
+    answers: Dict[str, str]
+
+class BulkSurveySubmitRequest(BaseModel):
+    responses: List[BulkSurveySubmission] = Field(..., min_length=1)
+
+class BulkSubmitItemResult(BaseModel):
+    index: int
+    status: Literal["created", "duplicate", "invalid", "failed"]
+    response_id: Optional[str] = None
+    error: Optional[str] = None
+
+class BulkSurveySubmitResult(BaseModel):
+    created: int
+    duplicates: int
+    invalid: int
+    failed: int
+    results: List[BulkSubmitItemResult]
+
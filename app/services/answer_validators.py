@@ -0,0 +1,247 @@
+# backend/app/services/answer_validators.py
+
+import re
+from typing import Callable, Dict, List, Optional, Tuple
+from app.core import metrics
+
+# Validators decide structured answers locally, so the model is only asked to
+# judge answers against free-text answer_criteria.
+
+validations_total = metrics.counter(
+    "survey_answer_validations_total",
+    "Survey answers checked by a local validator, by question type and outcome",
+)
+llm_validations_avoided_total = metrics.counter(
+    "survey_llm_validations_avoided_total",
+    "Survey answers decided locally that would otherwise have been judged by the model",
+)
+llm_calls_avoided_total = metrics.counter(
+    "survey_llm_calls_avoided_total",
+    "Survey turns answered without any model call",
+)
+
+
+class ValidationResult:
+    """Outcome of a local answer check."""
+
+    __slots__ = ("valid", "message", "criteria_checked")
+
+    def __init__(self, valid: bool, message: str = "", criteria_checked: bool = False):
+        """
+        Args:
+            valid (bool): Whether the answer is acceptable for the question type.
+            message (str): What to tell the respondent when it is not.
+            criteria_checked (bool): True if the validator also enforced the question's answer_criteria.
+        """
+        self.valid = valid
+        self.message = message
+        self.criteria_checked = criteria_checked
+
+
+Validator = Callable[[dict, str], Optional[ValidationResult]]
+_validators: Dict[str, Validator] = {}
+
+
+def register_validator(*question_types: str):
+    """
+    Register a validator for one or more question_type values (case-insensitive).
+
+    A validator takes (question, answer) and returns a ValidationResult, or None
+    when it cannot decide and the model should judge the answer.
+    """
+    def decorator(fn: Validator) -> Validator:
+        for question_type in question_types:
+            _validators[_normalize_type(question_type)] = fn
+        return fn
+    return decorator
+
+
+def _normalize_type(question_type: Optional[str]) -> str:
+    return re.sub(r"[\s\-/]+", "_", (question_type or "").strip().lower())
+
+
+def validate_answer(question: dict, answer: str) -> Optional[ValidationResult]:
+    """
+    Check an answer locally.
+
+    Returns:
+        Optional[ValidationResult]: The decision, or None if the model has to judge the answer
+        (no validator for the type, or free-text criteria the validator cannot enforce).
+    """
+    question_type = _normalize_type(question.get("question_type"))
+    validator = _validators.get(question_type)
+    if validator is None:
+        return None
+
+    result = validator(question, answer.strip())
+    if result is None:
+        return None
+    if result.valid and question.get("answer_criteria") and not result.criteria_checked:
+        # Shape is fine, but only the model can judge the remaining criteria
+        return None
+
+    validations_total.inc(question_type=question_type, outcome="valid" if result.valid else "invalid")
+    if question.get("answer_criteria"):
+        llm_validations_avoided_total.inc()
+    return result
+
+
+def match_options(answer: str, options: List[str]) -> List[str]:
+    """
+    Return the options an answer selects: an exact option, a 1-based option number,
+    or several options separated by commas or semicolons.
+    """
+    normalized = answer.strip().lower().rstrip(".")
+    exact = [option for option in options if option.strip().lower() == normalized]
+    if exact:
+        return exact
+    if normalized.isdigit() and 1 <= int(normalized) <= len(options):
+        return [options[int(normalized) - 1]]
+    parts = {part.strip() for part in normalized.replace(";", ",").split(",") if part.strip()}
+    return [option for option in options if option.strip().lower() in parts]
+
+
+def _option_numbers_only(answer: str) -> bool:
+    # "7", "2, 9": option numbers and nothing else, so a miss is clearly a wrong pick
+    parts = [part.strip() for part in answer.strip().rstrip(".").replace(";", ",").split(",")]
+    return all(part.isdigit() for part in parts)
+
+
+@register_validator("multiple_choice", "single_choice", "choice", "radio", "select", "dropdown")
+def validate_single_choice(question: dict, answer: str) -> Optional[ValidationResult]:
+    options = question.get("options") or []
+    if not options:
+        return None
+    matched = match_options(answer, options)
+    if len(matched) == 1:
+        return ValidationResult(True)
+    if matched or _option_numbers_only(answer):
+        return ValidationResult(False, f"Please choose one of: {', '.join(options)}.")
+    # "I like blue", "the second one": the model reads conversational answers
+    return None
+
+
+@register_validator("checkbox", "checkboxes", "multi_select", "multiple_select", "multiple_answer")
+def validate_multi_choice(question: dict, answer: str) -> Optional[ValidationResult]:
+    options = question.get("options") or []
+    if not options:
+        return None
+    if match_options(answer, options):
+        return ValidationResult(True)
+    if _option_numbers_only(answer):
+        return ValidationResult(False, f"Please choose one or more of: {', '.join(options)}.")
+    return None
+
+
+_YES = {"yes", "y", "yeah", "yep", "sure", "true", "correct", "of course", "definitely"}
+_NO = {"no", "n", "nope", "nah", "false", "not really", "never"}
+
+
+@register_validator("yes_no", "yesno", "boolean", "bool")
+def validate_yes_no(question: dict, answer: str) -> Optional[ValidationResult]:
+    normalized = answer.lower().strip(" .!")
+    if normalized in _YES or normalized in _NO:
+        return ValidationResult(True)
+    # "Yes, I do", "only on weekends": the model interprets anything but a bare yes/no
+    return None
+
+
+# A comma followed by groups of exactly three digits separates thousands ("1,500");
+# any other comma is a decimal comma ("1,5")
+_THOUSANDS = r"-?\d{1,3}(?:,\d{3})+(?:\.\d+)?"
+_NUMBER = re.compile(rf"^(?:{_THOUSANDS}|-?\d+(?:[.,]\d+)?)$")
+_NUMBER_IN_TEXT = rf"({_THOUSANDS}|-?\d+(?:\.\d+)?)"
+
+
+def _parse_number(answer: str) -> Optional[float]:
+    cleaned = answer.replace(" ", "").rstrip(".")
+    if not _NUMBER.match(cleaned):
+        return None
+    if re.fullmatch(_THOUSANDS, cleaned):
+        return float(cleaned.replace(",", ""))
+    return float(cleaned.replace(",", "."))
+
+
+def _number_in_text(text: str) -> float:
+    return float(text.replace(",", ""))
+
+
+def _parse_range(criteria: Optional[str]) -> Tuple[Optional[float], Optional[float], bool]:
+    """
+    Read a numeric range out of answer_criteria.
+
+    Returns:
+        Tuple[Optional[float], Optional[float], bool]: (minimum, maximum, whether the criteria was understood).
+    """
+    if not criteria:
+        return None, None, True
+    text = criteria.lower()
+    between = re.search(rf"(?:between|from)\s+{_NUMBER_IN_TEXT}\s+(?:and|to)\s+{_NUMBER_IN_TEXT}", text) \
+        or re.fullmatch(rf"\s*{_NUMBER_IN_TEXT}\s*-\s*{_NUMBER_IN_TEXT}\s*", text)
+    if between:
+        return _number_in_text(between.group(1)), _number_in_text(between.group(2)), True
+
+    minimum = re.search(rf"(?:at least|minimum(?: of)?|>=|no less than)\s*{_NUMBER_IN_TEXT}", text)
+    maximum = re.search(rf"(?:at most|maximum(?: of)?|<=|no more than)\s*{_NUMBER_IN_TEXT}", text)
+    if minimum or maximum:
+        return (_number_in_text(minimum.group(1)) if minimum else None,
+                _number_in_text(maximum.group(1)) if maximum else None, True)
+    return None, None, False
+
+
+def _check_range(value: float, minimum: Optional[float], maximum: Optional[float], understood: bool) -> ValidationResult:
+    if minimum is not None and value < minimum or maximum is not None and value > maximum:
+        if minimum is not None and maximum is not None:
+            return ValidationResult(False, f"Please give a number between {minimum:g} and {maximum:g}.", understood)
+        if minimum is not None:
+            return ValidationResult(False, f"Please give a number of at least {minimum:g}.", understood)
+        return ValidationResult(False, f"Please give a number of at most {maximum:g}.", understood)
+    return ValidationResult(True, criteria_checked=understood)
+
+
+@register_validator("number", "numeric", "integer", "decimal", "numeric_range", "range")
+def validate_number(question: dict, answer: str) -> Optional[ValidationResult]:
+    value = _parse_number(answer)
+    if value is None:
+        # "about 30", "thirty": the model reads anything but a bare number
+        return None
+    if _normalize_type(question.get("question_type")) == "integer" and not value.is_integer():
+        return ValidationResult(False, "Please answer with a whole number.")
+    return _check_range(value, *_parse_range(question.get("answer_criteria")))
+
+
+@register_validator("rating", "scale", "likert", "nps", "stars")
+def validate_rating(question: dict, answer: str) -> Optional[ValidationResult]:
+    options = question.get("options") or []
+    if options and not all(_parse_number(str(option)) is not None for option in options):
+        # Labelled scale ("Poor" ... "Excellent"): treat like a single choice
+        return validate_single_choice(question, answer)
+
+    minimum, maximum, understood = _parse_range(question.get("answer_criteria"))
+    if not understood:
+        # "Rate on a scale of 1 to 10", "a score out of ten": left to the model
+        return None
+    if minimum is None and maximum is None:
+        if options:
+            numbers = [_parse_number(str(option)) for option in options]
+            minimum, maximum = min(numbers), max(numbers)
+        elif _normalize_type(question.get("question_type")) == "nps":
+            minimum, maximum = 0, 10
+        else:
+            # No scale given anywhere, so there is nothing to check locally
+            return None
+
+    value = _parse_number(answer.split("/")[0]) if "/" in answer else _parse_number(answer)
+    if value is None:
+        return None
+    return _check_range(value, minimum, maximum, understood)
+
+
+_EMAIL = re.compile(r"^[A-Za-z0-9.!#$%&'*+/=?^_`{|}~-]+@[A-Za-z0-9](?:[A-Za-z0-9-]{0,61}[A-Za-z0-9])?(?:\.[A-Za-z0-9-]+)+$")
+
+
+@register_validator("email", "email_address")
+def validate_email(question: dict, answer: str) -> Optional[ValidationResult]:
+    if _EMAIL.match(answer):
+        return ValidationResult(True)
+    return ValidationResult(False, "That doesn't look like an email address. Could you check it?")
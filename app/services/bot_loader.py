@@ -0,0 +1,103 @@
+# backend/app/services/bot_loader.py
+
+import logging
+from typing import Optional
+from fastapi.concurrency import run_in_threadpool
+from app.db.queries import model_columns
+from app.db.session import get_supabase
+from app.core.config import settings
+from app.schemas.chatbot import ChatbotInDB
+from app.schemas.surveybot import Question, SurveyBot
+from app.services.public_tokens import chatbot_tokens, survey_tokens
+from app.utils.cache import TTLCache
+from app.utils.single_flight import SingleFlight
+
+# Concurrent first requests for a freshly shared link all ask for the same row;
+# these groups make them share one Supabase round trip instead of N.
+chatbot_flight = SingleFlight("chatbot_config")
+survey_bot_flight = SingleFlight("survey_bot_config")
+
+# Only the columns the chat and survey paths read
+CHATBOT_COLUMNS = ", ".join(model_columns(ChatbotInDB))
+SURVEY_BOT_COLUMNS = ", ".join(model_columns(SurveyBot, exclude=("questions",)))
+QUESTION_COLUMNS = ", ".join(model_columns(Question))
+
+chatbot_cache = TTLCache(maxsize=settings.CHATBOT_CACHE_SIZE, ttl=settings.CHATBOT_CACHE_TTL_SECONDS)
+
+
+def _fetch_chatbot_by_token(token: str) -> Optional[dict]:
+    supabase = get_supabase()
+    response = supabase.table("chatbots").select(CHATBOT_COLUMNS).eq("token", token).execute()
+    logging.info(f"Supabase response: {response}")
+    return response.data[0] if response.data else None
+
+
+def _fetch_survey_bot(value: str, column: str = "id") -> Optional[dict]:
+    supabase = get_supabase()
+    survey_bot_response = supabase.table("survey_bots").select(SURVEY_BOT_COLUMNS).eq(column, value).execute()
+    if not survey_bot_response.data:
+        return None
+
+    survey_bot = survey_bot_response.data[0]
+    questions_response = supabase.table("survey_questions").select(QUESTION_COLUMNS).eq("survey_bot_id", survey_bot["id"]).execute()
+    survey_bot["questions"] = sorted(questions_response.data, key=lambda x: x["order_number"])
+    return survey_bot
+
+
+async def load_chatbot_by_token(token: str) -> Optional[dict]:
+    """
+    Load a chatbot row by its public token. Rows are cached per worker for
+    CHATBOT_CACHE_TTL_SECONDS, concurrent misses for the same token are coalesced,
+    and tokens known not to exist are turned away without a database read.
+
+    Returns:
+        Optional[dict]: A copy of the chatbot row, or None if no chatbot has this token.
+    """
+    chatbot = chatbot_cache.get(token)
+    if chatbot is None:
+        if not await chatbot_tokens.admit(token):
+            return None
+        chatbot = await chatbot_flight.do(token, lambda: run_in_threadpool(_fetch_chatbot_by_token, token))
+        if chatbot is None:
+            chatbot_tokens.note_missing(token)
+            return None
+        chatbot_cache.set(token, chatbot)
+    # Callers share the coalesced row, so hand each one its own copy
+    return dict(chatbot)
+
+
+async def load_survey_bot(survey_bot_id: str) -> Optional[dict]:
+    """
+    Load a survey bot with its questions sorted by order_number, coalescing concurrent loads.
+
+    Returns:
+        Optional[dict]: A copy of the survey bot row with a "questions" list, or None if not found.
+    """
+    survey_bot = await survey_bot_flight.do(survey_bot_id, lambda: run_in_threadpool(_fetch_survey_bot, survey_bot_id))
+    if survey_bot is None:
+        return None
+    return {**survey_bot, "questions": list(survey_bot["questions"])}
+
+
+async def load_survey_bot_by_token(token: str) -> Optional[dict]:
+    """
+    Load a survey bot with its questions by its public token, coalescing concurrent loads.
+    Tokens known not to exist are turned away without a database read.
+
+    Returns:
+        Optional[dict]: A copy of the survey bot row with a "questions" list, or None if not found.
+    """
+    if not await survey_tokens.admit(token):
+        return None
+    survey_bot = await survey_bot_flight.do(f"token:{token}", lambda: run_in_threadpool(_fetch_survey_bot, token, "token"))
+    if survey_bot is None:
+        survey_tokens.note_missing(token)
+        return None
+    return {**survey_bot, "questions": list(survey_bot["questions"])}
+
+
+def invalidate_chatbot(token: str):
+    """
+    Drop the cached config for one chatbot, e.g. after its documents change.
+    """
+    chatbot_cache.delete(token)
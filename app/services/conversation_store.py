@@ -0,0 +1,245 @@
+# backend/app/services/conversation_store.py
+
+import asyncio
+import logging
+import sqlite3
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.utils.tokens import count_tokens
+
+# Rough per-object overhead added to content length when accounting memory
+_TURN_OVERHEAD_BYTES = 120
+_CONVERSATION_OVERHEAD_BYTES = 400
+
+
+class Turn:
+    """One message in a conversation."""
+
+    __slots__ = ("role", "content", "tokens")
+
+    def __init__(self, role: str, content: str, tokens: int):
+        self.role = role
+        self.content = content
+        self.tokens = tokens
+
+    @property
+    def size(self) -> int:
+        return len(self.content) + _TURN_OVERHEAD_BYTES
+
+
+class Conversation:
+    """A bounded ring buffer of the most recent turns of one conversation."""
+
+    __slots__ = ("id", "chatbot_id", "turns", "last_active", "size")
+
+    def __init__(self, conversation_id: str, chatbot_id: str, max_turns: int):
+        self.id = conversation_id
+        self.chatbot_id = chatbot_id
+        self.turns = deque(maxlen=max_turns)
+        self.last_active = time.time()
+        self.size = _CONVERSATION_OVERHEAD_BYTES
+
+    def append(self, turn: Turn) -> int:
+        """
+        Add a turn, dropping the oldest one if the buffer is full.
+
+        Returns:
+            int: Change in the conversation's accounted size, in bytes.
+        """
+        delta = turn.size
+        if len(self.turns) == self.turns.maxlen:
+            delta -= self.turns[0].size
+        self.turns.append(turn)
+        self.size += delta
+        self.last_active = time.time()
+        return delta
+
+    def history(self, max_tokens: int) -> List[dict]:
+        """
+        Return the newest turns that fit in ``max_tokens``, oldest first.
+        """
+        selected, used = [], 0
+        for turn in reversed(self.turns):
+            if used + turn.tokens > max_tokens:
+                break
+            selected.append({"role": turn.role, "content": turn.content})
+            used += turn.tokens
+        selected.reverse()
+        return selected
+
+
+class _SqliteSpill:
+    """
+    Write-through copy of conversations in a local SQLite file, so they survive a worker restart.
+
+    All SQLite work runs on one background thread in submission order: writes are
+    queued without waiting, and a load sees every turn queued before it.
+    """
+
+    def __init__(self, path: str):
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="conversation-spill")
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS conversation_turns ("
+            " conversation_id TEXT NOT NULL, chatbot_id TEXT NOT NULL, seq INTEGER NOT NULL,"
+            " role TEXT NOT NULL, content TEXT NOT NULL, tokens INTEGER NOT NULL, created_at REAL NOT NULL,"
+            " PRIMARY KEY (conversation_id, seq))"
+        )
+
+    def _submit(self, fn, *args):
+        def run():
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.error(f"Conversation spill {fn.__name__} failed: {e}")
+        self._executor.submit(run)
+
+    def append(self, conversation: Conversation, turn: Turn):
+        self._submit(self._append, conversation.id, conversation.chatbot_id, conversation.turns.maxlen, turn, time.time())
+
+    def _append(self, conversation_id: str, chatbot_id: str, max_turns: int, turn: Turn, created_at: float):
+        self._db.execute(
+            "INSERT INTO conversation_turns VALUES (?, ?,"
+            " (SELECT COALESCE(MAX(seq), 0) + 1 FROM conversation_turns WHERE conversation_id = ?), ?, ?, ?, ?)",
+            (conversation_id, chatbot_id, conversation_id, turn.role, turn.content, turn.tokens, created_at),
+        )
+        # Keep the file as bounded as the in-memory ring buffer
+        self._db.execute(
+            "DELETE FROM conversation_turns WHERE conversation_id = ? AND seq <= "
+            "(SELECT MAX(seq) FROM conversation_turns WHERE conversation_id = ?) - ?",
+            (conversation_id, conversation_id, max_turns),
+        )
+
+    async def load(self, conversation_id: str, max_turns: int, idle_ttl: float) -> Optional[Conversation]:
+        return await asyncio.wrap_future(self._executor.submit(self._load, conversation_id, max_turns, idle_ttl))
+
+    def _load(self, conversation_id: str, max_turns: int, idle_ttl: float) -> Optional[Conversation]:
+        rows = self._db.execute(
+            "SELECT chatbot_id, role, content, tokens, created_at FROM conversation_turns"
+            " WHERE conversation_id = ? ORDER BY seq DESC LIMIT ?",
+            (conversation_id, max_turns),
+        ).fetchall()
+        if not rows or rows[0][4] < time.time() - idle_ttl:
+            return None
+
+        conversation = Conversation(conversation_id, rows[0][0], max_turns)
+        for _, role, content, tokens, _ in reversed(rows):
+            conversation.append(Turn(role, content, tokens))
+        conversation.last_active = rows[0][4]
+        return conversation
+
+    def purge_idle(self, idle_ttl: float):
+        self._submit(self._purge_idle, time.time() - idle_ttl)
+
+    def _purge_idle(self, idle_before: float):
+        self._db.execute(
+            "DELETE FROM conversation_turns WHERE conversation_id IN ("
+            " SELECT conversation_id FROM conversation_turns GROUP BY conversation_id HAVING MAX(created_at) < ?)",
+            (idle_before,),
+        )
+
+    def close(self):
+        # Queued writes are finished first
+        self._executor.shutdown(wait=True)
+        self._db.close()
+
+
+class ConversationStore:
+    """
+    Worker-local store of chat histories keyed by conversation id.
+
+    Conversations are evicted once idle for CONVERSATION_IDLE_TTL_SECONDS, and
+    the least recently active ones are evicted whenever the store goes over
+    CONVERSATION_MEMORY_BYTES. With CONVERSATION_SQLITE_PATH set, turns are also
+    written to a local SQLite file and evicted conversations are reloaded from it.
+    """
+
+    def __init__(self, max_turns: int, idle_ttl: float, memory_bytes: int, sqlite_path: Optional[str] = None):
+        self.max_turns = max_turns
+        self.idle_ttl = idle_ttl
+        self.memory_bytes = memory_bytes
+        self.size = 0
+        self._conversations: "OrderedDict[str, Conversation]" = OrderedDict()
+        self._spill = _SqliteSpill(sqlite_path) if sqlite_path else None
+        self._last_purge = time.time()
+
+    async def _get(self, conversation_id: str, chatbot_id: str) -> Optional[Conversation]:
+        conversation = self._conversations.get(conversation_id)
+        if conversation is None and self._spill is not None:
+            loaded = await self._spill.load(conversation_id, self.max_turns, self.idle_ttl)
+            # Another request may have loaded or started it while this one waited
+            conversation = self._conversations.get(conversation_id)
+            if conversation is None and loaded is not None:
+                conversation = self._conversations[conversation_id] = loaded
+                self.size += conversation.size
+        if conversation is None or conversation.chatbot_id != chatbot_id:
+            # Conversation ids are only valid for the bot that issued them
+            return None
+        self._conversations.move_to_end(conversation_id)
+        return conversation
+
+    async def get_history(self, conversation_id: str, chatbot_id: str) -> List[dict]:
+        """
+        Return the most recent turns of a conversation that fit in CONVERSATION_HISTORY_TOKENS.
+        """
+        self._evict()
+        conversation = await self._get(conversation_id, chatbot_id)
+        if conversation is None:
+            return []
+        return conversation.history(settings.CONVERSATION_HISTORY_TOKENS)
+
+    async def append(self, conversation_id: str, chatbot_id: str, role: str, content: str):
+        """
+        Record a turn, starting the conversation if it does not exist yet.
+        """
+        # Tokenizing a long message would hold up the event loop
+        tokens = await run_in_threadpool(count_tokens, content)
+        conversation = await self._get(conversation_id, chatbot_id)
+        if conversation is None:
+            if conversation_id in self._conversations:
+                logging.warning(f"Conversation {conversation_id} belongs to another chatbot; not recording turn")
+                return
+            conversation = Conversation(conversation_id, chatbot_id, self.max_turns)
+            self._conversations[conversation_id] = conversation
+            self.size += conversation.size
+
+        turn = Turn(role, content, tokens)
+        self.size += conversation.append(turn)
+        if self._spill is not None:
+            self._spill.append(conversation, turn)
+        self._evict()
+
+    def _evict(self):
+        now = time.time()
+        expired_before = now - self.idle_ttl
+        # Oldest activity sits at the front, so stop at the first live conversation
+        while self._conversations:
+            conversation = next(iter(self._conversations.values()))
+            if conversation.last_active >= expired_before and self.size <= self.memory_bytes:
+                break
+            self._conversations.popitem(last=False)
+            self.size -= conversation.size
+
+        if self._spill is not None and now - self._last_purge > self.idle_ttl:
+            self._last_purge = now
+            self._spill.purge_idle(self.idle_ttl)
+
+    def close(self):
+        if self._spill is not None:
+            self._spill.close()
+
+    def __len__(self) -> int:
+        return len(self._conversations)
+
+
+conversation_store = ConversationStore(
+    max_turns=settings.CONVERSATION_MAX_TURNS,
+    idle_ttl=settings.CONVERSATION_IDLE_TTL_SECONDS,
+    memory_bytes=settings.CONVERSATION_MEMORY_BYTES,
+    sqlite_path=settings.CONVERSATION_SQLITE_PATH,
+)
@@ -0,0 +1,191 @@
+# backend/app/services/document_ingest.py
+
+import asyncio
+import json
+import logging
+from typing import Dict, List, Optional, Tuple
+from openai import AsyncOpenAI
+from fastapi.concurrency import run_in_threadpool
+from langchain.text_splitter import CharacterTextSplitter
+from app.core.config import settings
+from app.services.document_parser import parse_pdf, DocumentTooLargeError
+from app.utils.single_flight import SingleFlight
+from app.utils.tokens import count_tokens, truncate_to_tokens
+
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+# The same upload can be ingested by overlapping requests (e.g. a retried form post)
+ingest_flight = SingleFlight("document_ingestion")
+
+MAP_PROMPT = """You are building a compact reference digest of one section of a document.
+Return a JSON object with two keys:
+"summary": a dense summary of the section in at most {summary_words} words,
+"key_facts": a list of at most {max_facts} short, self-contained facts (names, numbers, dates, definitions, rules).
+Only use information from the section."""
+
+REDUCE_PROMPT = """You are merging section digests of one document into a single digest.
+Return a JSON object with two keys:
+"summary": an overall summary of the document in at most {summary_words} words, ordered as the document is,
+"key_facts": the {max_facts} most important facts, deduplicated, each short and self-contained.
+Only use information from the section digests."""
+
+
+async def _complete_json(system_prompt: str, content: str, max_tokens: int) -> dict:
+    response = await client.chat.completions.create(
+        model=settings.DIGEST_MODEL,
+        messages=[
+            {"role": "system", "content": system_prompt},
+            {"role": "user", "content": content},
+        ],
+        max_tokens=max_tokens,
+        temperature=0,
+        response_format={"type": "json_object"},
+    )
+    data = json.loads(response.choices[0].message.content)
+    return {
+        "summary": str(data.get("summary", "")).strip(),
+        "key_facts": [str(fact).strip() for fact in data.get("key_facts", []) if str(fact).strip()],
+    }
+
+
+def _split(text: str) -> List[str]:
+    splitter = CharacterTextSplitter.from_tiktoken_encoder(
+        model_name="gpt-4o",
+        separator="\n\n",
+        chunk_size=settings.DIGEST_CHUNK_TOKENS,
+        chunk_overlap=0,
+    )
+    return [chunk for chunk in splitter.split_text(text) if chunk.strip()]
+
+
+def _prepare(text: str) -> Tuple[int, List[str]]:
+    # Tokenizing a whole document takes long enough to stall the event loop, so it runs in the threadpool
+    tokens = count_tokens(text)
+    if tokens <= settings.DIGEST_FULL_TEXT_MAX_TOKENS:
+        return tokens, []
+    return tokens, _split(text)
+
+
+async def _summarize_sections(chunks: List[str]) -> List[dict]:
+    semaphore = asyncio.Semaphore(settings.DIGEST_CONCURRENCY)
+    # Leave room for the reduce step: each section gets a share of the final budget, with a floor
+    summary_words = max(60, int(settings.DIGEST_MAX_TOKENS * 0.75 / max(len(chunks), 1)))
+    prompt = MAP_PROMPT.format(summary_words=summary_words, max_facts=8)
+
+    async def summarize(chunk: str) -> dict:
+        async with semaphore:
+            return await _complete_json(prompt, chunk, max_tokens=settings.DIGEST_MAX_TOKENS)
+
+    return await asyncio.gather(*(summarize(chunk) for chunk in chunks))
+
+
+def _render_sections(sections: List[dict]) -> str:
+    parts = []
+    for number, section in enumerate(sections, start=1):
+        facts = "\n".join(f"- {fact}" for fact in section["key_facts"])
+        parts.append(f"Section {number}: {section['summary']}\n{facts}")
+    return "\n\n".join(parts)
+
+
+async def _reduce(sections: List[dict]) -> dict:
+    prompt = REDUCE_PROMPT.format(summary_words=int(settings.DIGEST_MAX_TOKENS * 0.5), max_facts=20)
+    # Merge in groups that fit one request until a single digest is left
+    while len(sections) > 1:
+        groups, current, current_tokens = [], [], 0
+        for section in sections:
+            tokens = count_tokens(_render_sections([section]))
+            if current and current_tokens + tokens > settings.DIGEST_CHUNK_TOKENS:
+                groups.append(current)
+                current, current_tokens = [], 0
+            current.append(section)
+            current_tokens += tokens
+        groups.append(current)
+        if len(groups) == len(sections):
+            # Sections too large to pair up; merge them two at a time
+            groups = [sections[i:i + 2] for i in range(0, len(sections), 2)]
+        sections = await asyncio.gather(*(
+            _complete_json(prompt, _render_sections(group), max_tokens=settings.DIGEST_MAX_TOKENS) for group in groups
+        ))
+    return sections[0]
+
+
+async def build_digest(text: str) -> dict:
+    """
+    Build the digest of one document's extracted text.
+
+    Small documents keep their full text and skip summarization. Larger ones get
+    a hierarchical digest: per-section summaries and facts, merged into one
+    overall summary plus key facts.
+
+    Args:
+        text (str): Extracted document text.
+
+    Returns:
+        dict: The digest, with "tokens", "summary", "sections", "key_facts" and "full_text" keys.
+    """
+    tokens, chunks = await run_in_threadpool(_prepare, text)
+    if not chunks:
+        return {"tokens": tokens, "summary": "", "sections": [], "key_facts": [], "full_text": text}
+
+    sections = await _summarize_sections(chunks)
+    overall = await _reduce(list(sections)) if len(sections) > 1 else sections[0]
+    return {
+        "tokens": tokens,
+        "summary": overall["summary"],
+        "sections": [section["summary"] for section in sections],
+        "key_facts": overall["key_facts"],
+        "full_text": None,
+    }
+
+
+async def ingest_document(doc_url: str, content: bytes) -> Optional[dict]:
+    """
+    Parse an uploaded document and build its digest.
+
+    Args:
+        doc_url (str): Public URL the document was stored under; used as the digest key.
+        content (bytes): Raw PDF bytes.
+
+    Returns:
+        Optional[dict]: The digest, or None if the document could not be processed.
+    """
+    async def ingest() -> Optional[dict]:
+        try:
+            text = await parse_pdf(content, source=doc_url)
+            return await build_digest(text)
+        except (DocumentTooLargeError, asyncio.TimeoutError) as e:
+            logging.error(f"Skipping digest for {doc_url}: {str(e) or 'parse timed out'}")
+        except Exception as e:
+            # Chat falls back to extracting the full text when a digest is missing
+            logging.error(f"Failed to build digest for {doc_url}: {str(e)}", exc_info=True)
+        return None
+
+    return await ingest_flight.do(doc_url, ingest)
+
+
+async def ingest_documents(documents: List[Tuple[str, bytes]]) -> Dict[str, dict]:
+    """
+    Ingest several uploaded documents concurrently.
+
+    Args:
+        documents (List[Tuple[str, bytes]]): (public URL, raw bytes) pairs.
+
+    Returns:
+        Dict[str, dict]: Digests keyed by document URL; failed documents are left out.
+    """
+    digests = await asyncio.gather(*(ingest_document(url, content) for url, content in documents))
+    return {url: digest for (url, _), digest in zip(documents, digests) if digest is not None}
+
+
+def render_digest(digest: dict) -> str:
+    """
+    Render a digest as prompt context, capped at DIGEST_MAX_TOKENS.
+
+    Documents small enough to have kept their full text are rendered as-is.
+    """
+    if digest.get("full_text") is not None:
+        return digest["full_text"]
+
+    facts = "\n".join(f"- {fact}" for fact in digest.get("key_facts", []))
+    rendered = f"Summary: {digest.get('summary', '')}\nKey facts:\n{facts}"
+    return truncate_to_tokens(rendered, settings.DIGEST_MAX_TOKENS)
@@ -0,0 +1,120 @@
+# backend/app/services/document_parser.py
+
+import asyncio
+import io
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+from pypdf import PdfReader
+from app.core.config import settings
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+class DocumentTooLargeError(Exception):
+    """Raised when a document exceeds the configured byte limit."""
+
+
+class DocumentParseError(Exception):
+    """Raised when a document cannot be parsed, e.g. a malformed PDF."""
+
+
+def get_parse_pool() -> ProcessPoolExecutor:
+    """
+    Return the worker-wide process pool used for PDF parsing, creating it on first use.
+    """
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=settings.PDF_PARSE_WORKERS)
+        logging.info(f"Started PDF parse pool with {settings.PDF_PARSE_WORKERS} processes")
+    return _pool
+
+
+def shutdown_parse_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _discard_pool(pool: ProcessPoolExecutor):
+    """
+    Replace a pool that can no longer be trusted (a worker died, or one is stuck on a
+    document): the next parse starts a fresh pool. Its processes are killed, so parses
+    still running in it fail and their documents are skipped for this request.
+    """
+    global _pool
+    if _pool is pool:
+        _pool = None
+    # No public API stops a running task; the worker processes are terminated instead
+    processes = list((getattr(pool, "_processes", None) or {}).values())
+    pool.shutdown(wait=False, cancel_futures=True)
+    for process in processes:
+        process.terminate()
+
+
+def parse_pdf_bytes(content: bytes, max_pages: int) -> str:
+    """
+    Extract the text of a PDF. Runs inside a pool process, so it must stay a
+    top-level function with picklable arguments.
+
+    Args:
+        content (bytes): Raw PDF bytes.
+        max_pages (int): Stop after this many pages.
+
+    Returns:
+        str: Page texts separated by blank lines.
+
+    Raises:
+        DocumentParseError: If pypdf cannot read the document.
+    """
+    try:
+        reader = PdfReader(io.BytesIO(content))
+        document_content = ""
+        for page_number, page in enumerate(reader.pages):
+            if page_number >= max_pages:
+                break
+            document_content += (page.extract_text() or "") + "\n\n"
+        return document_content
+    except Exception as e:
+        # pypdf raises many types on malformed input; one picklable type crosses back to the caller
+        raise DocumentParseError(f"{type(e).__name__}: {e}") from None
+
+
+async def parse_pdf(content: bytes, source: str = "") -> str:
+    """
+    Parse a PDF off the event loop, in the process pool, enforcing the byte,
+    page and time limits from settings.
+
+    Args:
+        content (bytes): Raw PDF bytes.
+        source (str): Where the bytes came from, for log messages.
+
+    Returns:
+        str: Extracted text.
+
+    Raises:
+        DocumentTooLargeError: If the document is over PDF_MAX_BYTES.
+        DocumentParseError: If the document is not a readable PDF.
+        asyncio.TimeoutError: If parsing takes longer than PDF_PARSE_TIMEOUT_SECONDS.
+        BrokenProcessPool: If the pool process died.
+    """
+    if len(content) > settings.PDF_MAX_BYTES:
+        raise DocumentTooLargeError(f"Document {source} is {len(content)} bytes, limit is {settings.PDF_MAX_BYTES}")
+
+    loop = asyncio.get_running_loop()
+    pool = get_parse_pool()
+    future = loop.run_in_executor(pool, parse_pdf_bytes, content, settings.PDF_MAX_PAGES)
+    try:
+        return await asyncio.wait_for(future, timeout=settings.PDF_PARSE_TIMEOUT_SECONDS)
+    except asyncio.TimeoutError:
+        # A runaway parse would keep its pool slot, so the pool is replaced
+        logging.error(f"Timed out after {settings.PDF_PARSE_TIMEOUT_SECONDS}s parsing document: {source}")
+        _discard_pool(pool)
+        raise
+    except BrokenProcessPool:
+        # A worker crashed or was killed (e.g. out of memory on a hostile PDF)
+        logging.error(f"PDF parse pool broke while parsing document: {source}")
+        _discard_pool(pool)
+        raise
@@ -0,0 +1,255 @@
+# backend/app/services/document_store.py
+
+import logging
+import mmap
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+from app.core.config import settings
+from app.core.metrics import counter, gauge
+
+# One file per chatbot holding the text extracted from each of its documents:
+#
+#   header   magic "LCDS", format version (u16), entry count (u32)
+#   index    per entry: key length (u32), payload offset (u64), payload length (u64), key (utf-8)
+#   payloads utf-8 text, back to back
+#
+# Files are read through mmap, so a cold chatbot costs one open and an index
+# parse; only the documents a prompt needs are decoded into the heap, and the
+# pages behind the mapping belong to the OS page cache, shared by every worker.
+_MAGIC = b"LCDS"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHI")
+_ENTRY = struct.Struct("<IQQ")
+
+document_store_lookups_total = counter("document_store_lookups_total", "Document store lookups by result (hit, miss)")
+document_store_resident_bytes = gauge("document_store_resident_bytes", "Bytes of document store files currently mapped by this worker")
+
+
+class _MappedFile:
+    """An open, memory-mapped store file and its parsed index."""
+
+    __slots__ = ("inode", "size", "index", "pins", "retired", "_file", "_map")
+
+    def __init__(self, path: str):
+        # Readers working outside the store lock pin the file; a file evicted or
+        # replaced meanwhile is only closed once the last of them is done
+        self.pins = 0
+        self.retired = False
+        self._file = open(path, "rb")
+        try:
+            stat = os.fstat(self._file.fileno())
+            self.inode = (stat.st_ino, stat.st_mtime_ns)
+            self.size = stat.st_size
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self.index = self._read_index()
+        except Exception:
+            self.close()
+            raise
+
+    def _read_index(self) -> Dict[str, tuple]:
+        magic, version, count = _HEADER.unpack_from(self._map, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError(f"Unsupported document store file (magic {magic!r}, version {version})")
+        index, position = {}, _HEADER.size
+        for _ in range(count):
+            key_length, offset, length = _ENTRY.unpack_from(self._map, position)
+            position += _ENTRY.size
+            key = str(self._map[position:position + key_length], "utf-8")
+            position += key_length
+            index[key] = (offset, length)
+        return index
+
+    def read(self, key: str) -> Optional[str]:
+        location = self.index.get(key)
+        if location is None:
+            return None
+        offset, length = location
+        # Decode straight out of the mapping; the views are released before the map can be closed
+        with memoryview(self._map) as view, view[offset:offset + length] as payload:
+            return str(payload, "utf-8")
+
+    def payloads(self) -> Dict[str, bytes]:
+        # Raw bytes for rewriting the file, without a decode/encode round trip
+        return {key: self._map[offset:offset + length] for key, (offset, length) in self.index.items()}
+
+    def close(self):
+        if getattr(self, "_map", None) is not None:
+            self._map.close()
+        self._file.close()
+
+
+def _write(path: str, payloads_by_key: Dict[str, bytes]):
+    keys = sorted(payloads_by_key)
+    encoded_keys = [key.encode("utf-8") for key in keys]
+    payloads = [payloads_by_key[key] for key in keys]
+
+    offset = _HEADER.size + sum(_ENTRY.size + len(key) for key in encoded_keys)
+    index = bytearray(_HEADER.pack(_MAGIC, _VERSION, len(keys)))
+    for key, payload in zip(encoded_keys, payloads):
+        index += _ENTRY.pack(len(key), offset, len(payload)) + key
+        offset += len(payload)
+
+    # Written beside the target and renamed over it, so readers in other workers
+    # never map a half-written file; their old mapping stays valid until they reopen
+    directory = os.path.dirname(path)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(index)
+            for payload in payloads:
+                f.write(payload)
+        os.replace(tmp_path, path)
+    except Exception:
+        os.unlink(tmp_path)
+        raise
+
+
+class DocumentStore:
+    """
+    Disk-backed store of extracted document text, one memory-mapped file per chatbot.
+
+    Each worker keeps the most recently used chatbots' files mapped, up to
+    ``resident_bytes`` of file size; the least recently used mappings are closed
+    first. Files are shared by all workers on the host: a worker notices another
+    worker's rewrite on its next lookup and remaps the file.
+    """
+
+    def __init__(self, directory: str, resident_bytes: int):
+        """
+        Initialize the store.
+
+        Args:
+            directory (str): Where the store files live; created if missing.
+            resident_bytes (int): Budget for mapped file bytes in this worker.
+        """
+        self.directory = directory
+        self.resident_bytes = resident_bytes
+        self.size = 0
+        self._resident: "OrderedDict[str, _MappedFile]" = OrderedDict()
+        # _lock guards the resident set and is held only to find (and if needed map)
+        # a file; decoding and payload copies run on a pinned file outside it. File
+        # rewrites are serialized by _write_lock and never hold _lock while writing
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, chatbot_id: str) -> str:
+        # Chatbot ids are UUIDs; anything else is rejected rather than used as a path
+        if not chatbot_id or os.sep in chatbot_id or chatbot_id.startswith("."):
+            raise ValueError(f"Invalid chatbot id for document store: {chatbot_id!r}")
+        return os.path.join(self.directory, f"{chatbot_id}.lcds")
+
+    def _close(self, chatbot_id: str):
+        mapped = self._resident.pop(chatbot_id, None)
+        if mapped is not None:
+            self.size -= mapped.size
+            mapped.retired = True
+            if mapped.pins == 0:
+                mapped.close()
+
+    def _pin(self, chatbot_id: str) -> Optional[_MappedFile]:
+        with self._lock:
+            mapped = self._open(chatbot_id)
+            if mapped is not None:
+                mapped.pins += 1
+            return mapped
+
+    def _unpin(self, mapped: _MappedFile):
+        with self._lock:
+            mapped.pins -= 1
+            if mapped.retired and mapped.pins == 0:
+                mapped.close()
+
+    def _open(self, chatbot_id: str) -> Optional[_MappedFile]:
+        path = self._path(chatbot_id)
+        mapped = self._resident.get(chatbot_id)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            self._close(chatbot_id)
+            return None
+        if mapped is not None and mapped.inode == (stat.st_ino, stat.st_mtime_ns):
+            self._resident.move_to_end(chatbot_id)
+            return mapped
+
+        self._close(chatbot_id)
+        try:
+            mapped = _MappedFile(path)
+        except FileNotFoundError:
+            return None
+        except (ValueError, struct.error) as e:
+            logging.error(f"Discarding unreadable document store file {path}: {e}")
+            os.unlink(path)
+            return None
+        self._resident[chatbot_id] = mapped
+        self.size += mapped.size
+        # Always keep the file just opened, even if it alone is over budget
+        while self.size > self.resident_bytes and len(self._resident) > 1:
+            self._close(next(iter(self._resident)))
+        document_store_resident_bytes.set(self.size)
+        return mapped
+
+    def get(self, chatbot_id: str, key: str) -> Optional[str]:
+        """
+        Return the stored text for one of a chatbot's documents, or None if it is not stored.
+        May open and map a file, so call it off the event loop.
+        """
+        mapped = self._pin(chatbot_id)
+        try:
+            text = mapped.read(key) if mapped is not None else None
+        finally:
+            if mapped is not None:
+                self._unpin(mapped)
+        document_store_lookups_total.inc(result="miss" if text is None else "hit")
+        return text
+
+    def _payloads(self, chatbot_id: str) -> Dict[str, bytes]:
+        # Copied outside _lock, so a large file does not hold up lookups of other chatbots
+        mapped = self._pin(chatbot_id)
+        if mapped is None:
+            return {}
+        try:
+            return mapped.payloads()
+        finally:
+            self._unpin(mapped)
+
+    def put(self, chatbot_id: str, texts: Dict[str, str]):
+        """
+        Store text for some of a chatbot's documents, keeping the ones already stored.
+        Writes a file, so call it off the event loop.
+        """
+        with self._write_lock:
+            payloads = self._payloads(chatbot_id)
+            payloads.update({key: text.encode("utf-8") for key, text in texts.items()})
+            _write(self._path(chatbot_id), payloads)
+
+    def delete(self, chatbot_id: str, key: Optional[str] = None):
+        """
+        Drop one document of a chatbot, or with no ``key`` all of them.
+        Writes a file, so call it off the event loop.
+        """
+        with self._write_lock:
+            payloads = {} if key is None else {k: payload for k, payload in self._payloads(chatbot_id).items() if k != key}
+            if payloads:
+                _write(self._path(chatbot_id), payloads)
+                return
+            with self._lock:
+                self._close(chatbot_id)
+                document_store_resident_bytes.set(self.size)
+            try:
+                os.unlink(self._path(chatbot_id))
+            except FileNotFoundError:
+                pass
+
+    def __len__(self) -> int:
+        return len(self._resident)
+
+
+document_store = DocumentStore(
+    directory=settings.DOCUMENT_STORE_DIR or os.path.join(tempfile.gettempdir(), "linkchat-documents"),
+    resident_bytes=settings.DOCUMENT_STORE_RESIDENT_BYTES,
+)
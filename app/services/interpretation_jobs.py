@@ -0,0 +1,258 @@
+# backend/app/services/interpretation_jobs.py
+
+import asyncio
+import json
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from openai import AsyncOpenAI
+from app.core.config import settings
+from app.db.queries import model_columns
+from app.db.session import get_supabase
+from app.schemas.surveybot import SurveyAnswer
+
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+
+# Finished jobs are kept this long so clients can read their final status
+JOB_RETENTION_SECONDS = 3600
+MAX_RETAINED_JOBS = 1000
+# Answers the model leaves out of its reply are sent again, on their own, this many times
+OMITTED_ANSWER_RETRIES = 1
+
+# Supabase's PostgREST caps every read at db-max-rows (1000 by default)
+_MAX_ROWS_PER_REQUEST = 1000
+_IN_CHUNK = 100
+
+QUESTION_COLUMNS = "id, question_text, question_type, options, answer_criteria"
+# Whole rows: they are written back with an upsert
+ANSWER_COLUMNS = ", ".join(model_columns(SurveyAnswer))
+
+INTERPRETATION_PROMPT = """You interpret answers given to a survey.
+Survey: {name}
+Instructions: {instructions}
+
+For every answer in the user's list, write a short interpretation: what the respondent
+means, normalized to the question (e.g. the chosen option, a number, a sentiment), and
+whether the answer actually addresses the question.
+Return a JSON object {{"interpretations": [{{"answer_id": "...", "interpretation": "..."}}]}}
+with exactly one entry per answer_id."""
+
+
+class InterpretationJob:
+    """Progress of one batch interpretation request."""
+
+    def __init__(self, survey_bot_id: str, response_ids: List[str]):
+        self.id = uuid.uuid4().hex
+        self.survey_bot_id = survey_bot_id
+        self.response_ids = response_ids
+        self.status = "queued"
+        self.total_answers = 0
+        self.interpreted_answers = 0
+        # Answers still without an interpretation after the retries
+        self.missing_answer_ids: List[str] = []
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "survey_bot_id": self.survey_bot_id,
+            "status": self.status,
+            "responses": len(self.response_ids),
+            "total_answers": self.total_answers,
+            "interpreted_answers": self.interpreted_answers,
+            "missing_answer_ids": self.missing_answer_ids,
+            "error": self.error,
+        }
+
+
+def _read_all(build_query: Callable[[], Any]) -> List[dict]:
+    # Stable order, so range() pages neither skip nor repeat rows
+    rows, offset = [], 0
+    while True:
+        page = build_query().order("id").range(offset, offset + _MAX_ROWS_PER_REQUEST - 1).execute().data or []
+        rows += page
+        if len(page) < _MAX_ROWS_PER_REQUEST:
+            return rows
+        offset += _MAX_ROWS_PER_REQUEST
+
+
+def _chunks(ids: List[str]):
+    # Chunked so the in_ filter stays within URL length limits
+    for start in range(0, len(ids), _IN_CHUNK):
+        yield ids[start:start + _IN_CHUNK]
+
+
+def select_response_ids(survey_bot_id: str, response_ids: Optional[List[str]] = None) -> List[str]:
+    """
+    Pick the responses an interpretation job should cover. Blocking; run it in the threadpool.
+
+    Args:
+        survey_bot_id (str): The survey.
+        response_ids (Optional[List[str]]): Requested responses; None for every response
+            of the survey that still has answers without an interpretation.
+
+    Returns:
+        List[str]: The response ids, limited to responses of this survey.
+    """
+    supabase = get_supabase()
+    if response_ids is not None:
+        owned = set()
+        for chunk in _chunks(response_ids):
+            owned.update(r["id"] for r in _read_all(lambda: supabase.table("survey_responses").select("id")
+                                                    .eq("survey_bot_id", survey_bot_id).in_("id", chunk)))
+        return [response_id for response_id in response_ids if response_id in owned]
+
+    response_ids = [r["id"] for r in _read_all(lambda: supabase.table("survey_responses").select("id")
+                                               .eq("survey_bot_id", survey_bot_id))]
+    pending = set()
+    for chunk in _chunks(response_ids):
+        pending.update(a["survey_response_id"] for a in _read_all(lambda: supabase.table("survey_answers")
+                       .select("survey_response_id").in_("survey_response_id", chunk).is_("ai_interpretation", "null")))
+    return [response_id for response_id in response_ids if response_id in pending]
+
+
+def _load_batch_inputs(survey_bot_id: str, response_ids: List[str]):
+    supabase = get_supabase()
+    survey_bot = supabase.table("survey_bots").select("name, instructions").eq("id", survey_bot_id).single().execute().data
+    questions = supabase.table("survey_questions").select(QUESTION_COLUMNS).eq("survey_bot_id", survey_bot_id).execute().data
+    answers = []
+    for chunk in _chunks(response_ids):
+        answers += _read_all(lambda: supabase.table("survey_answers").select(ANSWER_COLUMNS).in_("survey_response_id", chunk))
+    return survey_bot, {q["id"]: q for q in questions}, answers
+
+
+def _save_interpretations(answers: List[dict]):
+    # Full rows, so the upsert only ever takes the ON CONFLICT UPDATE path
+    get_supabase().table("survey_answers").upsert(answers).execute()
+
+
+async def _interpret_batch(survey_bot: dict, questions: Dict[str, dict], answers: List[dict]) -> Dict[str, str]:
+    items = []
+    for answer in answers:
+        question = questions.get(answer["question_id"], {})
+        items.append({
+            "answer_id": answer["id"],
+            "question": answer.get("question_text") or question.get("question_text", ""),
+            "question_type": question.get("question_type"),
+            "options": question.get("options"),
+            "answer_criteria": question.get("answer_criteria"),
+            "answer": answer.get("raw_answer") or answer.get("answer") or "",
+        })
+
+    response = await client.chat.completions.create(
+        model=settings.INTERPRETATION_MODEL,
+        messages=[
+            {"role": "system", "content": INTERPRETATION_PROMPT.format(
+                name=survey_bot.get("name", ""), instructions=survey_bot.get("instructions") or "")},
+            {"role": "user", "content": json.dumps(items)},
+        ],
+        temperature=0,
+        response_format={"type": "json_object"},
+    )
+    data = json.loads(response.choices[0].message.content)
+    return {
+        str(item.get("answer_id")): str(item.get("interpretation", "")).strip()
+        for item in data.get("interpretations", [])
+        if isinstance(item, dict)
+    }
+
+
+class InterpretationQueue:
+    """
+    Worker-local background queue that interprets survey answers after the
+    conversation has finished, many answers per model call.
+    """
+
+    def __init__(self, workers: int, batch_size: int):
+        self.workers = workers
+        self.batch_size = batch_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._jobs: "OrderedDict[str, InterpretationJob]" = OrderedDict()
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+        logging.info(f"Started {self.workers} interpretation workers")
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, survey_bot_id: str, response_ids: List[str]) -> InterpretationJob:
+        """
+        Queue the answers of ``response_ids`` for interpretation.
+
+        Returns:
+            InterpretationJob: The job, whose status can be polled with get().
+        """
+        if self._queue is None:
+            raise RuntimeError("Interpretation queue has not been started")
+        job = InterpretationJob(survey_bot_id, response_ids)
+        self._remember(job)
+        self._queue.put_nowait(job)
+        logging.info(f"Queued interpretation job {job.id} for {len(response_ids)} responses of survey {survey_bot_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[InterpretationJob]:
+        return self._jobs.get(job_id)
+
+    def _remember(self, job: InterpretationJob):
+        self._jobs[job.id] = job
+        cutoff = time.time() - JOB_RETENTION_SECONDS
+        while self._jobs:
+            oldest = next(iter(self._jobs.values()))
+            finished_long_ago = oldest.finished_at is not None and oldest.finished_at < cutoff
+            if not finished_long_ago and len(self._jobs) <= MAX_RETAINED_JOBS:
+                break
+            self._jobs.popitem(last=False)
+
+    async def _worker(self):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self._run(job)
+            except Exception as e:
+                logging.error(f"Interpretation job {job.id} failed: {e}", exc_info=True)
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+                self._queue.task_done()
+
+    async def _run(self, job: InterpretationJob):
+        job.status = "running"
+        survey_bot, questions, answers = await run_in_threadpool(_load_batch_inputs, job.survey_bot_id, job.response_ids)
+        job.total_answers = len(answers)
+
+        for start in range(0, len(answers), self.batch_size):
+            batch = answers[start:start + self.batch_size]
+            for attempt in range(OMITTED_ANSWER_RETRIES + 1):
+                interpretations = await _interpret_batch(survey_bot, questions, batch)
+                updated = [{**answer, "ai_interpretation": interpretations[answer["id"]]}
+                           for answer in batch if answer["id"] in interpretations]
+                if updated:
+                    await run_in_threadpool(_save_interpretations, updated)
+                job.interpreted_answers += len(updated)
+                batch = [answer for answer in batch if answer["id"] not in interpretations]
+                if not batch:
+                    break
+            if batch:
+                job.missing_answer_ids += [answer["id"] for answer in batch]
+                logging.warning(f"Interpretation job {job.id}: model left out {len(batch)} answers after retrying")
+
+        job.status = "done"
+        logging.info(f"Interpretation job {job.id} interpreted {job.interpreted_answers} of {job.total_answers} answers")
+
+
+interpretation_queue = InterpretationQueue(
+    workers=settings.INTERPRETATION_WORKERS,
+    batch_size=settings.INTERPRETATION_BATCH_SIZE,
+)
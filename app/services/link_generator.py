@@ -1,6 +1,12 @@
 # backend/app/services/link_generator.py
 
 import secrets
+from typing import Optional
+from app.services.public_tokens import TokenFilter
 
-def generate_unique_token() -> str:
-    return secrets.token_urlsafe(16)
\ No newline at end of file
+def generate_unique_token(token_filter: Optional[TokenFilter] = None) -> str:
+    token = secrets.token_urlsafe(16)
+    # Known to this worker's filter right away, before the row is even written
+    if token_filter is not None:
+        token_filter.add(token)
+    return token
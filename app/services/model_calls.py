@@ -0,0 +1,234 @@
+# backend/app/services/model_calls.py
+
+import asyncio
+import logging
+import random
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, Optional, TypeVar
+import openai
+from app.core.config import settings
+from app.core.metrics import counter, gauge, histogram
+
+T = TypeVar("T")
+
+model_calls_total = counter("model_calls_total", "Model calls by endpoint and outcome (ok, error, timeout, short_circuit)")
+model_call_retries_total = counter("model_call_retries_total", "Model call attempts retried after a transient provider error")
+model_call_hedges_total = counter("model_call_hedges_total", "Hedged duplicate model requests sent, labelled by which request answered first")
+model_call_seconds = histogram("model_call_seconds", "Model call latency including retries and hedges")
+model_circuit_open = gauge("model_circuit_open", "1 while the model provider circuit breaker is open")
+
+# Worth another attempt: the provider may answer the same request a moment later
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APIConnectionError,  # includes APITimeoutError
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised without calling the provider while the circuit breaker is open."""
+
+
+class ModelCallPolicy:
+    """
+    Limits for one kind of model call.
+
+    Args:
+        deadline (float): Seconds for the whole call, retries and backoff included.
+        attempt_timeout (float): Seconds for a single attempt.
+        max_attempts (int): Attempts before giving up on transient errors.
+        hedge (bool): Send a duplicate request when an attempt runs past the endpoint's p95.
+    """
+
+    __slots__ = ("deadline", "attempt_timeout", "max_attempts", "hedge")
+
+    def __init__(self, deadline: float, attempt_timeout: float, max_attempts: int, hedge: bool):
+        self.deadline = deadline
+        self.attempt_timeout = min(attempt_timeout, deadline)
+        self.max_attempts = max_attempts
+        self.hedge = hedge
+
+
+POLICIES: Dict[str, ModelCallPolicy] = {
+    "chat": ModelCallPolicy(settings.MODEL_CHAT_DEADLINE_SECONDS, settings.MODEL_ATTEMPT_TIMEOUT_SECONDS,
+                            settings.MODEL_MAX_ATTEMPTS, settings.MODEL_HEDGE_ENABLED),
+    "survey": ModelCallPolicy(settings.MODEL_SURVEY_DEADLINE_SECONDS, settings.MODEL_ATTEMPT_TIMEOUT_SECONDS,
+                              settings.MODEL_MAX_ATTEMPTS, settings.MODEL_HEDGE_ENABLED),
+    # Streamed tokens are already on the respondent's screen, so a duplicate request cannot take over
+    "survey_stream": ModelCallPolicy(settings.MODEL_SURVEY_DEADLINE_SECONDS, settings.MODEL_ATTEMPT_TIMEOUT_SECONDS,
+                                     settings.MODEL_MAX_ATTEMPTS, False),
+    # Batch callers are not waiting on a single reply, so duplicates would only add cost
+    "batch": ModelCallPolicy(settings.MODEL_BATCH_DEADLINE_SECONDS, settings.MODEL_ATTEMPT_TIMEOUT_SECONDS,
+                             settings.MODEL_MAX_ATTEMPTS, False),
+}
+
+
+class CircuitBreaker:
+    """
+    Fails calls fast while the provider is having an incident.
+
+    Opens after ``failure_threshold`` consecutive transient failures. Once
+    ``reset_seconds`` have passed, one probe call is let through: success
+    closes the circuit, failure keeps it open for another period.
+    """
+
+    def __init__(self, name: str, failure_threshold: int, reset_seconds: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._probe_at: Optional[float] = None
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        if self._opened_at is None:
+            return True
+        now = time.monotonic()
+        if now - self._opened_at < self.reset_seconds:
+            return False
+        # A probe that never reported back (e.g. cancelled) is replaced after another period
+        if self._probe_at is not None and now - self._probe_at < self.reset_seconds:
+            return False
+        self._probe_at = now
+        return True
+
+    def record_success(self):
+        if self._opened_at is not None:
+            logging.info(f"Circuit {self.name} closed")
+        self._failures = 0
+        self._opened_at = None
+        self._probe_at = None
+        model_circuit_open.set(0, circuit=self.name)
+
+    def record_failure(self):
+        self._failures += 1
+        if self._probe_at is not None or self._failures >= self.failure_threshold:
+            if self._opened_at is None:
+                logging.warning(f"Circuit {self.name} opened after {self._failures} consecutive failures")
+            self._opened_at = time.monotonic()
+            self._probe_at = None
+            model_circuit_open.set(1, circuit=self.name)
+
+
+breaker = CircuitBreaker("openai", settings.MODEL_CIRCUIT_FAILURE_THRESHOLD, settings.MODEL_CIRCUIT_RESET_SECONDS)
+
+# Recent successful request latencies per endpoint, for the hedge delay
+_latencies: Dict[str, Deque[float]] = {}
+_HEDGE_MIN_SAMPLES = 20
+
+
+def _record_latency(endpoint: str, seconds: float):
+    _latencies.setdefault(endpoint, deque(maxlen=200)).append(seconds)
+
+
+def hedge_delay(endpoint: str) -> Optional[float]:
+    """
+    Seconds to wait before hedging: the endpoint's recent p95, never below
+    MODEL_HEDGE_MIN_DELAY_SECONDS. None until enough calls have been seen.
+    """
+    samples = _latencies.get(endpoint)
+    if not samples or len(samples) < _HEDGE_MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    return max(p95, settings.MODEL_HEDGE_MIN_DELAY_SECONDS)
+
+
+async def _timed(endpoint: str, call: Callable[[], Awaitable[T]]) -> T:
+    started = time.monotonic()
+    result = await call()
+    _record_latency(endpoint, time.monotonic() - started)
+    return result
+
+
+async def _attempt(endpoint: str, call: Callable[[], Awaitable[T]], hedge: bool) -> T:
+    delay = hedge_delay(endpoint) if hedge else None
+    if delay is None:
+        return await _timed(endpoint, call)
+
+    primary = asyncio.ensure_future(_timed(endpoint, call))
+    pending = {primary}
+    try:
+        done, pending = await asyncio.wait(pending, timeout=delay)
+        hedged = not done
+        if hedged:
+            pending.add(asyncio.ensure_future(_timed(endpoint, call)))
+        error = None
+        while done or pending:
+            for task in done:
+                if task.exception() is None:
+                    if hedged:
+                        model_call_hedges_total.inc(endpoint=endpoint, winner="primary" if task is primary else "hedge")
+                    return task.result()
+                error = task.exception()
+            if not pending:
+                break
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+        raise error
+    finally:
+        # The slower duplicate is abandoned as soon as one answer is in
+        for task in pending:
+            task.cancel()
+
+
+async def call_model(endpoint: str, call: Callable[[], Awaitable[T]], policy: Optional[ModelCallPolicy] = None) -> T:
+    """
+    Run a model request under the endpoint's deadline, retry and hedging policy.
+
+    Args:
+        endpoint (str): Policy name ("chat", "survey", "survey_stream", "batch"); also the metrics label.
+        call (Callable[[], Awaitable[T]]): Starts one request; called again for retries and hedges.
+        policy (Optional[ModelCallPolicy]): Overrides the endpoint's policy.
+
+    Returns:
+        T: Whatever the first successful request returned.
+
+    Raises:
+        CircuitOpenError: The provider is failing and the call was not attempted.
+        asyncio.TimeoutError: The deadline passed.
+    """
+    policy = policy or POLICIES[endpoint]
+    started = time.monotonic()
+    deadline = started + policy.deadline
+    attempt = 0
+    while True:
+        if not breaker.allow():
+            model_calls_total.inc(endpoint=endpoint, outcome="short_circuit")
+            raise CircuitOpenError("Model provider is unavailable; failing fast")
+
+        attempt += 1
+        timeout = min(policy.attempt_timeout, deadline - time.monotonic())
+        try:
+            result = await asyncio.wait_for(_attempt(endpoint, call, policy.hedge), timeout=timeout)
+        except RETRYABLE_ERRORS as e:
+            breaker.record_failure()
+            backoff = random.uniform(0, min(settings.MODEL_RETRY_BACKOFF_MAX_SECONDS,
+                                            settings.MODEL_RETRY_BACKOFF_BASE_SECONDS * 2 ** attempt))
+            if attempt >= policy.max_attempts or time.monotonic() + backoff >= deadline:
+                timed_out = isinstance(e, (asyncio.TimeoutError, openai.APITimeoutError))
+                model_calls_total.inc(endpoint=endpoint, outcome="timeout" if timed_out else "error")
+                logging.error(f"Model call for {endpoint} failed after {attempt} attempts: {type(e).__name__} {e}")
+                raise
+            model_call_retries_total.inc(endpoint=endpoint)
+            logging.warning(f"Model call for {endpoint} attempt {attempt} failed ({type(e).__name__}), retrying in {backoff:.2f}s")
+            await asyncio.sleep(backoff)
+            continue
+        except openai.APIStatusError:
+            # The provider answered (e.g. 400); it is up, the request was wrong
+            breaker.record_success()
+            model_calls_total.inc(endpoint=endpoint, outcome="error")
+            raise
+        except Exception:
+            model_calls_total.inc(endpoint=endpoint, outcome="error")
+            raise
+
+        breaker.record_success()
+        model_calls_total.inc(endpoint=endpoint, outcome="ok")
+        model_call_seconds.observe(time.monotonic() - started, endpoint=endpoint)
+        return result
@@ -0,0 +1,106 @@
+# backend/app/services/model_router.py
+
+import logging
+import time
+from collections import deque
+from typing import Deque, Dict, List, Optional, Tuple
+from app.core.config import settings
+from app.core.metrics import counter, histogram
+from app.schemas.routing import allowed_models
+from app.utils.tokens import estimate_tokens
+
+# Turns that only acknowledge, greet or check an answer; a small model handles them well
+SIMPLE_KINDS = frozenset({"greeting", "acknowledgement", "validation"})
+
+routing_decisions_total = counter("model_routing_decisions_total", "Model routing decisions by kind, model and reason")
+routed_call_seconds = histogram("model_routed_call_seconds", "Latency of routed model calls by kind and model")
+
+# Recent (timestamp, seconds) latencies per (kind, model), for latency budgets. Only the
+# last MODEL_ROUTING_LATENCY_WINDOW_SECONDS count, so a model that was routed around
+# because it was slow gets traffic (and fresh samples) again once its samples age out.
+_latencies: Dict[Tuple[str, str], Deque[Tuple[float, float]]] = {}
+_BUDGET_MIN_SAMPLES = 10
+
+
+class RouteDecision:
+    """The model chosen for one call, and why."""
+
+    __slots__ = ("kind", "model", "reason", "prompt_tokens", "max_tokens")
+
+    def __init__(self, kind: str, model: str, reason: str, prompt_tokens: int, max_tokens: Optional[int]):
+        self.kind = kind
+        self.model = model
+        self.reason = reason
+        self.prompt_tokens = prompt_tokens
+        self.max_tokens = max_tokens
+
+
+def estimate_prompt_tokens(messages: List[dict]) -> int:
+    # A few tokens of framing per message on top of the content
+    return sum(estimate_tokens(message.get("content") or "") + 4 for message in messages)
+
+
+def recent_p95(kind: str, model: str) -> Optional[float]:
+    cutoff = time.monotonic() - settings.MODEL_ROUTING_LATENCY_WINDOW_SECONDS
+    samples = [seconds for at, seconds in _latencies.get((kind, model), ()) if at >= cutoff]
+    if len(samples) < _BUDGET_MIN_SAMPLES:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+
+
+def _allowed(model: Optional[str], allowed: List[str]) -> Optional[str]:
+    if model is not None and model not in allowed:
+        logging.warning(f"Ignoring model {model!r} from routing policy: not in MODEL_ALLOWED")
+        return None
+    return model
+
+
+def route(routing: Optional[dict], kind: str, prompt_tokens: int, default_max_tokens: Optional[int] = None) -> RouteDecision:
+    """
+    Pick the model for one call from a bot's routing policy.
+
+    Args:
+        routing (Optional[dict]): The bot's model_routing policy (see ModelRouting); defaults apply when empty.
+        kind (str): What the call is for: "chat", "survey_turn", or one of SIMPLE_KINDS.
+        prompt_tokens (int): Estimated prompt size.
+        default_max_tokens (Optional[int]): Completion cap when the policy sets none.
+
+    Returns:
+        RouteDecision: The chosen model, completion cap and the reason.
+    """
+    routing = routing or {}
+    # Rows saved before the allowlist existed may name anything; those names are ignored
+    allowed = allowed_models()
+    small = _allowed(routing.get("small_model"), allowed) or settings.MODEL_SMALL
+    large = _allowed(routing.get("large_model"), allowed) or settings.MODEL_LARGE
+    max_tokens = routing.get("max_tokens") or default_max_tokens
+    small_max = routing.get("small_max_prompt_tokens")
+    budget_ms = routing.get("latency_budget_ms")
+
+    if routing.get("mode") == "fixed":
+        model, reason = _allowed(routing.get("model"), allowed) or large, "fixed"
+    elif prompt_tokens > settings.MODEL_SMALL_MAX_CONTEXT_TOKENS:
+        model, reason = large, "long_context"
+    elif kind in SIMPLE_KINDS:
+        model, reason = small, "simple_turn"
+    elif small_max is not None and prompt_tokens <= small_max:
+        model, reason = small, "short_prompt"
+    elif budget_ms is not None and (recent_p95(kind, large) or 0) * 1000 > budget_ms:
+        model, reason = small, "latency_budget"
+    else:
+        model, reason = large, "default"
+
+    decision = RouteDecision(kind, model, reason, prompt_tokens, max_tokens)
+    routing_decisions_total.inc(kind=kind, model=model, reason=reason)
+    return decision
+
+
+def record(decision: RouteDecision, seconds: float):
+    """
+    Record how long a routed call took, for the latency budget and for tuning policies.
+    """
+    _latencies.setdefault((decision.kind, decision.model), deque(maxlen=200)).append((time.monotonic(), seconds))
+    routed_call_seconds.observe(seconds, kind=decision.kind, model=decision.model)
+    logging.info(f"Routed {decision.kind} call to {decision.model} ({decision.reason}, "
+                 f"~{decision.prompt_tokens} prompt tokens) in {seconds * 1000:.0f} ms")
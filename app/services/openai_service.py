@@ -1,80 +1,182 @@
 # backend/app/services/openai_service.py
 
-from openai import OpenAI
+from openai import AsyncOpenAI
 from app.core.config import settings
 import logging
-from langchain_community.document_loaders import PyPDFLoader
 from langchain.text_splitter import CharacterTextSplitter
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import OpenAIEmbeddings
 import requests
-import tempfile
-import os
-
-client = OpenAI(api_key=settings.OPENAI_API_KEY)
-
-def extract_document_content(document_urls: list) -> str:
-    document_content = ""
-    for doc_url in document_urls:
-        # Download the PDF file
-        response = requests.get(doc_url)
-        if response.status_code == 200:
-            # Create a temporary file to store the PDF
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as temp_file:
-                temp_file.write(response.content)
-                temp_file_path = temp_file.name
-
-            # Load the PDF
-            loader = PyPDFLoader(temp_file_path)
-            pages = loader.load()
-
-            # Extract text from pages
-            for page in pages:
-                document_content += page.page_content + "\n\n"
-
-            # Remove the temporary file
-            os.unlink(temp_file_path)
-        else:
+import asyncio
+from typing import List, Optional
+from concurrent.futures.process import BrokenProcessPool
+from fastapi.concurrency import run_in_threadpool
+from app.utils.single_flight import SingleFlight
+from app.services.document_parser import parse_pdf, DocumentParseError, DocumentTooLargeError
+from app.services.document_ingest import render_digest
+from app.services.document_store import document_store
+from app.services.model_calls import call_model, CircuitOpenError
+from app.services import model_router, prompt_builder
+import time
+
+# Retries and timeouts are applied by call_model, per endpoint, instead of by the client
+client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY, max_retries=0)
+
+# Concurrent chats with the same bot would otherwise each download and parse the same PDFs
+document_flight = SingleFlight("document_extraction")
+
+def _download_document(doc_url: str) -> Optional[bytes]:
+    # Stream the download so an oversized file is rejected without buffering all of it
+    with requests.get(doc_url, stream=True, timeout=settings.PDF_PARSE_TIMEOUT_SECONDS) as response:
+        if response.status_code != 200:
             logging.error(f"Failed to download document: {doc_url}")
-    
-    return document_content
+            return None
 
-async def get_chatbot_response(chatbot: dict, user_message: str) -> str:
+        content = bytearray()
+        for chunk in response.iter_content(chunk_size=64 * 1024):
+            content.extend(chunk)
+            if len(content) > settings.PDF_MAX_BYTES:
+                raise DocumentTooLargeError(f"Document {doc_url} exceeds {settings.PDF_MAX_BYTES} bytes")
+        return bytes(content)
+
+async def _extract_single_document(doc_url: str) -> str:
+    try:
+        content = await run_in_threadpool(_download_document, doc_url)
+        if content is None:
+            return ""
+        return await parse_pdf(content, source=doc_url)
+    except (DocumentTooLargeError, asyncio.TimeoutError) as e:
+        logging.error(f"Skipping document {doc_url}: {str(e) or 'parse timed out'}")
+        return ""
+    except (DocumentParseError, BrokenProcessPool) as e:
+        # Malformed PDFs, and workers lost to them, skip the document instead of failing the request
+        logging.error(f"Skipping unreadable document {doc_url}: {e}")
+        return ""
+
+async def extract_document_text(chatbot_id: str, doc_url: str) -> str:
+    # Extracted text lives in the chatbot's on-disk store; documents are immutable once
+    # uploaded, so entries only go stale when a document is removed or replaced
+    # A cold chatbot's file is opened and mapped on this lookup, so it runs in the threadpool
+    text = await run_in_threadpool(document_store.get, chatbot_id, doc_url)
+    if text is None:
+        text = await document_flight.do(doc_url, lambda: _extract_single_document(doc_url))
+        if text:
+            await run_in_threadpool(document_store.put, chatbot_id, {doc_url: text})
+    return text
+
+async def invalidate_document(chatbot_id: str, doc_url: Optional[str] = None):
+    """
+    Drop stored text for one of a chatbot's documents, or for all of them.
+    """
+    await run_in_threadpool(document_store.delete, chatbot_id, doc_url)
+
+async def extract_document_content(chatbot_id: str, document_urls: list) -> str:
+    # Documents are downloaded and parsed in parallel, then joined in their original order
+    texts = await asyncio.gather(*(extract_document_text(chatbot_id, doc_url) for doc_url in document_urls))
+    return "".join(texts)
+
+async def get_document_contexts(chatbot: dict) -> List[str]:
+    """
+    Build the document part of a chatbot's prompt, one entry per document in the order they were added.
+
+    Stored digests are used by default; documents without one (e.g. bots created
+    before digests existed) and everything in "full" mode use the extracted text.
+    A document that could not be read comes back as an empty string.
+    """
+    digests = chatbot.get('document_digests') or {}
+    use_digests = settings.DOCUMENT_CONTEXT_MODE == "digest"
+
+    async def context_for(doc_url: str) -> str:
+        digest = digests.get(doc_url)
+        if use_digests and digest:
+            return render_digest(digest)
+        return await extract_document_text(chatbot['id'], doc_url)
+
+    return list(await asyncio.gather(*(context_for(doc_url) for doc_url in chatbot.get('documents') or [])))
+
+async def build_system_message(chatbot: dict) -> str:
+    """
+    The chatbot's system prompt, rendered once per bot version so that every turn
+    (and every conversation) with the bot starts with the same bytes.
+    """
+    version = prompt_builder.chatbot_version(chatbot)
+    system_message = prompt_builder.chatbot_prompts.get(version)
+    if system_message is not None:
+        return system_message
+
+    documents = await get_document_contexts(chatbot)
+    system_message = prompt_builder.chatbot_system_prompt(chatbot, documents)
+    # A document that failed to download is retried on the next turn rather than cached as missing
+    if all(documents):
+        prompt_builder.chatbot_prompts.set(version, system_message)
+    logging.debug(f"System message for chatbot {chatbot.get('id')}: {len(system_message)} chars")
+    return system_message
+
+async def create_chat_completion(
+    system_message: str,
+    user_message: str,
+    history: Optional[List[dict]] = None,
+    endpoint: str = "chat",
+    routing: Optional[dict] = None,
+) -> dict:
+    """
+    Run one chatbot completion on the model picked by the bot's routing policy,
+    under the endpoint's deadline and retry policy.
+
+    Returns:
+        dict: "reply" text, the "model" that answered and "usage" token counts,
+        including the prompt tokens the provider served from its prompt cache.
+    """
+    messages = [
+        {"role": "system", "content": system_message},
+        *(history or []),
+        {"role": "user", "content": user_message}
+    ]
+    decision = model_router.route(routing, "chat", model_router.estimate_prompt_tokens(messages), default_max_tokens=500)
+    started = time.monotonic()
+    response = await call_model(endpoint, lambda: client.chat.completions.create(
+        model=decision.model,
+        messages=messages,
+        max_tokens=decision.max_tokens,
+        n=1,
+        temperature=0.7,
+    ))
+    model_router.record(decision, time.monotonic() - started)
+    usage = response.usage
+    cached_tokens = prompt_builder.cached_tokens(usage)
+    if usage:
+        prompt_builder.record_usage(endpoint, usage.prompt_tokens, cached_tokens)
+    return {
+        "reply": response.choices[0].message.content.strip(),
+        "model": decision.model,
+        "usage": {
+            "prompt_tokens": usage.prompt_tokens,
+            "completion_tokens": usage.completion_tokens,
+            "total_tokens": usage.total_tokens,
+            "cached_tokens": cached_tokens,
+        } if usage else None,
+    }
+
+class ChatReplyError(Exception):
+    """Raised when the model gave no answer; the message is an apology fit to show the user."""
+
+async def get_chatbot_response(chatbot: dict, user_message: str, history: Optional[List[dict]] = None) -> str:
+    """
+    Answer one chat message.
+
+    Raises:
+        ChatReplyError: If the model could not answer. The apology is not a model
+            answer, so it should not become part of the conversation history.
+    """
     try:
         logging.info(f"Chatbot object received in get_chatbot_response: {chatbot}")
         
-        system_message = f"You are a chatbot named {chatbot['name']}. "
-        
-        if chatbot.get('instructions'):
-            system_message += f"Instructions: {chatbot['instructions']} "
-        
-        if chatbot.get('tone'):
-            system_message += f"Please respond in a {chatbot['tone']} tone. "
-        
-        if chatbot.get('documents'):
-            document_content = extract_document_content(chatbot['documents'])
-            system_message += f"""
-                Respond as if you are an expert of the documents contents. 
-                Do not quote the documents as if the ideas are not your own. 
-                Speak as though the contents of the document are fact and your own views. 
-                Keep your responses concise and now more than a few sentences in most cases. 
-                Here are the content of the documents: {document_content}
-                """
-
-        logging.info(f"System message for OpenAI: {system_message}")
-        
-        response = client.chat.completions.create(
-            model="gpt-4o",  # or "gpt-3.5-turbo" if you prefer
-            messages=[
-                {"role": "system", "content": system_message},
-                {"role": "user", "content": user_message}
-            ],
-            max_tokens=500,  # Increased max_tokens to allow for longer responses
-            n=1,
-            temperature=0.7,
-        )
-        bot_reply = response.choices[0].message.content.strip()
-        return bot_reply
+        system_message = await build_system_message(chatbot)
+        completion = await create_chat_completion(system_message, user_message, history, routing=chatbot.get('model_routing'))
+        return completion["reply"]
+    except (CircuitOpenError, asyncio.TimeoutError) as e:
+        logging.error(f"OpenAI unavailable for chat: {type(e).__name__} {e}")
+        raise ChatReplyError("Sorry, I'm having trouble responding right now. Please try again in a moment.")
     except Exception as e:
         logging.error(f"OpenAI API error: {e}")
-        return "Sorry, I couldn't process your request due to an API error."
+        raise ChatReplyError("Sorry, I couldn't process your request due to an API error.")
@@ -0,0 +1,162 @@
+# backend/app/services/prompt_builder.py
+
+import hashlib
+import json
+import re
+from typing import List, Optional
+from app.core.config import settings
+from app.core.metrics import counter
+from app.utils.cache import TTLCache
+
+# Prompts are laid out so the part that changes least comes first: fixed rules,
+# then documents, then the bot's own settings. Providers cache the longest
+# byte-identical prefix of a request, so everything here must render the same
+# bytes for the same bot version: no timestamps, no unordered containers, and
+# whitespace normalized once.
+
+prompt_tokens_total = counter("prompt_tokens_total", "Prompt tokens sent to the model provider by endpoint")
+prompt_cached_tokens_total = counter("prompt_cached_tokens_total", "Prompt tokens served from the provider's prompt cache by endpoint")
+
+CHAT_RULES = "You are a helpful chatbot. Follow the instructions and tone given below."
+
+CHAT_DOCUMENT_RULES = (
+    "Respond as if you are an expert on the contents of the documents below.\n"
+    "Do not quote the documents as if the ideas are not your own.\n"
+    "Speak as though the contents of the documents are fact and your own views.\n"
+    "Keep your responses concise, no more than a few sentences in most cases."
+)
+
+SURVEY_RULES = (
+    "You are a survey bot. Conduct the survey in a conversational manner, asking one question at a time.\n"
+    "Do not reveal all questions at once. Wait for the user's response before moving to the next question.\n"
+    "After each user response, you should:\n"
+    "1. Acknowledge their answer.\n"
+    "2. Ask the next question in the survey.\n"
+    "3. If it's the last question, thank the user for completing the survey."
+)
+
+SURVEY_GREETING_RULES = (
+    "You are a survey bot. Create an initial greeting for the survey described below.\n"
+    "Your greeting should:\n"
+    "1. Introduce the survey topic\n"
+    "2. Ask for the user's name\n"
+    "3. Be concise and welcoming\n"
+    "Do not ask any survey questions yet."
+)
+
+SURVEY_GREETING_REQUEST = "Generate the initial greeting for the survey."
+
+# Rendered system prompts per bot version
+chatbot_prompts = TTLCache(maxsize=settings.PROMPT_CACHE_SIZE, ttl=settings.PROMPT_CACHE_TTL_SECONDS)
+_survey_prompts = TTLCache(maxsize=settings.PROMPT_CACHE_SIZE, ttl=settings.PROMPT_CACHE_TTL_SECONDS)
+
+
+def normalize(text: Optional[str]) -> str:
+    """
+    Canonical whitespace: no trailing spaces, no runs of blank lines, no leading or trailing blank space.
+    """
+    if not text:
+        return ""
+    lines = [line.rstrip() for line in text.replace("\r\n", "\n").split("\n")]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines)).strip()
+
+
+def _digest(parts) -> str:
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def chatbot_version(chatbot: dict) -> str:
+    """
+    Key of everything that goes into a chatbot's system prompt; equal keys render equal bytes.
+    """
+    return _digest([
+        chatbot.get("id"), chatbot.get("name"), chatbot.get("instructions"), chatbot.get("tone"),
+        chatbot.get("documents") or [], chatbot.get("document_digests") or {}, settings.DOCUMENT_CONTEXT_MODE,
+    ])
+
+
+def chatbot_system_prompt(chatbot: dict, documents: List[str]) -> str:
+    """
+    Render a chatbot's system prompt: fixed rules, documents, then the bot's settings.
+
+    Args:
+        chatbot (dict): The chatbot row.
+        documents (List[str]): Document context, one entry per document in the order they were added.
+
+    Returns:
+        str: The system prompt.
+    """
+    sections = [CHAT_RULES]
+    rendered = [normalize(text) for text in documents if text and text.strip()]
+    if rendered:
+        sections.append(CHAT_DOCUMENT_RULES)
+        sections.append("Here are the contents of the documents:\n\n" + "\n\n---\n\n".join(rendered))
+
+    # The bot's settings come after the documents, so editing them keeps the document prefix cached
+    settings_lines = [f"Your name is {normalize(chatbot['name'])}."]
+    if chatbot.get("instructions"):
+        settings_lines.append(f"Instructions: {normalize(chatbot['instructions'])}")
+    if chatbot.get("tone"):
+        settings_lines.append(f"Please respond in a {normalize(chatbot['tone'])} tone.")
+    sections.append("\n".join(settings_lines))
+    return "\n\n".join(sections)
+
+
+def _format_questions(questions: List[dict]) -> str:
+    return "\n".join(f"{q['order_number']}. {normalize(q['question_text'])} (Type: {q['question_type']})" for q in questions)
+
+
+def _survey_description(survey_bot: dict) -> str:
+    return (
+        f"Your name is {normalize(survey_bot['name'])}.\n\n"
+        f"Instructions:\n{normalize(survey_bot.get('instructions'))}\n\n"
+        f"Questions:\n{_format_questions(survey_bot['questions'])}"
+    )
+
+
+def _survey_key(survey_bot: dict, kind: str) -> tuple:
+    questions = tuple((q.get("id"), q["order_number"], q["question_text"], q["question_type"]) for q in survey_bot["questions"])
+    return (kind, survey_bot.get("id"), str(survey_bot.get("updated_at")), survey_bot.get("name"),
+            survey_bot.get("instructions"), hash(questions))
+
+
+def survey_system_prompt(survey_bot: dict) -> str:
+    """
+    The survey agent's system prompt, rendered once per survey version.
+    """
+    key = _survey_key(survey_bot, "agent")
+    prompt = _survey_prompts.get(key)
+    if prompt is None:
+        prompt = f"{SURVEY_RULES}\n\n{_survey_description(survey_bot)}"
+        _survey_prompts.set(key, prompt)
+    return prompt
+
+
+def survey_greeting_prompt(survey_bot: dict) -> str:
+    """
+    The system prompt for a survey's opening greeting, rendered once per survey version.
+    """
+    key = _survey_key(survey_bot, "greeting")
+    prompt = _survey_prompts.get(key)
+    if prompt is None:
+        prompt = f"{SURVEY_GREETING_RULES}\n\n{_survey_description(survey_bot)}"
+        _survey_prompts.set(key, prompt)
+    return prompt
+
+
+def cached_tokens(usage) -> int:
+    """
+    Cached prompt tokens from an OpenAI usage object or dict (0 when not reported).
+    """
+    if usage is None:
+        return 0
+    details = usage.get("prompt_tokens_details") if isinstance(usage, dict) else getattr(usage, "prompt_tokens_details", None)
+    if details is None:
+        return 0
+    value = details.get("cached_tokens") if isinstance(details, dict) else getattr(details, "cached_tokens", None)
+    return value or 0
+
+
+def record_usage(endpoint: str, prompt_tokens: Optional[int], cached: int):
+    prompt_tokens_total.inc(prompt_tokens or 0, endpoint=endpoint)
+    prompt_cached_tokens_total.inc(cached, endpoint=endpoint)
@@ -0,0 +1,239 @@
+# backend/app/services/public_tokens.py
+
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.core.metrics import counter, gauge
+from app.db.session import get_supabase
+from app.utils.bloom import BloomFilter
+from app.utils.cache import TTLCache
+from app.utils.single_flight import SingleFlight
+
+# Public routes look bots up by token, and scrapers and stale shared links send
+# plenty of tokens that do not exist. Each worker keeps a Bloom filter of the
+# valid tokens per table, so those requests are answered with a 404 without a
+# database round trip:
+#
+#   * the filter is rebuilt from the table every PUBLIC_TOKEN_REBUILD_SECONDS;
+#   * tokens issued or deleted by this worker take effect immediately;
+#   * a token the filter does not know may have been issued by another worker,
+#     so a miss first waits for an incremental read of the rows created since the
+#     last refresh (at most one per PUBLIC_TOKEN_MISS_REFRESH_SECONDS, shared by
+#     every miss in between), and is only rejected if a read that began after the
+#     request arrived does not have it;
+#   * rejected tokens, and tokens the filter let through but the database did not
+#     have, are remembered in a short-TTL negative cache.
+#
+# Until the first build finishes, or if the filter is disabled, every token is let through.
+
+_PAGE_ROWS = 1000
+# Rows created this long before the last refresh are read again, covering clock
+# skew between workers and the database and inserts that commit late
+_REFRESH_OVERLAP = timedelta(seconds=120)
+
+public_token_checks_total = counter("public_token_checks_total", "Public token checks by table and result (admitted, unchecked, rejected, rejected_cached)")
+public_token_refreshes_total = counter("public_token_refreshes_total", "Token filter reads by table and kind (rebuild, incremental) and outcome")
+public_token_filter_items = gauge("public_token_filter_items", "Tokens in the token filter by table")
+
+
+def _read_tokens(table: str, since: Optional[datetime] = None) -> List[str]:
+    supabase = get_supabase()
+    tokens, offset = [], 0
+    while True:
+        query = supabase.table(table).select("token")
+        if since is not None:
+            query = query.gte("created_at", since.isoformat())
+        rows = query.order("id").range(offset, offset + _PAGE_ROWS - 1).execute().data or []
+        tokens.extend(row["token"] for row in rows if row.get("token"))
+        if len(rows) < _PAGE_ROWS:
+            return tokens
+        offset += _PAGE_ROWS
+
+
+class TokenFilter:
+    """
+    Valid public tokens of one table, for rejecting unknown tokens early; see the module comment.
+    """
+
+    def __init__(self, table: str):
+        self.table = table
+        self._filter: Optional[BloomFilter] = None
+        self._negative = TTLCache(maxsize=settings.PUBLIC_TOKEN_NEGATIVE_CACHE_SIZE, ttl=settings.PUBLIC_TOKEN_NEGATIVE_CACHE_TTL_SECONDS)
+        # Changes made here while a rebuild is reading, replayed onto the new filter (monotonic times)
+        self._added: Dict[str, float] = {}
+        self._removed: Dict[str, float] = {}
+        # Wall clock start of the last successful read; the next incremental read starts there
+        self._since: Optional[datetime] = None
+        self._refresh_started = 0.0
+        self._last_miss_refresh = 0.0
+        self._lock = asyncio.Lock()
+        self._flight = SingleFlight(f"{table}_tokens")
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self._filter is not None
+
+    def add(self, token: str):
+        """
+        Record a token issued by this worker.
+        """
+        self._negative.delete(token)
+        self._removed.pop(token, None)
+        self._added[token] = time.monotonic()
+        if self._filter is not None:
+            self._filter.add(token)
+
+    def remove(self, token: str):
+        """
+        Record that a token's bot was deleted. Bloom filters cannot forget, so the
+        token is kept aside until a rebuild that started after the delete.
+        """
+        self._added.pop(token, None)
+        self._removed[token] = time.monotonic()
+
+    def note_missing(self, token: str):
+        """
+        Remember a token that passed the filter but has no row, e.g. a bot deleted
+        by another worker or a false positive.
+        """
+        if self._filter is not None:
+            self._negative.set(token, True)
+
+    async def admit(self, token: str) -> bool:
+        """
+        Whether a token may exist and is worth a database lookup.
+
+        Returns:
+            bool: False only for tokens known not to exist.
+        """
+        if token in self._removed or token in self._negative:
+            public_token_checks_total.inc(table=self.table, result="rejected_cached")
+            return False
+        if self._filter is None:
+            public_token_checks_total.inc(table=self.table, result="unchecked")
+            return True
+        if token in self._filter:
+            public_token_checks_total.inc(table=self.table, result="admitted")
+            return True
+
+        arrived = time.monotonic()
+        try:
+            await self._flight.do("miss", self._refresh_after_miss)
+        except Exception as e:
+            logging.error(f"Incremental {self.table} token refresh failed: {e}")
+            public_token_checks_total.inc(table=self.table, result="unchecked")
+            return True
+        if token in self._filter:
+            public_token_checks_total.inc(table=self.table, result="admitted")
+            return True
+        if self._refresh_started < arrived:
+            # Joined a read that began before this request arrived; a row created
+            # just before then may not be in it, so the database decides
+            public_token_checks_total.inc(table=self.table, result="unchecked")
+            return True
+        self._negative.set(token, True)
+        public_token_checks_total.inc(table=self.table, result="rejected")
+        return False
+
+    async def _refresh_after_miss(self):
+        wait = self._last_miss_refresh + settings.PUBLIC_TOKEN_MISS_REFRESH_SECONDS - time.monotonic()
+        if wait > 0:
+            await asyncio.sleep(wait)
+        self._last_miss_refresh = time.monotonic()
+        await self.refresh()
+
+    async def refresh(self):
+        """
+        Add the tokens of rows created since the last read.
+        """
+        async with self._lock:
+            if self._filter is None:
+                return
+            self._refresh_started = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            try:
+                tokens = await run_in_threadpool(_read_tokens, self.table, self._since - _REFRESH_OVERLAP)
+            except Exception:
+                public_token_refreshes_total.inc(table=self.table, kind="incremental", outcome="error")
+                raise
+            public_token_refreshes_total.inc(table=self.table, kind="incremental", outcome="ok")
+            for token in tokens:
+                if token not in self._filter:
+                    self._filter.add(token)
+            self._since = started_at
+            public_token_filter_items.set(self._filter.count, table=self.table)
+
+    async def rebuild(self):
+        """
+        Replace the filter with one built from every token in the table.
+        """
+        async with self._lock:
+            self._refresh_started = started = time.monotonic()
+            started_at = datetime.now(timezone.utc)
+            try:
+                tokens = await run_in_threadpool(_read_tokens, self.table)
+            except Exception:
+                public_token_refreshes_total.inc(table=self.table, kind="rebuild", outcome="error")
+                raise
+            public_token_refreshes_total.inc(table=self.table, kind="rebuild", outcome="ok")
+
+            # Room to grow until the next rebuild without losing accuracy
+            rebuilt = BloomFilter(max(2 * len(tokens), settings.PUBLIC_TOKEN_FILTER_MIN_CAPACITY), settings.PUBLIC_TOKEN_FILTER_ERROR_RATE)
+            rebuilt.update(tokens)
+            # Issues and deletes from before the read are in the data already
+            self._added = {token: at for token, at in self._added.items() if at >= started}
+            self._removed = {token: at for token, at in self._removed.items() if at >= started}
+            rebuilt.update(self._added)
+            self._filter = rebuilt
+            self._since = started_at
+            self._negative.clear()
+            public_token_filter_items.set(rebuilt.count, table=self.table)
+            logging.info(f"Built {self.table} token filter with {len(tokens)} tokens")
+
+    async def _run(self):
+        while True:
+            try:
+                await self.rebuild()
+                delay = settings.PUBLIC_TOKEN_REBUILD_SECONDS
+            except Exception as e:
+                logging.error(f"Failed to build {self.table} token filter: {e}")
+                delay = min(settings.PUBLIC_TOKEN_REBUILD_SECONDS, 30.0)
+            # Rebuild early once growth has filled the filter past its sizing
+            deadline = time.monotonic() + delay
+            while time.monotonic() < deadline and not (self._filter is not None and self._filter.full):
+                await asyncio.sleep(min(5.0, delay))
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+
+chatbot_tokens = TokenFilter("chatbots")
+survey_tokens = TokenFilter("survey_bots")
+
+
+def start():
+    """
+    Start building and refreshing the token filters (PUBLIC_TOKEN_FILTER_ENABLED).
+    """
+    chatbot_tokens.start()
+    survey_tokens.start()
+
+
+async def stop():
+    await asyncio.gather(chatbot_tokens.stop(), survey_tokens.stop())
@@ -0,0 +1,181 @@
+# backend/app/services/survey_aggregates.py
+
+import logging
+from typing import Dict, List, Optional, Tuple
+from fastapi.concurrency import run_in_threadpool
+from postgrest.exceptions import APIError
+from app.db.session import get_supabase
+from app.services.answer_validators import match_options
+
+# One row per survey in "survey_aggregates": counters (jsonb) plus a version
+# used for optimistic concurrency between workers.
+MAX_UPDATE_ATTEMPTS = 5
+OTHER_OPTION = "__other__"
+
+
+def empty_counters() -> dict:
+    return {"started": 0, "responses": 0, "completed": 0, "questions": {}}
+
+
+def apply_answers(counters: dict, questions: List[dict], answers: Dict[str, str], completed: bool = True) -> dict:
+    """
+    Fold one response's answers into the counters, in place.
+
+    Args:
+        counters (dict): Counters as produced by empty_counters().
+        questions (List[dict]): The survey's questions; options are read from here.
+        answers (Dict[str, str]): Answers keyed by question id.
+        completed (bool): Whether the response finished the survey.
+
+    Returns:
+        dict: The updated counters.
+    """
+    counters["responses"] += 1
+    if completed:
+        counters["completed"] += 1
+
+    question_counters = counters.setdefault("questions", {})
+    for question in questions:
+        answer = answers.get(question["id"])
+        if not answer:
+            continue
+
+        stats = question_counters.setdefault(question["id"], {"answered": 0, "total_length": 0, "min_length": None, "max_length": None})
+        length = len(answer)
+        stats["answered"] += 1
+        stats["total_length"] += length
+        stats["min_length"] = length if stats["min_length"] is None else min(stats["min_length"], length)
+        stats["max_length"] = length if stats["max_length"] is None else max(stats["max_length"], length)
+
+        if question.get("options"):
+            option_counts = stats.setdefault("options", {})
+            matched = match_options(answer, question["options"]) or [OTHER_OPTION]
+            for option in matched:
+                option_counts[option] = option_counts.get(option, 0) + 1
+
+    return counters
+
+
+def _update_counters(survey_bot_id: str, change) -> Optional[dict]:
+    supabase = get_supabase()
+    for _ in range(MAX_UPDATE_ATTEMPTS):
+        rows = supabase.table("survey_aggregates").select("counters, version").eq("survey_bot_id", survey_bot_id).execute().data
+        if not rows:
+            counters = change(empty_counters())
+            try:
+                supabase.table("survey_aggregates").insert({"survey_bot_id": survey_bot_id, "counters": counters, "version": 1}).execute()
+                return counters
+            except APIError:
+                # Another worker created the row first; retry as an update
+                continue
+
+        version = rows[0]["version"]
+        counters = change(rows[0]["counters"] or empty_counters())
+        updated = supabase.table("survey_aggregates").update({"counters": counters, "version": version + 1}) \
+            .eq("survey_bot_id", survey_bot_id).eq("version", version).execute()
+        if updated.data:
+            return counters
+    logging.error(f"Gave up updating survey aggregates for {survey_bot_id} after {MAX_UPDATE_ATTEMPTS} conflicting attempts")
+    return None
+
+
+async def record_started(survey_bot_id: str):
+    """
+    Count a survey conversation that has just started.
+    """
+    def change(counters: dict) -> dict:
+        counters["started"] += 1
+        return counters
+
+    try:
+        await run_in_threadpool(_update_counters, survey_bot_id, change)
+    except Exception as e:
+        logging.error(f"Failed to record survey start for {survey_bot_id}: {e}")
+
+
+async def record_response(survey_bot_id: str, questions: List[dict], answers: Dict[str, str], completed: bool = True, started: bool = False):
+    """
+    Fold a recorded response into the survey's aggregates.
+
+    Args:
+        survey_bot_id (str): The survey.
+        questions (List[dict]): The survey's questions.
+        answers (Dict[str, str]): Answers keyed by question id.
+        completed (bool): Whether the response finished the survey.
+        started (bool): Also count the response as started (for submissions that never went through chat).
+    """
+    def change(counters: dict) -> dict:
+        if started:
+            counters["started"] += 1
+        return apply_answers(counters, questions, answers, completed)
+
+    try:
+        await run_in_threadpool(_update_counters, survey_bot_id, change)
+    except Exception as e:
+        # Aggregates are derived data; never fail the submission because of them
+        logging.error(f"Failed to update survey aggregates for {survey_bot_id}: {e}")
+
+
+async def record_responses(survey_bot_id: str, questions: List[dict], responses: List[Tuple[Dict[str, str], bool]], started: bool = False):
+    """
+    Fold a batch of recorded responses into the survey's aggregates with a single update.
+
+    Args:
+        survey_bot_id (str): The survey.
+        questions (List[dict]): The survey's questions.
+        responses (List[Tuple[Dict[str, str], bool]]): (answers keyed by question id, completed) per response.
+        started (bool): Also count each response as started.
+    """
+    if not responses:
+        return
+
+    def change(counters: dict) -> dict:
+        if started:
+            counters["started"] += len(responses)
+        for answers, completed in responses:
+            apply_answers(counters, questions, answers, completed)
+        return counters
+
+    try:
+        await run_in_threadpool(_update_counters, survey_bot_id, change)
+    except Exception as e:
+        logging.error(f"Failed to update survey aggregates for {survey_bot_id}: {e}")
+
+
+def build_summary(survey_bot_id: str, counters: dict, questions: List[dict]) -> dict:
+    """
+    Turn stored counters into the summary response, in question order.
+    """
+    counters = counters or empty_counters()
+    question_counters = counters.get("questions", {})
+    started = max(counters["started"], counters["responses"])
+
+    question_summaries = []
+    for question in questions:
+        stats = question_counters.get(question["id"], {})
+        answered = stats.get("answered", 0)
+        question_summaries.append({
+            "question_id": question["id"],
+            "question_text": question["question_text"],
+            "question_type": question["question_type"],
+            "answered": answered,
+            "option_counts": stats.get("options", {}) if question.get("options") else None,
+            "min_length": stats.get("min_length"),
+            "max_length": stats.get("max_length"),
+            "avg_length": stats["total_length"] / answered if answered else None,
+        })
+
+    return {
+        "survey_bot_id": survey_bot_id,
+        "started": started,
+        "responses": counters["responses"],
+        "completed": counters["completed"],
+        "completion_rate": counters["completed"] / started if started else None,
+        "questions": question_summaries,
+    }
+
+
+def get_counters(survey_bot_id: str) -> dict:
+    supabase = get_supabase()
+    rows = supabase.table("survey_aggregates").select("counters").eq("survey_bot_id", survey_bot_id).execute().data
+    return rows[0]["counters"] if rows else empty_counters()
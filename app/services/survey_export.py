@@ -0,0 +1,185 @@
+# backend/app/services/survey_export.py
+
+import csv
+import io
+import logging
+from typing import AsyncIterator, Dict, List
+import orjson
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
+from app.db.queries import fetch_page
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # listed in requirements.txt; an install without it offers only CSV and NDJSON
+    pa = pq = None
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv; charset=utf-8",
+    "ndjson": "application/x-ndjson",
+    "parquet": "application/vnd.apache.parquet",
+}
+BASE_COLUMNS = ["response_id", "respondent_id", "completed", "created_at"]
+
+# Supabase's PostgREST caps every read at db-max-rows (1000 by default)
+_MAX_ROWS_PER_REQUEST = 1000
+_IN_CHUNK = 100
+
+
+def parquet_available() -> bool:
+    return pq is not None
+
+
+def export_columns(questions: List[dict]) -> List[str]:
+    """
+    Column headers for an export: the response fields, then one column per
+    question in order_number order, titled by its text (repeated texts get a suffix).
+    """
+    columns = list(BASE_COLUMNS)
+    seen = set(columns)
+    for question in questions:
+        title = question["question_text"].strip() or question["id"]
+        candidate, suffix = title, 2
+        while candidate in seen:
+            candidate, suffix = f"{title} ({suffix})", suffix + 1
+        seen.add(candidate)
+        columns.append(candidate)
+    return columns
+
+
+def _fetch_answers(supabase, response_ids: List[str]) -> Dict[str, Dict[str, str]]:
+    answers: Dict[str, Dict[str, str]] = {}
+    for start in range(0, len(response_ids), _IN_CHUNK):
+        chunk = response_ids[start:start + _IN_CHUNK]
+        offset = 0
+        while True:
+            rows = (supabase.table("survey_answers").select("survey_response_id, question_id, raw_answer")
+                    .in_("survey_response_id", chunk).order("id")
+                    .range(offset, offset + _MAX_ROWS_PER_REQUEST - 1).execute().data or [])
+            for row in rows:
+                answers.setdefault(row["survey_response_id"], {})[row["question_id"]] = row["raw_answer"]
+            if len(rows) < _MAX_ROWS_PER_REQUEST:
+                break
+            offset += _MAX_ROWS_PER_REQUEST
+    return answers
+
+
+async def iter_rows(supabase, survey_bot_id: str, questions: List[dict], columns: List[str]) -> AsyncIterator[List[dict]]:
+    """
+    Yield the survey's responses one page at a time, pivoted to one dict per
+    response keyed by ``columns``. Only one page is held in memory.
+    """
+    question_columns = list(zip([q["id"] for q in questions], columns[len(BASE_COLUMNS):]))
+    after = None
+    while True:
+        responses, after = await run_in_threadpool(
+            fetch_page, supabase, "survey_responses", ["id", "respondent_id", "completed", "created_at"],
+            {"survey_bot_id": survey_bot_id}, settings.EXPORT_PAGE_SIZE, after, settings.EXPORT_PAGE_SIZE,
+        )
+        if responses:
+            answers = await run_in_threadpool(_fetch_answers, supabase, [r["id"] for r in responses])
+            page = []
+            for response in responses:
+                response_answers = answers.get(response["id"], {})
+                row = {
+                    "response_id": response["id"],
+                    "respondent_id": response["respondent_id"],
+                    "completed": response["completed"],
+                    "created_at": response["created_at"],
+                }
+                for question_id, column in question_columns:
+                    row[column] = response_answers.get(question_id)
+                page.append(row)
+            yield page
+        if after is None:
+            return
+
+
+async def csv_chunks(pages: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    buffer = io.StringIO()
+    # The BOM makes spreadsheet apps read the file as UTF-8
+    buffer.write("\ufeff")
+    writer = csv.DictWriter(buffer, fieldnames=columns)
+    writer.writeheader()
+    async for page in pages:
+        writer.writerows(page)
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate(0)
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+async def ndjson_chunks(pages: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    async for page in pages:
+        yield b"".join(orjson.dumps(row) + b"\n" for row in page)
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file that hands written bytes back out, so parquet can be streamed."""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data, self._chunks = b"".join(self._chunks), []
+        return data
+
+
+async def parquet_chunks(pages: AsyncIterator[List[dict]], columns: List[str]) -> AsyncIterator[bytes]:
+    schema = pa.schema(
+        [(column, pa.bool_() if column == "completed" else pa.string()) for column in columns]
+    )
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+    try:
+        async for page in pages:
+            # One row group per page
+            writer.write_table(pa.Table.from_pylist(page, schema=schema))
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+async def export_survey(supabase, survey_bot_id: str, questions: List[dict], export_format: str) -> AsyncIterator[bytes]:
+    """
+    Stream a survey's results as CSV, NDJSON or Parquet.
+
+    Args:
+        supabase: The Supabase client.
+        survey_bot_id (str): The survey to export.
+        questions (List[dict]): Its questions, in order_number order.
+        export_format (str): "csv", "ndjson" or "parquet".
+
+    Returns:
+        AsyncIterator[bytes]: The encoded file, one chunk per page of responses.
+    """
+    columns = export_columns(questions)
+    pages = iter_rows(supabase, survey_bot_id, questions, columns)
+    encoders = {"csv": csv_chunks, "ndjson": ndjson_chunks, "parquet": parquet_chunks}
+    exported = 0
+    try:
+        async for chunk in encoders[export_format](pages, columns):
+            exported += 1
+            yield chunk
+    except Exception as e:
+        # Headers are already sent; the client sees a truncated file
+        logging.error(f"Export of survey {survey_bot_id} failed after {exported} chunks: {e}", exc_info=True)
+        raise
+    logging.info(f"Exported survey {survey_bot_id} as {export_format} in {exported} chunks")
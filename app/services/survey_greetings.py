@@ -0,0 +1,110 @@
+# backend/app/services/survey_greetings.py
+
+import asyncio
+import hashlib
+import logging
+import random
+from typing import Awaitable, Callable, Hashable, List, Set
+from app.core.config import settings
+from app.core.metrics import counter
+from app.services import prompt_builder
+from app.utils.cache import TTLCache
+from app.utils.single_flight import SingleFlight
+
+# A small pool of model-written greetings per survey version, so a new respondent
+# sees the first message without waiting on the model. Pools are per worker: they
+# are filled when a survey is created or updated, and on a miss the first
+# respondent's greeting is generated (once per version, however many arrive
+# together) and the rest of the pool is topped up in the background.
+
+survey_greetings_total = counter("survey_greetings_total", "Survey greetings served by source (cached, generated)")
+
+_pools = TTLCache(maxsize=settings.SURVEY_GREETING_CACHE_SIZE, ttl=settings.SURVEY_GREETING_CACHE_TTL_SECONDS)
+greeting_flight = SingleFlight("survey_greeting")
+_filling: Set[Hashable] = set()
+_tasks: Set[asyncio.Task] = set()
+
+
+def greeting_key(survey_bot: dict) -> tuple:
+    """
+    (survey_bot_id, updated_at, prompt digest): the digest also covers edits that
+    leave the survey row's updated_at alone, such as question changes.
+    """
+    prompt = prompt_builder.survey_greeting_prompt(survey_bot)
+    return (survey_bot["id"], str(survey_bot.get("updated_at")), hashlib.sha256(prompt.encode()).hexdigest())
+
+
+def _add(key: tuple, greeting: str):
+    pool: List[str] = list(_pools.get(key) or [])
+    if greeting and len(pool) < settings.SURVEY_GREETING_POOL_SIZE:
+        pool.append(greeting)
+        _pools.set(key, pool)
+
+
+async def _generate_into_pool(key: tuple, generate: Callable[[], Awaitable[str]]) -> str:
+    # Added once here rather than by every caller sharing the result
+    greeting = await generate()
+    _add(key, greeting)
+    return greeting
+
+
+async def _fill(key: tuple, generate: Callable[[], Awaitable[str]]):
+    try:
+        missing = settings.SURVEY_GREETING_POOL_SIZE - len(_pools.get(key) or [])
+        greetings = await asyncio.gather(*(generate() for _ in range(missing)), return_exceptions=True)
+        for greeting in greetings:
+            if isinstance(greeting, Exception):
+                logging.error(f"Failed to pre-generate survey greeting for {key[0]}: {greeting}")
+            else:
+                _add(key, greeting)
+    finally:
+        _filling.discard(key)
+
+
+def warm(survey_bot: dict, generate: Callable[[], Awaitable[str]]):
+    """
+    Top up a survey version's greeting pool in the background.
+
+    Args:
+        survey_bot (dict): The survey bot with its questions in order_number order.
+        generate (Callable[[], Awaitable[str]]): Writes one greeting; must not stream to a respondent.
+    """
+    key = greeting_key(survey_bot)
+    if key in _filling or len(_pools.get(key) or []) >= settings.SURVEY_GREETING_POOL_SIZE:
+        return
+    _filling.add(key)
+    task = asyncio.create_task(_fill(key, generate))
+    _tasks.add(task)
+    task.add_done_callback(_tasks.discard)
+
+
+def invalidate(survey_bot_id: str):
+    """
+    Drop every greeting pool of a survey, e.g. once it has been edited.
+    """
+    _pools.delete_where(lambda key: key[0] == survey_bot_id)
+
+
+async def get_greeting(survey_bot: dict, generate: Callable[[], Awaitable[str]]) -> str:
+    """
+    A greeting for a new conversation: from the pool when there is one, otherwise
+    generated now (coalesced per survey version) while the pool is refilled.
+
+    Args:
+        survey_bot (dict): The survey bot with its questions.
+        generate (Callable[[], Awaitable[str]]): Writes one greeting. On a miss its result
+            goes to every respondent waiting, so it must not stream to any one connection.
+
+    Returns:
+        str: The greeting.
+    """
+    key = greeting_key(survey_bot)
+    pool = _pools.get(key)
+    if pool:
+        survey_greetings_total.inc(source="cached")
+        greeting = random.choice(pool)
+    else:
+        survey_greetings_total.inc(source="generated")
+        greeting = await greeting_flight.do(key, lambda: _generate_into_pool(key, generate))
+    warm(survey_bot, generate)
+    return greeting
@@ -0,0 +1,44 @@
+# backend/app/services/survey_http_cache.py
+
+import hashlib
+from typing import Optional
+from app.core.config import settings
+from app.utils.cache import TTLCache
+
+# Rendered public survey definitions keyed by token: (etag, body bytes).
+# Owner updates and deletes evict the entry; other workers catch up within the TTL.
+rendered_surveys = TTLCache(maxsize=settings.SURVEY_PUBLIC_CACHE_SIZE, ttl=settings.SURVEY_PUBLIC_CACHE_TTL_SECONDS)
+
+
+def compute_etag(body: bytes) -> str:
+    """
+    Strong ETag for a rendered survey definition: a hash of the exact bytes
+    served, so any change to what respondents see changes the tag, whether or
+    not the row's updated_at moved.
+    """
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = set()
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            # Weak comparison is allowed for If-None-Match
+            candidate = candidate[2:]
+        for suffix in ('-br"', '-gzip"'):
+            # Compressed representations carry an encoding suffix (see CompressionMiddleware)
+            if candidate.endswith(suffix):
+                candidate = candidate[:-len(suffix)] + '"'
+        candidates.add(candidate)
+    return "*" in candidates or etag in candidates
+
+
+def cache_headers(etag: str) -> dict:
+    return {"ETag": etag, "Cache-Control": settings.SURVEY_PUBLIC_CACHE_CONTROL}
+
+
+def invalidate_survey(token: str):
+    rendered_surveys.delete(token)
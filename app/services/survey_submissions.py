@@ -0,0 +1,156 @@
+# backend/app/services/survey_submissions.py
+
+import logging
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+from postgrest.types import ReturnMethod
+from app.core.config import settings
+from app.schemas.surveybot import BulkSurveySubmission, BulkSubmitItemResult
+
+# Responses submitted with an idempotency key get an id derived from (survey, key),
+# and their answers ids derived from (response, question). A retried sync therefore
+# produces the same primary keys, and inserts that ignore duplicates make it a no-op
+# without any extra table or column.
+_RESPONSE_NAMESPACE = uuid.UUID("5b0c8f4e-7a4d-4e3c-9a51-2f5d3c1b8e60")
+_IN_CHUNK = 100
+
+
+def response_id_for(survey_bot_id: str, idempotency_key: str) -> str:
+    return str(uuid.uuid5(_RESPONSE_NAMESPACE, f"{survey_bot_id}:{idempotency_key}"))
+
+
+def _answer_id(response_id: str, question_id: str) -> str:
+    return str(uuid.uuid5(uuid.UUID(response_id), question_id))
+
+
+def _validate(submission: BulkSurveySubmission, questions: Dict[str, dict]) -> Optional[str]:
+    if not submission.answers:
+        return "No answers"
+    unknown = sorted(question_id for question_id in submission.answers if question_id not in questions)
+    if unknown:
+        return f"Unknown question ids: {', '.join(unknown[:5])}"
+    return None
+
+
+def _existing_response_ids(supabase, response_ids: List[str]) -> Set[str]:
+    existing = set()
+    for start in range(0, len(response_ids), _IN_CHUNK):
+        chunk = response_ids[start:start + _IN_CHUNK]
+        rows = supabase.table("survey_responses").select("id").in_("id", chunk).execute().data or []
+        existing.update(row["id"] for row in rows)
+    return existing
+
+
+def _insert_chunked(supabase, table: str, rows: List[dict], owners: List[int]) -> Dict[int, str]:
+    """
+    Insert ``rows`` in chunks of BULK_SUBMIT_CHUNK_ROWS, skipping rows whose id exists.
+
+    Returns:
+        Dict[int, str]: Error message per owning item index, for the chunks that failed.
+    """
+    errors: Dict[int, str] = {}
+    size = settings.BULK_SUBMIT_CHUNK_ROWS
+    for start in range(0, len(rows), size):
+        try:
+            supabase.table(table).upsert(rows[start:start + size], returning=ReturnMethod.minimal,
+                                         ignore_duplicates=True, on_conflict="id").execute()
+        except Exception as e:
+            logging.error(f"Bulk insert into {table} failed for rows {start}-{start + size}: {e}")
+            for index in owners[start:start + size]:
+                errors.setdefault(index, f"Failed to write {table}")
+    return errors
+
+
+def _delete_responses(supabase, response_ids: List[str]):
+    # Answers go with their response (on delete cascade)
+    for start in range(0, len(response_ids), _IN_CHUNK):
+        chunk = response_ids[start:start + _IN_CHUNK]
+        try:
+            supabase.table("survey_responses").delete(returning=ReturnMethod.minimal).in_("id", chunk).execute()
+        except Exception as e:
+            logging.error(f"Failed to remove {len(chunk)} survey responses whose answers were not written: {e}")
+
+
+def submit_bulk(supabase, survey_bot_id: str, questions: List[dict], submissions: List[BulkSurveySubmission]) -> List[BulkSubmitItemResult]:
+    """
+    Validate and write a batch of survey responses with chunked bulk inserts.
+
+    Args:
+        supabase: Supabase client.
+        survey_bot_id (str): The survey.
+        questions (List[dict]): The survey's questions; answers are checked against their ids.
+        submissions (List[BulkSurveySubmission]): The responses, in client order.
+
+    Returns:
+        List[BulkSubmitItemResult]: One result per submission, in the same order.
+    """
+    questions_by_id = {question["id"]: question for question in questions}
+    results: List[BulkSubmitItemResult] = []
+    accepted: List[int] = []
+    keyed: Dict[str, int] = {}
+
+    for index, submission in enumerate(submissions):
+        error = _validate(submission, questions_by_id)
+        if error:
+            results.append(BulkSubmitItemResult(index=index, status="invalid", error=error))
+            continue
+        if submission.idempotency_key is None:
+            response_id = str(uuid.uuid4())
+        else:
+            response_id = response_id_for(survey_bot_id, submission.idempotency_key)
+            if response_id in keyed:
+                # The same key twice in one batch: the first one wins
+                results.append(BulkSubmitItemResult(index=index, status="duplicate", response_id=response_id))
+                continue
+            keyed[response_id] = index
+        results.append(BulkSubmitItemResult(index=index, status="created", response_id=response_id))
+        accepted.append(index)
+
+    for response_id in _existing_response_ids(supabase, list(keyed)):
+        results[keyed[response_id]].status = "duplicate"
+
+    now = datetime.now().isoformat()
+    response_rows, response_owners = [], []
+    answer_rows, answer_owners = [], []
+    for index in accepted:
+        submission, result = submissions[index], results[index]
+        created_at = submission.submitted_at.isoformat() if submission.submitted_at else now
+        if result.status == "created":
+            response_rows.append({
+                "id": result.response_id,
+                "survey_bot_id": survey_bot_id,
+                "respondent_id": submission.respondent_id,
+                "completed": submission.completed,
+                "created_at": created_at,
+                "updated_at": now,
+            })
+            response_owners.append(index)
+        # Answers of duplicates are written too (and ignored if present), which
+        # completes a response whose answers failed on an earlier attempt
+        for question_id, answer in submission.answers.items():
+            answer_rows.append({
+                "id": _answer_id(result.response_id, question_id),
+                "survey_response_id": result.response_id,
+                "question_id": question_id,
+                "question_text": questions_by_id[question_id]["question_text"],
+                "raw_answer": answer,
+                "ai_interpretation": None,
+                "created_at": created_at,
+                "updated_at": now,
+            })
+            answer_owners.append(index)
+
+    failed = _insert_chunked(supabase, "survey_responses", response_rows, response_owners)
+    written = [(row, owner) for row, owner in zip(answer_rows, answer_owners) if owner not in failed]
+    answers_failed = _insert_chunked(supabase, "survey_answers", [row for row, _ in written], [owner for _, owner in written])
+    # A response created now whose answers failed is removed again, like create_survey_bot
+    # does on a failed questions insert: left behind, a retry would read it as a duplicate
+    # (or, without a key, add a second row) and never interpret or aggregate it
+    _delete_responses(supabase, [results[index].response_id for index in answers_failed if results[index].status == "created"])
+    failed.update(answers_failed)
+
+    for index, error in failed.items():
+        results[index].status = "failed"
+        results[index].error = error
+    return results
@@ -0,0 +1,78 @@
+# backend/app/services/survey_templates.py
+
+import random
+from typing import List, Optional
+from app.utils.cache import TTLCache
+
+# Replies for fast-mode survey turns that need no model reasoning: acknowledge
+# the answer and read out the next question, or close the survey.
+
+ACKNOWLEDGEMENTS = (
+    "Thanks!",
+    "Got it, thank you.",
+    "Great, thanks.",
+    "Thanks for sharing that.",
+    "Noted, thank you.",
+    "Perfect, thanks.",
+)
+FIRST_QUESTION_INTROS = (
+    "Nice to meet you! Let's get started.",
+    "Thanks! Let's begin.",
+    "Great, let's get started.",
+)
+COMPLETIONS = (
+    "That was the last question. Thank you for completing the survey!",
+    "All done - thank you for taking the time to complete the survey!",
+    "Thanks, that's everything. We really appreciate your answers!",
+)
+
+
+class SurveyTemplates:
+    """
+    Precompiled fast-mode replies for one survey version.
+
+    Every possible reply is rendered once up front, so a turn is a list lookup.
+    """
+
+    def __init__(self, questions: List[dict], variation: bool = True):
+        """
+        Args:
+            questions (List[dict]): The survey's questions in order.
+            variation (bool): Pick among several phrasings; otherwise always use the first.
+        """
+        self.variation = variation
+        self._next_question: List[List[str]] = []
+        for index, question in enumerate(questions):
+            text = question['question_text']
+            if question.get('options'):
+                text = f"{text} ({', '.join(question['options'])})"
+            openers = FIRST_QUESTION_INTROS if index == 0 else ACKNOWLEDGEMENTS
+            self._next_question.append([f"{opener} {text}" for opener in openers])
+        self._completion = list(COMPLETIONS)
+
+    def _pick(self, variants: List[str], rng: Optional[random.Random]) -> str:
+        if not self.variation:
+            return variants[0]
+        return (rng or random).choice(variants)
+
+    def next_question(self, question_index: int, rng: Optional[random.Random] = None) -> str:
+        return self._pick(self._next_question[question_index], rng)
+
+    def completion(self, rng: Optional[random.Random] = None) -> str:
+        return self._pick(self._completion, rng)
+
+
+_compiled = TTLCache(maxsize=512, ttl=3600)
+
+
+def get_survey_templates(survey_bot: dict, variation: bool = True) -> SurveyTemplates:
+    """
+    Return the compiled templates for a survey, reusing them while the survey is unchanged.
+    """
+    questions = tuple((q['id'], q['question_text'], tuple(q.get('options') or ())) for q in survey_bot['questions'])
+    key = (survey_bot.get('id'), str(survey_bot.get('updated_at')), hash(questions), variation)
+    templates = _compiled.get(key)
+    if templates is None:
+        templates = SurveyTemplates(survey_bot['questions'], variation)
+        _compiled.set(key, templates)
+    return templates
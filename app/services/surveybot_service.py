@@ -1,13 +1,19 @@
 # backend/app/services/surveybot_service.py
 
 from langchain.chat_models import ChatOpenAI
-from langchain.prompts import ChatPromptTemplate
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
 from langchain.memory import ConversationBufferMemory
 from langgraph.graph import StateGraph, END
-from typing import Dict, TypedDict, List
+from typing import Awaitable, Callable, Dict, TypedDict, List, Optional
 from app.core.config import settings
+from app.services.answer_validators import validate_answer, llm_calls_avoided_total
+from app.services.survey_templates import get_survey_templates
+from app.services.model_calls import call_model
+from app.services import model_router, prompt_builder, survey_greetings
+from app.utils.tokens import estimate_tokens
+import functools
 import logging
+import time
 
 class SurveyState(TypedDict):
     """
@@ -24,6 +30,20 @@ class SurveyState(TypedDict):
     answers: Dict[str, str]
     survey_complete: bool
 
+@functools.lru_cache(maxsize=32)
+def _chat_model(model_name: str, max_tokens: Optional[int]) -> ChatOpenAI:
+    # Shared across requests; retries and timeouts come from call_model's "survey" policy
+    return ChatOpenAI(model_name=model_name, max_tokens=max_tokens, temperature=0.7,
+                      openai_api_key=settings.OPENAI_API_KEY, max_retries=0)
+
+def warm_greetings(survey_bot: dict):
+    """
+    Start filling the greeting pool for a survey that was just created or updated.
+    """
+    survey_bot = {**survey_bot, 'questions': sorted(survey_bot['questions'], key=lambda q: q['order_number'])}
+    survey_greetings.invalidate(survey_bot['id'])
+    survey_greetings.warm(survey_bot, SurveyBotService(survey_bot).generate_greeting)
+
 class SurveyBotService:
     """
     Service class for managing the survey bot functionality.
@@ -37,22 +57,74 @@ class SurveyBotService:
             survey_bot: The survey bot configuration.
         """
         self.survey_bot = survey_bot
-        self.chat_model = ChatOpenAI(temperature=0.7, openai_api_key=settings.OPENAI_API_KEY)
         self.memory = ConversationBufferMemory(return_messages=True)
         self.workflow = self._create_workflow()
         self.current_question_index = 0
         self.full_conversation = []
-        self.interpreted_answers = {}
+        # Set by connection-based transports: receives reply text as the model streams it
+        self.on_token: Optional[Callable[[str], Awaitable[None]]] = None
+        # Conversation state kept between turns by next_turn
+        self.state: Optional[SurveyState] = None
 
-    def _format_questions(self):
+    async def _complete(self, kind: str, messages: list, stream: bool = True) -> str:
         """
-        Format the survey questions into a string.
+        Run one model call on the model the survey's routing policy picks for this kind of turn.
+
+        Args:
+            kind (str): "greeting", "acknowledgement" or "validation".
+            messages (list): The formatted prompt messages.
+            stream (bool): Stream the reply to on_token when it is set.
 
         Returns:
-            str: Formatted string of survey questions.
+            str: The reply text.
+        """
+        prompt_tokens = sum(estimate_tokens(message.content) + 4 for message in messages)
+        decision = model_router.route(self.survey_bot.get('model_routing'), kind, prompt_tokens)
+        chat_model = _chat_model(decision.model, decision.max_tokens)
+        started = time.monotonic()
+        if self.on_token is None or not stream:
+            response = await call_model("survey", lambda: chat_model.ainvoke(messages))
+        else:
+            sent = []
+            response = await call_model("survey_stream", lambda: self._stream(chat_model, messages, sent))
+        model_router.record(decision, time.monotonic() - started)
+        usage = (getattr(response, "response_metadata", None) or {}).get("token_usage")
+        if usage:
+            prompt_builder.record_usage("survey", usage.get("prompt_tokens"), prompt_builder.cached_tokens(usage))
+        return response.content
+
+    async def generate_greeting(self) -> str:
         """
-        return "\n".join([f"{q['order_number']}. {q['question_text']} (Type: {q['question_type']})" for q in self.survey_bot['questions']])
+        Write a new opening greeting for the survey with the model. It is never
+        streamed: greetings are shared by every respondent waiting on the same miss
+        and pooled for later ones.
 
+        Returns:
+            str: The greeting.
+        """
+        greeting_messages = [
+            SystemMessage(content=prompt_builder.survey_greeting_prompt(self.survey_bot)),
+            HumanMessage(content=prompt_builder.SURVEY_GREETING_REQUEST),
+        ]
+        return await self._complete("greeting", greeting_messages, stream=False)
+
+    async def _greeting(self) -> str:
+        # Served from the survey version's greeting pool; the model is only waited on after a miss
+        return await survey_greetings.get_greeting(self.survey_bot, self.generate_greeting)
+
+    async def _stream(self, chat_model: ChatOpenAI, messages: list, sent: list):
+        # Part of the reply is already with the respondent, so a broken stream is not retried
+        if sent:
+            raise RuntimeError("Model stream failed after part of the reply was sent")
+        response = None
+        async for chunk in chat_model.astream(messages):
+            if chunk.content:
+                sent.append(len(chunk.content))
+                await self.on_token(chunk.content)
+            response = chunk if response is None else response + chunk
+        if response is None:
+            raise RuntimeError("Model stream ended without a response")
+        return response
 
     def _create_workflow(self):
         """
@@ -61,27 +133,6 @@ class SurveyBotService:
         Returns:
             StateGraph: Compiled workflow graph.
         """
-        system_message = f"""You are a survey bot named {self.survey_bot['name']}. 
-        Your task is to conduct a survey based on the following instructions:
-        {self.survey_bot['instructions']}
-
-        You have access to the following questions:
-        {self._format_questions()}
-
-        Conduct the survey in a conversational manner, asking one question at a time.
-        Do not reveal all questions at once. Wait for the user's response before moving to the next question.
-        After each user response, you should:
-        1. Acknowledge their answer.
-        2. Ask the next question in the survey.
-        3. If it's the last question, thank the user for completing the survey.
-        """
-
-        self.prompt = ChatPromptTemplate.from_messages([
-            ("system", system_message),
-            ("human", "{user_input}"),
-            ("ai", "{agent_scratchpad}"),
-        ])
-
         workflow = StateGraph(SurveyState)
         workflow.add_node("survey_agent", self.survey_agent)
         workflow.set_entry_point("survey_agent")
@@ -92,7 +143,7 @@ class SurveyBotService:
 
         return workflow.compile()
 
-    def survey_agent(self, state: SurveyState) -> SurveyState:
+    async def survey_agent(self, state: SurveyState) -> SurveyState:
         try:
             logging.debug(f"survey_agent received state: {state}")
             messages = state.get('messages', [])
@@ -103,13 +154,30 @@ class SurveyBotService:
             logging.debug(f"Human message: {human_message}")
 
             validation_instructions = ""
-            move_to_next_question = True
+            local_validation = None
 
             if current_question_index > 0 and human_message:
                 current_question = self.survey_bot['questions'][current_question_index - 1]
                 logging.debug(f"Current question: {current_question}")
+                # Structured question types are checked locally; the model only judges free-text criteria
+                local_validation = validate_answer(current_question, human_message)
                 
-                if current_question.get('answer_criteria'):
+                if local_validation is not None and not local_validation.valid:
+                    logging.debug(f"Answer rejected by local validator: {local_validation.message}")
+                    llm_calls_avoided_total.inc(reason="invalid_answer")
+                    reply = f"{local_validation.message} {current_question['question_text']}"
+                    self.full_conversation.append({'role': 'human', 'content': human_message})
+                    self.full_conversation.append({'role': 'assistant', 'content': reply})
+                    return {
+                        'messages': messages + [{'role': 'assistant', 'content': reply}],
+                        'current_question_index': current_question_index,
+                        'answers': answers,
+                        'survey_complete': False
+                    }
+                elif local_validation is not None:
+                    answers[current_question['id']] = human_message
+                    logging.debug(f"Answer accepted by local validator: {human_message}")
+                elif current_question.get('answer_criteria'):
                     answer_criteria = current_question['answer_criteria']
                     logging.debug(f"Answer criteria: {answer_criteria}")
                     validation_instructions = f"""
@@ -117,7 +185,6 @@ class SurveyBotService:
                         If it does not, politely ask the user to provide more details according to the criteria.
                         If it does meet the criteria, acknowledge the answer and proceed to the next question.
                         """
-                    move_to_next_question = False  # We'll decide this based on the AI's response
                 else:
                     answers[current_question['id']] = human_message
                     logging.debug(f"No criteria, added answer: {human_message}")
@@ -138,33 +205,48 @@ class SurveyBotService:
                 agent_scratchpad = "This was the last question. Thank the user for completing the survey."
                 logging.debug("Survey complete")
 
-            full_conversation = "\n".join([f"{'Human' if msg['role'] == 'human' else 'AI'}: {msg['content']}" for msg in messages])
-            logging.debug(f"Full conversation: {full_conversation}")
-
-            logging.debug(f"Prompt to OpenAI:\n{self.prompt.format_messages(user_input=full_conversation, agent_scratchpad=agent_scratchpad)}")
+            if self.survey_bot.get('fast_mode') and not validation_instructions:
+                # Nothing to judge on this turn: acknowledge and move on from precompiled templates
+                templates = get_survey_templates(self.survey_bot, settings.SURVEY_FAST_MODE_VARIATION)
+                if survey_complete:
+                    reply = templates.completion()
+                else:
+                    reply = templates.next_question(current_question_index)
+                llm_calls_avoided_total.inc(reason="fast_mode")
+                used_model = False
+                logging.debug(f"Fast-mode reply: {reply}")
+            else:
+                full_conversation = "\n".join([f"{'Human' if msg['role'] == 'human' else 'AI'}: {msg['content']}" for msg in messages])
+                logging.debug(f"Full conversation: {full_conversation}")
 
-            response = self.chat_model(self.prompt.format_messages(
-                user_input=full_conversation,
-                agent_scratchpad=agent_scratchpad
-            ))
-            logging.debug(f"OpenAI response: {response}")
+                # The system prompt is the same bytes on every turn of this survey version; only the tail varies
+                prompt_messages = [
+                    SystemMessage(content=prompt_builder.survey_system_prompt(self.survey_bot)),
+                    HumanMessage(content=full_conversation),
+                    AIMessage(content=agent_scratchpad),
+                ]
+                logging.debug(f"Prompt to OpenAI:\n{prompt_messages}")
 
-            if current_question_index > 0:
-                current_question = self.survey_bot['questions'][current_question_index - 1]
-                self.interpreted_answers[current_question['id']] = f"Question: {current_question['question_text']}\nAnswer: {human_message}\nInterpretation: {agent_scratchpad}"
+                reply = await self._complete("validation" if validation_instructions else "acknowledgement", prompt_messages)
+                logging.debug(f"OpenAI response: {reply}")
+                used_model = True
 
             # Check if the response indicates that more details are needed
-            if "provide more details" in response.content.lower() or "could you please" in response.content.lower():
-                move_to_next_question = False
+            if used_model and local_validation is None and ("provide more details" in reply.lower() or "could you please" in reply.lower()):
                 logging.debug("AI requested more details")
-            elif move_to_next_question:
-                current_question_index += 1
+            elif survey_complete:
+                # Nothing left to ask: keep the last answer without stepping past the final question
+                if current_question_index > 0:
+                    answers.setdefault(self.survey_bot['questions'][current_question_index - 1]['id'], human_message)
+            else:
+                # The answer belongs to the question just asked, before the index moves on
                 if current_question_index > 0:
                     answers[self.survey_bot['questions'][current_question_index - 1]['id']] = human_message
+                current_question_index += 1
                 logging.debug(f"Moving to next question. New index: {current_question_index}")
 
             new_state = {
-                'messages': messages + [{'role': 'assistant', 'content': response.content}],
+                'messages': messages + [{'role': 'assistant', 'content': reply}],
                 'current_question_index': current_question_index,
                 'answers': answers,
                 'survey_complete': survey_complete
@@ -173,7 +255,7 @@ class SurveyBotService:
             logging.debug(f"New state in survey_agent: {new_state}")
 
             self.full_conversation.append({'role': 'human', 'content': human_message})
-            self.full_conversation.append({'role': 'assistant', 'content': response.content})
+            self.full_conversation.append({'role': 'assistant', 'content': reply})
 
             return new_state
         except Exception as e:
@@ -202,25 +284,9 @@ class SurveyBotService:
             logging.debug(f"get_response called with user_message: '{user_message}' and conversation: {conversation}")
 
             if not conversation:
-                initial_prompt = ChatPromptTemplate.from_messages([
-                    ("system", f"""You are a survey bot named {self.survey_bot['name']}. 
-                    Create an initial greeting for a survey based on these instructions:
-                    {self.survey_bot['instructions']}
-
-                    The survey includes these questions:
-                    {self._format_questions()}
-
-                    Your greeting should:
-                    1. Introduce the survey topic
-                    2. Ask for the user's name
-                    3. Be concise and welcoming
-                    
-                    Do not ask any survey questions yet."""),
-                    ("human", "Generate the initial greeting for the survey."),
-                ])
-                initial_response = self.chat_model(initial_prompt.format_messages())
-                self.memory.chat_memory.add_ai_message(initial_response.content)
-                return initial_response.content
+                greeting = await self._greeting()
+                self.memory.chat_memory.add_ai_message(greeting)
+                return greeting
 
             self.memory.chat_memory.clear()
             for message in conversation:
@@ -260,7 +326,12 @@ class SurveyBotService:
                 logging.error("Workflow is None, unable to process state")
                 return "I apologize, but I encountered an error while processing your response."
 
-            final_state = next(self.workflow.stream(state))
+            # One step of the graph: the agent answers this turn
+            steps = self.workflow.astream(state)
+            try:
+                final_state = await anext(steps, {})
+            finally:
+                await steps.aclose()
             logging.debug(f"State after workflow step: {final_state}")
 
             state_data = final_state.get('survey_agent', {})
@@ -280,12 +351,65 @@ class SurveyBotService:
             logging.error(f"Error in SurveyBotService: {e}", exc_info=True)
             return "I apologize, but I encountered an error while processing your response."
 
+    async def next_turn(self, user_message: Optional[str] = None) -> str:
+        """
+        Answer the next turn of a conversation whose state this service keeps between
+        calls, so nothing has to be rebuilt from a resent transcript. The first call
+        (without a message) returns the greeting.
+
+        Args:
+            user_message (Optional[str]): The respondent's message; None for the greeting.
+
+        Returns:
+            str: The survey bot's reply.
+
+        Raises:
+            Exception: If the greeting cannot be generated; the conversation has not started then.
+        """
+        if self.state is None:
+            greeting = await self._greeting()
+            self.state = {
+                'messages': [{'role': 'assistant', 'content': greeting}],
+                'current_question_index': 0,
+                'answers': {},
+                'survey_complete': False
+            }
+            self.full_conversation.append({'role': 'assistant', 'content': greeting})
+            return greeting
+
+        try:
+            # survey_agent fills in answers in place; copied so a failed turn leaves the kept state alone
+            state = {**self.state,
+                     'messages': self.state['messages'] + [{'role': 'human', 'content': user_message}],
+                     'answers': dict(self.state['answers'])}
+            steps = self.workflow.astream(state)
+            try:
+                final_state = await anext(steps, {})
+            finally:
+                await steps.aclose()
+
+            state_data = final_state.get('survey_agent', {})
+            if not isinstance(state_data, dict) or not state_data.get("messages"):
+                logging.error(f"Invalid state data: {state_data}")
+                return "I apologize, but I encountered an error while processing your response."
+            if state_data.get('survey_complete') and state_data.get('current_question_index', 0) < len(self.survey_bot['questions']):
+                # survey_agent's error fallback, not a finished survey: keep the previous
+                # state so the respondent can answer again
+                return state_data["messages"][-1]['content']
+            self.state = state_data
+            self.current_question_index = state_data.get("current_question_index", self.current_question_index)
+            return state_data["messages"][-1]['content']
+        except Exception as e:
+            logging.error(f"Error in SurveyBotService: {e}", exc_info=True)
+            return "I apologize, but I encountered an error while processing your response."
+
     def get_survey_results(self):
         """
         Get the results of the survey.
 
         Returns:
-            dict: A dictionary containing the full conversation, interpreted answers, and raw answers.
+            dict: A dictionary containing the full conversation and raw answers. Answers are
+            interpreted afterwards by the interpretation job queue, off the conversation path.
         """
         raw_answers = {}
         for i, message in enumerate(self.memory.chat_memory.messages):
@@ -295,7 +419,6 @@ class SurveyBotService:
 
         return {
             'full_conversation': self.full_conversation,
-            'interpreted_answers': self.interpreted_answers,
             'raw_answers': raw_answers
         }
 
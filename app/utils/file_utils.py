@@ -1,35 +1,60 @@
 # backend/app/utils/file_utils.py
 
+import asyncio
 import logging
-from typing import List
+from typing import List, Tuple
 from fastapi import UploadFile
+from fastapi.concurrency import run_in_threadpool
+from app.core.config import settings
 from app.db.session import get_supabase
 
-async def save_uploaded_files(files: List[UploadFile], chatbot_id: str) -> List[str]:
+DOCUMENTS_BUCKET = "chatbot-documents"
+
+def document_url(supabase, chatbot_id: str, filename: str) -> str:
+    # Built locally by the storage client, so it is known before the upload finishes
+    return supabase.storage.from_(DOCUMENTS_BUCKET).get_public_url(f"{chatbot_id}/{filename}")
+
+async def read_files(files: List[UploadFile]) -> List[Tuple[str, bytes]]:
+    return [(file.filename, await file.read()) for file in files]
+
+def _upload_one(supabase, chatbot_id: str, filename: str, content: bytes):
+    try:
+        file_path = f"{chatbot_id}/{filename}"
+        logging.info(f"Uploading file: {file_path}")
+        response = supabase.storage.from_(DOCUMENTS_BUCKET).upload(file_path, content)
+
+        logging.info(f"Upload response: {response}")
+
+        # Check if the upload was successful
+        if response:
+            public_url = document_url(supabase, chatbot_id, filename)
+            logging.info(f"File uploaded successfully. Public URL: {public_url}")
+            # Hand the bytes back too, so callers can process the file without downloading it again
+            return public_url, content
+        logging.error(f"Error uploading file {file_path}: Unexpected response format")
+    except Exception as e:
+        logging.error(f"Unexpected error while uploading file {filename}: {str(e)}")
+        logging.exception("Exception details:")
+    return None
+
+async def upload_contents(documents: List[Tuple[str, bytes]], chatbot_id: str) -> List[Tuple[str, bytes]]:
+    """
+    Upload (filename, bytes) pairs concurrently, at most UPLOAD_CONCURRENCY at a time.
+
+    Returns the (public URL, bytes) pairs that uploaded successfully, in input order.
+    """
     supabase = get_supabase()
-    file_urls = []
-    logging.info(f"Attempting to save {len(files)} files for chatbot {chatbot_id}")
-    for file in files:
-        try:
-            content = await file.read()
-            file_path = f"{chatbot_id}/{file.filename}"
-            logging.info(f"Uploading file: {file_path}")
-            response = supabase.storage.from_("chatbot-documents").upload(file_path, content)
-            
-            logging.info(f"Upload response: {response}")
-            
-            # Check if the upload was successful
-            if response:
-                public_url = supabase.storage.from_("chatbot-documents").get_public_url(file_path)
-                logging.info(f"File uploaded successfully. Public URL: {public_url}")
-                file_urls.append(public_url)
-            else:
-                logging.error(f"Error uploading file {file_path}: Unexpected response format")
-        except Exception as e:
-            logging.error(f"Unexpected error while uploading file {file.filename}: {str(e)}")
-            logging.exception("Exception details:")
-    logging.info(f"Finished uploading files. Total successful uploads: {len(file_urls)}")
-    return file_urls
+    semaphore = asyncio.Semaphore(settings.UPLOAD_CONCURRENCY)
+    logging.info(f"Attempting to save {len(documents)} files for chatbot {chatbot_id}")
+
+    async def upload(filename: str, content: bytes):
+        async with semaphore:
+            return await run_in_threadpool(_upload_one, supabase, chatbot_id, filename, content)
+
+    results = await asyncio.gather(*(upload(filename, content) for filename, content in documents))
+    uploaded = [result for result in results if result is not None]
+    logging.info(f"Finished uploading files. Total successful uploads: {len(uploaded)}")
+    return uploaded
 
 async def delete_files(file_urls: List[str]):
     supabase = get_supabase()
@@ -37,11 +62,11 @@ async def delete_files(file_urls: List[str]):
     for url in file_urls:
         try:
             # Extract the file path from the public URL
-            file_path = url.split("chatbot-documents/")[-1]
+            file_path = url.split(f"{DOCUMENTS_BUCKET}/")[-1]
             logging.info(f"Deleting file: {file_path}")
             
             # Delete the file from Supabase storage
-            response = supabase.storage.from_("chatbot-documents").remove(file_path)
+            response = supabase.storage.from_(DOCUMENTS_BUCKET).remove(file_path)
             
             if response:
                 logging.info(f"Successfully deleted file: {file_path}")
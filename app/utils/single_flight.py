@@ -0,0 +1,65 @@
+# backend/app/utils/single_flight.py
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one in-flight computation.
+
+    The first caller for a key starts the work as a task; every caller that
+    arrives while it is still running awaits that same task. Nothing is kept
+    once the work finishes, so this is not a cache - callers arriving afterwards
+    start a fresh computation.
+    """
+
+    def __init__(self, name: str = "single_flight"):
+        """
+        Initialize the SingleFlight group.
+
+        Args:
+            name (str): Name used in log messages.
+        """
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run ``fn`` for ``key`` unless a call for the same key is already running.
+
+        Args:
+            key (Hashable): Identity of the work.
+            fn (Callable[[], Awaitable[T]]): Zero-argument coroutine function doing the work.
+
+        Returns:
+            T: The result of the (possibly shared) computation.
+        """
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(fn())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda t, key=key: self._forget(key, t))
+        else:
+            logging.debug(f"{self.name}: joining in-flight call for {key!r}")
+
+        # shield() so a caller that goes away (e.g. client disconnect) does not
+        # cancel the work the other callers are waiting on
+        return await asyncio.shield(task)
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+        if not task.cancelled() and task.exception() is not None:
+            logging.debug(f"{self.name}: call for {key!r} failed: {task.exception()}")
+
+    def in_flight(self) -> int:
+        """
+        Returns:
+            int: Number of keys currently being computed.
+        """
+        return len(self._in_flight)
+
@@ -0,0 +1,172 @@
+# backend/benchmarks/bench_creation.py
+#
+# End-to-end latency of creating a chatbot (with documents) and a survey bot:
+# the old sequential flows against the current endpoints, with Supabase,
+# storage and document ingestion replaced by fakes with fixed latencies.
+#
+#     python -m benchmarks.bench_creation --files 5 --db-ms 40 --storage-ms 150 --ingest-ms 800
+
+import argparse
+import asyncio
+import io
+import os
+import statistics
+import time
+import uuid
+from datetime import datetime
+
+for _name in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY",
+              "SUPABASE_JWT_SECRET", "OPENAI_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+
+from fastapi import UploadFile  # noqa: E402
+from app.api.v1.endpoints import chatbots, surveybots  # noqa: E402
+from app.schemas.surveybot import SurveyBotCreate  # noqa: E402
+from app.schemas.user import User  # noqa: E402
+from app.utils import file_utils  # noqa: E402
+
+
+class FakeQuery:
+    def __init__(self, client, data=None):
+        self.client = client
+        self.data = data
+
+    def insert(self, data, returning=None, **kwargs):
+        rows = data if isinstance(data, list) else [data]
+        now = datetime.now().isoformat()
+        self.data = [] if returning is not None and returning.value == "minimal" else \
+            [{"created_at": now, "updated_at": now, **row} for row in rows]
+        return self
+
+    def update(self, data):
+        self.data = [data]
+        return self
+
+    def delete(self):
+        self.data = []
+        return self
+
+    def eq(self, column, value):
+        return self
+
+    def execute(self):
+        self.client.round_trips += 1
+        time.sleep(self.client.db_seconds)
+        return self
+
+
+class FakeBucket:
+    def __init__(self, client):
+        self.client = client
+
+    def upload(self, path, content):
+        time.sleep(self.client.storage_seconds)
+        return {"Key": path}
+
+    def get_public_url(self, path):
+        return f"https://storage.example.com/object/public/chatbot-documents/{path}"
+
+    def remove(self, path):
+        time.sleep(self.client.storage_seconds)
+        return [path]
+
+
+class FakeStorage:
+    def __init__(self, client):
+        self.client = client
+
+    def from_(self, bucket):
+        return FakeBucket(self.client)
+
+
+class FakeSupabase:
+    def __init__(self, db_ms: float, storage_ms: float):
+        self.db_seconds = db_ms / 1000
+        self.storage_seconds = storage_ms / 1000
+        self.round_trips = 0
+        self.storage = FakeStorage(self)
+
+    def table(self, name):
+        return FakeQuery(self)
+
+
+def fake_ingest(ingest_ms: float):
+    async def ingest_documents(documents):
+        await asyncio.sleep(ingest_ms / 1000)
+        return {url: {"summary": "digest"} for url, _ in documents}
+    return ingest_documents
+
+
+def make_files(count: int):
+    return [UploadFile(file=io.BytesIO(b"%PDF-1.4 benchmark" * 1000), filename=f"doc-{i}.pdf") for i in range(count)]
+
+
+async def old_create_chatbot(supabase, files, ingest_documents, user: User):
+    """The flow before the pipeline: insert, upload one by one, digest, then update."""
+    chatbot = supabase.table("chatbots").insert({"id": str(uuid.uuid4()), "user_id": user.id}).execute().data[0]
+    uploaded = []
+    for file in files:
+        content = await file.read()
+        path = f"{chatbot['id']}/{file.filename}"
+        supabase.storage.from_("chatbot-documents").upload(path, content)
+        uploaded.append((supabase.storage.from_("chatbot-documents").get_public_url(path), content))
+    digests = await ingest_documents(uploaded)
+    supabase.table("chatbots").update({"documents": [url for url, _ in uploaded], "document_digests": digests}) \
+        .eq("id", chatbot["id"]).execute()
+
+
+async def old_create_survey_bot(supabase, survey_bot: SurveyBotCreate, user: User):
+    created = supabase.table("survey_bots").insert({"id": str(uuid.uuid4()), "user_id": user.id}).execute().data[0]
+    supabase.table("survey_questions").insert([
+        {"id": str(uuid.uuid4()), "survey_bot_id": created["id"], **q.model_dump()} for q in survey_bot.questions
+    ]).execute()
+
+
+async def measure(label: str, supabase: FakeSupabase, runs: int, make_call):
+    timings = []
+    supabase.round_trips = 0
+    for _ in range(runs):
+        started = time.perf_counter()
+        await make_call()
+        timings.append((time.perf_counter() - started) * 1000)
+    print(f"  {label:<34} median {statistics.median(timings):7.1f} ms   "
+          f"db round trips/run {supabase.round_trips / runs:.0f}")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Creation pipeline benchmark")
+    parser.add_argument("--files", type=int, default=5)
+    parser.add_argument("--questions", type=int, default=10)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--db-ms", type=float, default=40)
+    parser.add_argument("--storage-ms", type=float, default=150)
+    parser.add_argument("--ingest-ms", type=float, default=800)
+    args = parser.parse_args()
+
+    supabase = FakeSupabase(args.db_ms, args.storage_ms)
+    ingest_documents = fake_ingest(args.ingest_ms)
+    # The endpoints resolve these at call time, so patching the module attributes is enough
+    chatbots.get_supabase = surveybots.get_supabase = file_utils.get_supabase = lambda: supabase
+    chatbots.ingest_documents = ingest_documents
+    user = User(id=str(uuid.uuid4()), email="bench@example.com")
+    survey = SurveyBotCreate(name="Bench", questions=[
+        {"question_text": f"Question {i}?", "question_type": "text", "order_number": i} for i in range(args.questions)
+    ])
+
+    print(f"chatbot with {args.files} documents (db {args.db_ms:.0f} ms, upload {args.storage_ms:.0f} ms, "
+          f"ingest {args.ingest_ms:.0f} ms)")
+    await measure("sequential insert/upload/update", supabase, args.runs,
+                  lambda: old_create_chatbot(supabase, make_files(args.files), ingest_documents, user))
+    await measure("pipeline (create_chatbot)", supabase, args.runs,
+                  lambda: chatbots.create_chatbot(name="Bench", instructions=None, tone=None,
+                                                  files=make_files(args.files), model_routing=None, current_user=user))
+
+    print(f"survey bot with {args.questions} questions")
+    await measure("insert bot, insert questions", supabase, args.runs,
+                  lambda: old_create_survey_bot(supabase, survey, user))
+    await measure("create_survey_bot", supabase, args.runs,
+                  lambda: surveybots.create_survey_bot(survey, current_user=user))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,102 @@
+# backend/benchmarks/bench_event_loop.py
+#
+# Event-loop latency while chat requests parse PDFs, inline (the old behaviour)
+# versus in the process pool. Run from the backend directory:
+#
+#     python -m benchmarks.bench_event_loop --requests 20 --pages 200
+
+import argparse
+import asyncio
+import os
+import statistics
+import time
+
+for _name in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY",
+              "SUPABASE_JWT_SECRET", "OPENAI_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+
+from app.core.config import settings  # noqa: E402
+from app.services.document_parser import parse_pdf, parse_pdf_bytes, shutdown_parse_pool  # noqa: E402
+
+
+def build_pdf(pages: int) -> bytes:
+    """Build a minimal multi-page text PDF without any third-party writer."""
+    objects = []
+    kids = " ".join(f"{3 + i * 2} 0 R" for i in range(pages))
+    objects.append("<< /Type /Catalog /Pages 2 0 R >>")
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>")
+    font_id = 3 + pages * 2
+    line = "The quick brown fox jumps over the lazy dog. " * 2
+    for i in range(pages):
+        text = " ".join(f"BT /F1 9 Tf 36 {800 - row * 12} Td ({line}{i}-{row}) Tj ET" for row in range(60))
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 842] "
+                       f"/Resources << /Font << /F1 {font_id} 0 R >> >> /Contents {4 + i * 2} 0 R >>")
+        objects.append(f"<< /Length {len(text)} >>\nstream\n{text}\nendstream")
+    objects.append("<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n{body}\nendobj\n".encode("latin-1")
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    for offset in offsets:
+        out += f"{offset:010d} 00000 n \n".encode()
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+async def probe_lag(samples: list, stop: asyncio.Event, interval: float = 0.005):
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(interval)
+        samples.append((loop.time() - started - interval) * 1000)
+
+
+async def chat_request(pdf: bytes, mode: str):
+    if mode == "inline":
+        parse_pdf_bytes(pdf, settings.PDF_MAX_PAGES)
+    else:
+        await parse_pdf(pdf, source="benchmark")
+    # Stand-in for the model call that follows document extraction
+    await asyncio.sleep(0.05)
+
+
+async def run(mode: str, pdf: bytes, requests: int) -> dict:
+    samples, stop = [], asyncio.Event()
+    prober = asyncio.create_task(probe_lag(samples, stop))
+    started = time.perf_counter()
+    await asyncio.gather(*(chat_request(pdf, mode) for _ in range(requests)))
+    elapsed = time.perf_counter() - started
+    stop.set()
+    await prober
+    samples.sort()
+    return {
+        "mode": mode,
+        "wall_s": elapsed,
+        "lag_p50_ms": statistics.median(samples) if samples else 0.0,
+        "lag_p99_ms": samples[int(len(samples) * 0.99) - 1] if samples else 0.0,
+        "lag_max_ms": samples[-1] if samples else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Event-loop lag during concurrent PDF parsing")
+    parser.add_argument("--requests", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    pdf = build_pdf(args.pages)
+    print(f"{args.requests} concurrent chat requests, {args.pages}-page PDF ({len(pdf)} bytes), "
+          f"{settings.PDF_PARSE_WORKERS} parse processes")
+    for mode in ("inline", "pool"):
+        result = asyncio.run(run(mode, pdf, args.requests))
+        print(f"{result['mode']:>6}: wall {result['wall_s']:.2f}s  loop lag p50 {result['lag_p50_ms']:.1f}ms  "
+              f"p99 {result['lag_p99_ms']:.1f}ms  max {result['lag_max_ms']:.1f}ms")
+        shutdown_parse_pool()
+
+
+if __name__ == "__main__":
+    main()
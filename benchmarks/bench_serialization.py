@@ -0,0 +1,114 @@
+# backend/benchmarks/bench_serialization.py
+#
+# Serialization cost of a large get_survey_results payload: the old path
+# (models built field by field, jsonable_encoder, json.dumps) against direct
+# validation from row dicts rendered with orjson, plus compressed sizes.
+#
+#     python -m benchmarks.bench_serialization --rows 10000
+
+import argparse
+import gzip
+import json
+import os
+import random
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import List
+
+for _name in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY",
+              "SUPABASE_JWT_SECRET", "OPENAI_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(_name, "benchmark")
+
+from fastapi.encoders import jsonable_encoder  # noqa: E402
+from pydantic import TypeAdapter  # noqa: E402
+from app.core.compression import brotli  # noqa: E402
+from app.core.responses import dumps  # noqa: E402
+from app.schemas.surveybot import SurveyResult, SurveyResponse, SurveyAnswer  # noqa: E402
+
+ANSWERS = ["Yes", "No", "Blue", "About twice a week, mostly in the evenings.",
+           "I found the onboarding confusing but support was quick to help.", "7", "someone@example.com"]
+
+
+def build_rows(responses: int, questions: int) -> List[dict]:
+    """Row dicts shaped like what Supabase returns for survey_responses and survey_answers."""
+    rng = random.Random(42)
+    started = datetime(2024, 1, 1)
+    question_ids = [str(uuid.uuid4()) for _ in range(questions)]
+    rows = []
+    for index in range(responses):
+        created_at = (started + timedelta(minutes=index)).isoformat()
+        response = {
+            "id": str(uuid.uuid4()),
+            "survey_bot_id": "5b0f3c1e-3c1a-4c43-9a0e-0d7f2e4b9c11",
+            "respondent_id": None,
+            "completed": True,
+            "created_at": created_at,
+            "updated_at": created_at,
+        }
+        answers = [{
+            "id": str(uuid.uuid4()),
+            "survey_response_id": response["id"],
+            "question_id": question_id,
+            "question_text": f"Question number {number + 1}: how would you describe your experience?",
+            "raw_answer": rng.choice(ANSWERS),
+            "ai_interpretation": "The respondent answered the question directly and positively.",
+            "created_at": created_at,
+            "updated_at": created_at,
+        } for number, question_id in enumerate(question_ids)]
+        rows.append({"response": response, "answers": answers})
+    return rows
+
+
+def old_path(rows: List[dict]) -> bytes:
+    results = [SurveyResult(
+        response=SurveyResponse(**row["response"]),
+        answers=[SurveyAnswer(**answer) for answer in row["answers"]],
+    ) for row in rows]
+    return json.dumps(jsonable_encoder(results)).encode()
+
+
+_adapter = TypeAdapter(List[SurveyResult])
+
+
+def new_path(rows: List[dict]) -> bytes:
+    # What FastAPI does with a returned list of row dicts and response_model=List[SurveyResult]
+    validated = _adapter.validate_python(rows)
+    return dumps(_adapter.dump_python(validated, mode="json"))
+
+
+def timed(fn, *args, repeat: int = 3):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - started)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Survey results serialization benchmark")
+    parser.add_argument("--rows", type=int, default=10000)
+    parser.add_argument("--questions", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = build_rows(args.rows, args.questions)
+    print(f"{args.rows} responses x {args.questions} answers")
+
+    old_time, old_body = timed(old_path, rows)
+    new_time, new_body = timed(new_path, rows)
+    assert json.loads(old_body) == json.loads(new_body), "paths produced different JSON"
+    print(f"  manual models + jsonable_encoder + json: {old_time * 1000:8.1f} ms  {len(old_body) / 1e6:6.2f} MB")
+    print(f"  row validation + orjson:                 {new_time * 1000:8.1f} ms  ({old_time / new_time:.1f}x faster)")
+
+    gzip_time, gzipped = timed(gzip.compress, new_body, 6)
+    print(f"  gzip level 6:                            {gzip_time * 1000:8.1f} ms  {len(gzipped) / 1e6:6.2f} MB")
+    if brotli is not None:
+        brotli_time, brotlied = timed(lambda body: brotli.compress(body, quality=4), new_body)
+        print(f"  brotli quality 4:                        {brotli_time * 1000:8.1f} ms  {len(brotlied) / 1e6:6.2f} MB")
+    else:
+        print("  brotli not installed; skipping")
+
+
+if __name__ == "__main__":
+    main()
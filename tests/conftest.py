@@ -0,0 +1,7 @@
+# backend/tests/conftest.py
+
+import os
+
+# Settings are read at import time; the tests never reach these services
+for name in ("SUPABASE_URL", "SUPABASE_ANON_KEY", "SUPABASE_SERVICE_ROLE_KEY", "SUPABASE_JWT_SECRET", "OPENAI_API_KEY", "SECRET_KEY"):
+    os.environ.setdefault(name, "http://localhost" if name == "SUPABASE_URL" else "test")
@@ -0,0 +1,63 @@
+# backend/tests/test_surveybot_service.py
+
+import asyncio
+from app.services.surveybot_service import SurveyBotService
+
+SURVEY_BOT = {
+    "id": "survey-1",
+    "name": "Feedback",
+    "instructions": None,
+    "fast_mode": False,
+    "questions": [
+        {"id": "q1", "question_text": "What do you like about the product?", "question_type": "text",
+         "order_number": 1, "answer_criteria": "Mentions at least one feature"},
+        {"id": "q2", "question_text": "What should we improve?", "question_type": "text",
+         "order_number": 2, "answer_criteria": "Names something concrete"},
+    ],
+}
+
+
+def _service(*replies: str) -> SurveyBotService:
+    service = SurveyBotService(SURVEY_BOT)
+    # The last reply repeats once the others are used up
+    replies = list(replies)
+
+    async def greeting():
+        return "Hi! What's your name?"
+
+    async def complete(kind, messages, stream=True):
+        return replies.pop(0) if len(replies) > 1 else replies[0]
+
+    service._greeting = greeting
+    service._complete = complete
+    return service
+
+
+def test_next_turn_moves_past_questions_with_criteria():
+    service = _service("OK next")
+
+    async def run():
+        await service.next_turn()
+        for message in ("Sam", "The search", "Faster exports"):
+            assert not service.state["survey_complete"]
+            await service.next_turn(message)
+
+    asyncio.run(run())
+    assert service.state["survey_complete"]
+    assert service.state["current_question_index"] == len(SURVEY_BOT["questions"])
+    assert service.state["answers"] == {"q1": "The search", "q2": "Faster exports"}
+
+
+def test_next_turn_stays_on_question_when_model_asks_for_details():
+    service = _service("What do you like about the product?", "Could you please provide more details?")
+
+    async def run():
+        await service.next_turn()
+        await service.next_turn("Sam")
+        await service.next_turn("It's fine")
+
+    asyncio.run(run())
+    # The name reply moved on to q1; the vague answer to q1 did not
+    assert service.state["current_question_index"] == 1
+    assert service.state["answers"] == {}
+    assert not service.state["survey_complete"]